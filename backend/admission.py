@@ -0,0 +1,356 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process keeps its own budget
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing a request that would wait too long; `retry_after` is in seconds"""
+
+    def __init__(self, name, reason, retry_after):
+        super().__init__(f"{name} is overloaded ({reason})")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class QuotaExceededError(Exception):
+    """Raised instead of calling an endpoint the quota budget cannot pay for"""
+
+    def __init__(self, name, endpoint, retry_after):
+        super().__init__(f"{name} quota budget exhausted ({endpoint})")
+        self.name = name
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Per-process cap on requests that go upstream at once.
+
+    Up to `limit` callers hold a slot; up to `max_queue` more may wait for
+    one, each for at most `max_wait` seconds. A caller beyond that, or
+    still waiting at its deadline, gets Overloaded straight away, so a
+    spike is turned away (to cached data or a 503) in milliseconds instead
+    of queueing until upstream timeouts fire. Overloaded.retry_after is the
+    time the queue ahead should take to drain at the average hold time.
+    """
+
+    def __init__(self, name, limit=8, max_queue=16, max_wait=1.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self._hold_seconds = 1.0  # moving average of how long a slot is held
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+
+    def acquire(self):
+        """Take a slot (waiting at most `max_wait`); returns a ticket for release()"""
+        with self._cond:
+            if self.active >= self.limit:
+                if self.waiting >= self.max_queue:
+                    raise self._reject_locked("queue_full")
+                self.waiting += 1
+                self.queued += 1
+                try:
+                    if not self._cond.wait_for(lambda: self.active < self.limit, self.max_wait):
+                        raise self._reject_locked("timeout")
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+        return time.monotonic()
+
+    def release(self, ticket):
+        with self._cond:
+            self.active -= 1
+            self._record_hold_locked(ticket)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        ticket = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def _record_hold_locked(self, ticket):
+        self._hold_seconds += 0.1 * (time.monotonic() - ticket - self._hold_seconds)
+
+    def _reject_locked(self, reason):
+        self.rejected[reason] += 1
+        ahead = self.active + self.waiting
+        retry_after = max(1, math.ceil(ahead * self._hold_seconds / max(1, self.limit)))
+        return Overloaded(self.name, reason, retry_after)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": dict(self.rejected),
+                "avg_hold_ms": round(self._hold_seconds * 1000, 1),
+            }
+
+
+class AsyncAdmissionLimiter(AdmissionLimiter):
+    """
+    AdmissionLimiter for coroutines on one event loop. Waiters are served
+    in arrival order: a released slot is handed to the oldest waiter.
+    """
+
+    def __init__(self, name, limit=64, max_queue=128, max_wait=1.0):
+        super().__init__(name, limit, max_queue, max_wait)
+        self._waiters = deque()
+
+    async def acquire(self):
+        if self.active >= self.limit or self._waiters:
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject_locked("queue_full")
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.waiting += 1
+            self.queued += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+            except asyncio.TimeoutError:
+                if not waiter.done():
+                    self._waiters.remove(waiter)
+                    raise self._reject_locked("timeout") from None
+            except asyncio.CancelledError:
+                # Pass on a slot that was handed over just as the caller went away
+                if waiter.done():
+                    self._hand_over()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+            finally:
+                self.waiting -= 1
+        else:
+            self.active += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, ticket):
+        self._record_hold_locked(ticket)
+        self._hand_over()
+
+    def _hand_over(self):
+        """Give a freed slot to the oldest waiter, or return it"""
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        ticket = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "avg_hold_ms": round(self._hold_seconds * 1000, 1),
+        }
+
+
+class QuotaBudget:
+    """
+    Token bucket over an API's daily quota (estimated units, e.g. YouTube
+    Data API: search.list 100, videos.list 1).
+
+    The bucket holds at most `burst` units and refills at `daily_units`
+    per day, so a traffic spike can spend a burst but not the whole day;
+    on top of that no more than `daily_units` are spent between two
+    resets (`reset_hour` UTC, YouTube's midnight Pacific by default).
+    `costs` maps endpoints to units; other endpoints are free. A budget of
+    0 units per day is unlimited.
+
+    With `path`, the bucket lives in that file and every operation holds an
+    exclusive flock on it, so all worker processes (and the warmer leader)
+    spend from one budget; without it the budget is per process.
+    """
+
+    def __init__(self, name, daily_units, burst, costs, reset_hour=8, path=None):
+        self.name = name
+        self.daily_units = daily_units
+        self.burst = min(burst, daily_units) if daily_units > 0 else 0
+        self.costs = dict(costs)
+        self.reset_hour = reset_hour
+        self.path = path if fcntl is not None else None
+
+        self._lock = threading.Lock()
+        # Wall clock when the refill time is shared with other processes
+        self._clock = time.time if self.path else time.monotonic
+        self._tokens = float(self.burst)
+        self._refilled_at = self._clock()
+        self._day = self._current_day()
+        self.spent_today = 0
+        self.rejected = 0
+        self._state_file = None
+        self._state_pid = None
+
+    def _current_day(self):
+        return int((time.time() - self.reset_hour * 3600) // 86400)
+
+    def _refill_locked(self):
+        now = self._clock()
+        elapsed = max(0.0, now - self._refilled_at)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.daily_units / 86400)
+        self._refilled_at = now
+        day = self._current_day()
+        if day != self._day:
+            self._day = day
+            self.spent_today = 0
+
+    def _affordable_locked(self, cost):
+        return self._tokens >= cost and self.spent_today + cost <= self.daily_units
+
+    @contextmanager
+    def _locked(self, save=False):
+        """
+        Hold the budget, refilled, for one operation: with a state file it is
+        read under the file lock and, if `save`, written back before release
+        """
+        with self._lock:
+            state_file = self._open_state()
+            if state_file is None:
+                self._refill_locked()
+                yield
+                return
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                self._read_state(state_file)
+                self._refill_locked()
+                yield
+                if save:
+                    self._write_state(state_file)
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def _open_state(self):
+        """This process's handle on the state file (flock is per open file, so reopened after a fork)"""
+        if not self.path:
+            return None
+        pid = os.getpid()
+        if self._state_pid != pid:
+            self._state_pid = pid
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._state_file = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+")
+            except OSError as e:
+                logger.error("%s quota state %s could not be opened, budgeting per process: %s",
+                             self.name, self.path, e)
+                self._state_file = None
+        return self._state_file
+
+    def _read_state(self, state_file):
+        """Take the shared bucket; an empty or unreadable file keeps this process's view"""
+        state_file.seek(0)
+        try:
+            state = json.loads(state_file.read())
+            tokens, refilled_at = float(state["tokens"]), float(state["refilled_at"])
+            day, spent_today = int(state["day"]), int(state["spent_today"])
+        except (ValueError, KeyError, TypeError):
+            return
+        self._tokens, self._refilled_at, self._day, self.spent_today = tokens, refilled_at, day, spent_today
+
+    def _write_state(self, state_file):
+        try:
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump({
+                "tokens": self._tokens,
+                "refilled_at": self._refilled_at,
+                "day": self._day,
+                "spent_today": self.spent_today,
+            }, state_file)
+            state_file.flush()
+        except OSError as e:
+            logger.error("%s quota state %s could not be written: %s", self.name, self.path, e)
+
+    def available(self, endpoint, reserve=0):
+        """
+        True if a call to `endpoint` could be paid for now and still leave
+        `reserve` units in the bucket and the day (nothing is spent)
+        """
+        cost = self.costs.get(endpoint, 0)
+        if not cost or self.daily_units <= 0:
+            return True
+        with self._locked():
+            return self._affordable_locked(cost + reserve)
+
+    def spend(self, endpoint):
+        """Pay for one call to `endpoint`; False (nothing spent) if the budget cannot"""
+        cost = self.costs.get(endpoint, 0)
+        if not cost or self.daily_units <= 0:
+            return True
+        with self._locked(save=True):
+            if not self._affordable_locked(cost):
+                self.rejected += 1
+                return False
+            self._tokens -= cost
+            self.spent_today += cost
+            return True
+
+    def refund(self, endpoint):
+        """Give back the units of a call that never reached the API"""
+        cost = self.costs.get(endpoint, 0)
+        if not cost or self.daily_units <= 0:
+            return
+        with self._locked(save=True):
+            self._tokens = min(self.burst, self._tokens + cost)
+            self.spent_today = max(0, self.spent_today - cost)
+
+    def retry_after(self, endpoint):
+        """Seconds until a call to `endpoint` can be paid for"""
+        cost = self.costs.get(endpoint, 0)
+        if not cost or self.daily_units <= 0:
+            return 0
+        with self._locked():
+            if self.spent_today + cost > self.daily_units:
+                return math.ceil((self._day + 1) * 86400 + self.reset_hour * 3600 - time.time())
+            missing = cost - self._tokens
+            return max(1, math.ceil(missing * 86400 / self.daily_units)) if missing > 0 else 0
+
+    def stats(self):
+        with self._locked():
+            return {
+                "daily_units": self.daily_units,
+                "burst": self.burst,
+                "shared": self._state_file is not None,
+                "tokens": int(self._tokens),
+                "spent_today": self.spent_today,
+                "rejected": self.rejected,
+            }
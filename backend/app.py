@@ -1,18 +1,61 @@
-from flask import Flask, jsonify, request, send_from_directory, abort
+from flask import (
+    Flask, Response, abort, after_this_request, g, has_request_context, request, send_file, stream_with_context,
+)
 from flask_cors import CORS
-import requests
 import os
 from dotenv import load_dotenv
 import logging
 import time
 import base64
+import hashlib
+from typing import List, NamedTuple, Optional
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from cache import TTLCache, make_key, normalize_text
+from http_client import UpstreamClient, parse_timeouts
+from admission import AdmissionLimiter, Overloaded, QuotaBudget
+from breaker import CircuitBreaker
+from singleflight import SingleFlight
+from batcher import VideoDetailsBatcher
+from warmer import SnapshotWarmer
+from catalog import SongCatalog, song_key
+from merge import SongMerger, clean_title
+from suggest import PrefixIndex
+from thumbnails import (
+    FORMATS as THUMB_FORMATS,
+    IMAGE_ID_RE,
+    PLACEHOLDER_SVG,
+    PLACEHOLDER_URL,
+    SOURCES as THUMB_SOURCES,
+    DiskLRU,
+    ThumbnailStore,
+    absolute_thumb_urls,
+    snap_size,
+    spotify_thumb_url,
+    thumb_url,
+)
+from static_assets import AssetManifest, parse_etags
+from metrics import MetricsRegistry
+from models import (
+    SearchCursor,
+    Song,
+    decode_cursor,
+    encode_cursor,
+    decode_batch_request,
+    json_encoder,
+    spotify_search_decoder,
+    youtube_search_decoder,
+    youtube_videos_decoder,
+)
 
 # Load environment variables from .env 
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Providers", "Retry-After"])
 
 # Configure logging
 logging.basicConfig(
@@ -21,6 +64,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except Exception:
+        return default
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except Exception:
+        return default
+
 # Configuration
 class Config:
     # API Keys 
@@ -28,11 +83,13 @@ class Config:
     SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
     SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 
-    # URLs
-    YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
-    YOUTUBE_VIDEO_URL = "https://www.googleapis.com/youtube/v3/videos"
-    SPOTIFY_AUTH_URL = "https://accounts.spotify.com/api/token"
-    SPOTIFY_SEARCH_URL = "https://api.spotify.com/v1/search"
+    # URLs (overridable so benchmarks can point at local stand-ins)
+    YOUTUBE_SEARCH_URL = os.getenv("YOUTUBE_SEARCH_URL", "https://www.googleapis.com/youtube/v3/search")
+    YOUTUBE_VIDEO_URL = os.getenv("YOUTUBE_VIDEO_URL", "https://www.googleapis.com/youtube/v3/videos")
+    SPOTIFY_AUTH_URL = os.getenv("SPOTIFY_AUTH_URL", "https://accounts.spotify.com/api/token")
+    SPOTIFY_SEARCH_URL = os.getenv("SPOTIFY_SEARCH_URL", "https://api.spotify.com/v1/search")
+    THUMB_YOUTUBE_URL = os.getenv("THUMB_YOUTUBE_URL", "https://i.ytimg.com/vi/{id}/hqdefault.jpg")
+    THUMB_SPOTIFY_URL = os.getenv("THUMB_SPOTIFY_URL", "https://i.scdn.co/image/{id}")
 
     DEBUG = os.getenv("FLASK_DEBUG", "True").lower() == "true"
     try:
@@ -40,15 +97,305 @@ class Config:
     except Exception:
         PORT = 5000
 
+    # Search result cache (seconds / entries / bytes, 0 bytes = no byte budget)
+    SEARCH_CACHE_TTL = _env_int("SEARCH_CACHE_TTL", 600)
+    SEARCH_CACHE_STALE_TTL = _env_int("SEARCH_CACHE_STALE_TTL", 3600)
+    SEARCH_CACHE_MAX_ENTRIES = _env_int("SEARCH_CACHE_MAX_ENTRIES", 1024)
+    SEARCH_CACHE_MAX_BYTES = _env_int("SEARCH_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+
+    # Provider fan-out (threads shared by all requests / per-request budget in ms)
+    PROVIDER_POOL_SIZE = _env_int("PROVIDER_POOL_SIZE", 16)
+    SEARCH_DEADLINE_MS = _env_int("SEARCH_DEADLINE_MS", 8000)
+
+    # Batch search (artists per request, threads shared by all batches, their provider
+    # threads (kept apart from PROVIDER_POOL_SIZE so batches cannot starve /api/search),
+    # per-batch budget in ms, how long a batch's videos.list lookups wait for each other in ms)
+    BATCH_MAX_ARTISTS = _env_int("BATCH_MAX_ARTISTS", 25)
+    BATCH_POOL_SIZE = _env_int("BATCH_POOL_SIZE", 8)
+    BATCH_PROVIDER_POOL_SIZE = _env_int("BATCH_PROVIDER_POOL_SIZE", 2 * BATCH_POOL_SIZE)
+    BATCH_DEADLINE_MS = _env_int("BATCH_DEADLINE_MS", 15000)
+    BATCH_VIDEO_WINDOW_MS = _env_int("BATCH_VIDEO_WINDOW_MS", 50)
+
+    # Cross-provider merge (title trigram similarity, artist containment, max duration gap in s)
+    MERGE_TITLE_THRESHOLD = _env_float("MERGE_TITLE_THRESHOLD", 0.75)
+    MERGE_ARTIST_THRESHOLD = _env_float("MERGE_ARTIST_THRESHOLD", 0.5)
+    MERGE_DURATION_TOLERANCE = _env_int("MERGE_DURATION_TOLERANCE", 45)
+
+    # videos.list batching (collection window in ms) and the id-keyed details cache
+    VIDEO_BATCH_WINDOW_MS = _env_int("VIDEO_BATCH_WINDOW_MS", 5)
+    VIDEO_DETAILS_CACHE_TTL = _env_int("VIDEO_DETAILS_CACHE_TTL", 7 * 24 * 3600)
+    VIDEO_DETAILS_CACHE_MAX_ENTRIES = _env_int("VIDEO_DETAILS_CACHE_MAX_ENTRIES", 50000)
+
+    # Local song catalog (SQLite file, and how old a catalog hit may be in seconds)
+    CATALOG_PATH = os.getenv(
+        "CATALOG_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.db"),
+    )
+    CATALOG_MAX_AGE = _env_int("CATALOG_MAX_AGE", 24 * 3600)
+
+    # HTTP caching of API responses (Cache-Control per endpoint, ETag memory in seconds)
+    SEARCH_CACHE_CONTROL = os.getenv("SEARCH_CACHE_CONTROL", "public, max-age=300, stale-while-revalidate=3600")
+    MOOD_CACHE_CONTROL = os.getenv("MOOD_CACHE_CONTROL", "public, max-age=600, stale-while-revalidate=1800")
+    PLAY_CACHE_CONTROL = os.getenv("PLAY_CACHE_CONTROL", "public, max-age=31536000, immutable")
+    FALLBACK_CACHE_CONTROL = os.getenv("FALLBACK_CACHE_CONTROL", "no-cache")
+    RESPONSE_ETAG_TTL = _env_int("RESPONSE_ETAG_TTL", 60)
+
+    # Prometheus metrics (per-worker dumps are merged from this directory)
+    METRICS_DIR = os.getenv("METRICS_DIR") or None
+    METRICS_FLUSH_INTERVAL = _env_float("METRICS_FLUSH_INTERVAL", 5.0)
+
+    # Static frontend (precompressed variants dir, dev-mode rebuild on file changes)
+    STATIC_CACHE_DIR = os.getenv(
+        "STATIC_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "static"),
+    )
+    STATIC_WATCH = os.getenv("STATIC_WATCH", "False").lower() == "true"
+
+    # Artist autocomplete (index snapshot file, seconds between snapshots, max names kept)
+    SUGGEST_SNAPSHOT_PATH = os.getenv(
+        "SUGGEST_SNAPSHOT_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "suggest.json"),
+    )
+    SUGGEST_SNAPSHOT_INTERVAL = _env_float("SUGGEST_SNAPSHOT_INTERVAL", 60.0)
+    SUGGEST_MAX_NAMES = _env_int("SUGGEST_MAX_NAMES", 50000)
+    SUGGEST_CACHE_CONTROL = os.getenv("SUGGEST_CACHE_CONTROL", "public, max-age=300")
+
+    # Thumbnail proxy (disk cache dir and byte budget, default edge in px, encoder quality,
+    # seconds a failed CDN fetch is not retried, public origin of the proxy URLs in responses;
+    # empty uses the request's, which needs a proxy passing the Host header through)
+    THUMB_CACHE_DIR = os.getenv(
+        "THUMB_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "thumbs"),
+    )
+    THUMB_CACHE_MAX_BYTES = _env_int("THUMB_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+    THUMB_DEFAULT_SIZE = _env_int("THUMB_DEFAULT_SIZE", 120)
+    THUMB_QUALITY = _env_int("THUMB_QUALITY", 80)
+    THUMB_CACHE_CONTROL = os.getenv("THUMB_CACHE_CONTROL", "public, max-age=31536000, immutable")
+    THUMB_FAILURE_TTL = _env_int("THUMB_FAILURE_TTL", 60)
+    PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
+
+    # Mood playlist warmer (refresh interval in seconds, +/- jitter fraction, snapshot file shared
+    # by the workers, of which one refreshes). A refresh costs ~808 YouTube quota units
+    # (8 search.list + 8 videos.list), so every 6h is ~3.2k of the default 10k units a day.
+    MOOD_WARMER_ENABLED = os.getenv("MOOD_WARMER_ENABLED", "True").lower() == "true"
+    MOOD_REFRESH_INTERVAL = _env_int("MOOD_REFRESH_INTERVAL", 6 * 3600)
+    MOOD_REFRESH_JITTER = _env_float("MOOD_REFRESH_JITTER", 0.1)
+    MOOD_SNAPSHOT_PATH = os.getenv(
+        "MOOD_SNAPSHOT_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "moods.json"),
+    )
+
+    # Upstream HTTP client (pool sizes, GET retries, connect/read timeouts in seconds)
+    UPSTREAM_POOL_CONNECTIONS = _env_int("UPSTREAM_POOL_CONNECTIONS", 10)
+    UPSTREAM_POOL_MAXSIZE = _env_int("UPSTREAM_POOL_MAXSIZE", 16)
+    UPSTREAM_RETRIES = _env_int("UPSTREAM_RETRIES", 2)
+    UPSTREAM_BACKOFF = _env_float("UPSTREAM_BACKOFF", 0.2)
+    UPSTREAM_CONNECT_TIMEOUT = _env_float("UPSTREAM_CONNECT_TIMEOUT", 3.05)
+    UPSTREAM_READ_TIMEOUT = _env_float("UPSTREAM_READ_TIMEOUT", 12)
+    # e.g. "youtube_search=3:10,spotify_auth=2:5"
+    UPSTREAM_TIMEOUTS = parse_timeouts(os.getenv("UPSTREAM_TIMEOUTS", "spotify_auth=3.05:10"))
+
+    # ASGI server (asgi.py): threads for the routes still run by Flask, cap on open upstream
+    # connections per worker (0 = none; like the threaded client, extra connections are not pooled)
+    ASGI_THREADS = _env_int("ASGI_THREADS", 8)
+    ASGI_MAX_CONNECTIONS = _env_int("ASGI_MAX_CONNECTIONS", 0)
+
+    # Per-provider circuit breakers (recent-call window, bad-call fraction that opens it,
+    # calls slower than this count as bad, seconds to stay open before probing)
+    BREAKER_WINDOW = _env_int("BREAKER_WINDOW", 20)
+    BREAKER_MIN_CALLS = _env_int("BREAKER_MIN_CALLS", 5)
+    BREAKER_FAILURE_RATE = _env_float("BREAKER_FAILURE_RATE", 0.5)
+    BREAKER_SLOW_CALL_SECONDS = _env_float("BREAKER_SLOW_CALL_SECONDS", 5.0)
+    BREAKER_OPEN_SECONDS = _env_float("BREAKER_OPEN_SECONDS", 30.0)
+
+    # Adaptive read timeouts: multiplier x latency percentile per endpoint, never below
+    # the minimum or above UPSTREAM_READ_TIMEOUT (percentile 0 = fixed timeouts)
+    ADAPTIVE_TIMEOUT_PERCENTILE = _env_float("ADAPTIVE_TIMEOUT_PERCENTILE", 99)
+    ADAPTIVE_TIMEOUT_MULTIPLIER = _env_float("ADAPTIVE_TIMEOUT_MULTIPLIER", 3.0)
+    ADAPTIVE_TIMEOUT_MIN = _env_float("ADAPTIVE_TIMEOUT_MIN", 1.0)
+
+    # Admission control for search, batch and mood requests that go upstream (requests at once
+    # per process, how many more may wait, longest wait in ms); the ASGI server's own limits.
+    # Requests can only be turned away by a free thread: gunicorn.conf.py runs limit + queue + 8.
+    ADMISSION_LIMIT = _env_int("ADMISSION_LIMIT", 8)
+    ADMISSION_QUEUE = _env_int("ADMISSION_QUEUE", 16)
+    ADMISSION_MAX_WAIT_MS = _env_int("ADMISSION_MAX_WAIT_MS", 1000)
+    ASGI_ADMISSION_LIMIT = _env_int("ASGI_ADMISSION_LIMIT", 128)
+    ASGI_ADMISSION_QUEUE = _env_int("ASGI_ADMISSION_QUEUE", 256)
+
+    # YouTube Data API quota budget (units per day, 0 = unlimited; most units one spike may
+    # spend; hour in UTC the quota resets; state file the workers share it through, or empty
+    # for a budget per process, which then needs the key's quota split across workers)
+    YOUTUBE_DAILY_QUOTA = _env_int("YOUTUBE_DAILY_QUOTA", 10000)
+    YOUTUBE_QUOTA_BURST = _env_int("YOUTUBE_QUOTA_BURST", 2500)
+    YOUTUBE_QUOTA_RESET_HOUR = _env_int("YOUTUBE_QUOTA_RESET_HOUR", 8)
+    YOUTUBE_QUOTA_STATE_PATH = os.getenv(
+        "YOUTUBE_QUOTA_STATE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "youtube_quota.json"),
+    )
+    # Units the mood warmer (~3.2k a day at the default interval) leaves for searches: a refresh
+    # skips moods, keeping their last playlist, rather than take the bucket or the day below this
+    YOUTUBE_WARMER_RESERVE = _env_int("YOUTUBE_WARMER_RESERVE", 1500)
+
 config = Config()
 
+# -------------------------
+# Metrics
+# -------------------------
+metrics = MetricsRegistry(directory=config.METRICS_DIR, flush_interval=config.METRICS_FLUSH_INTERVAL)
+REQUEST_LATENCY = metrics.histogram(
+    "sangam_http_request_duration_seconds", "Request latency by route, method and status"
+)
+UPSTREAM_LATENCY = metrics.histogram(
+    "sangam_upstream_request_duration_seconds", "Upstream API call latency by endpoint and status"
+)
+FALLBACKS = metrics.counter("sangam_fallback_total", "Responses served from sample data")
+BATCH_SEARCHES = metrics.counter(
+    "sangam_batch_search_artists_total", "Artists searched through /api/search/batch by outcome"
+)
+CATALOG_HITS = metrics.counter("sangam_catalog_hits_total", "Search pages that started from the local catalog")
+QUOTA_UNITS = metrics.counter(
+    "sangam_youtube_quota_units_total", "Estimated YouTube Data API quota units spent"
+)
+SHED_REQUESTS = metrics.counter(
+    "sangam_shed_requests_total", "Requests turned away by admission control, by route and outcome"
+)
+# YouTube Data API quota cost per call
+YOUTUBE_QUOTA_COST = {"youtube_search": 100, "youtube_videos": 1}
+
+def record_upstream(endpoint, status, seconds):
+    UPSTREAM_LATENCY.observe(seconds, endpoint=endpoint, status=str(status))
+    cost = YOUTUBE_QUOTA_COST.get(endpoint)
+    if cost and status != "error":
+        QUOTA_UNITS.inc(cost, endpoint=endpoint)
+
+breakers = {
+    provider: CircuitBreaker(
+        provider,
+        window=config.BREAKER_WINDOW,
+        min_calls=config.BREAKER_MIN_CALLS,
+        failure_rate=config.BREAKER_FAILURE_RATE,
+        slow_call_seconds=config.BREAKER_SLOW_CALL_SECONDS,
+        open_seconds=config.BREAKER_OPEN_SECONDS,
+    )
+    for provider in ("youtube", "spotify")
+}
+ENDPOINT_PROVIDERS = {
+    "youtube_search": "youtube",
+    "youtube_videos": "youtube",
+    "spotify_auth": "spotify",
+    "spotify_search": "spotify",
+}
+
+# Calls the budget cannot pay for are not made; the provider is then served from cache
+youtube_quota = QuotaBudget(
+    "youtube",
+    daily_units=config.YOUTUBE_DAILY_QUOTA,
+    burst=config.YOUTUBE_QUOTA_BURST,
+    costs=YOUTUBE_QUOTA_COST,
+    reset_hour=config.YOUTUBE_QUOTA_RESET_HOUR,
+    path=config.YOUTUBE_QUOTA_STATE_PATH or None,
+)
+
+def provider_available(provider):
+    """False while the provider's breaker is open or the quota budget cannot pay for a search"""
+    if breakers[provider].is_open():
+        return False
+    return provider != "youtube" or youtube_quota.available("youtube_search")
+
+upstream = UpstreamClient(
+    pool_connections=config.UPSTREAM_POOL_CONNECTIONS,
+    pool_maxsize=config.UPSTREAM_POOL_MAXSIZE,
+    retries=config.UPSTREAM_RETRIES,
+    backoff=config.UPSTREAM_BACKOFF,
+    timeout=(config.UPSTREAM_CONNECT_TIMEOUT, config.UPSTREAM_READ_TIMEOUT),
+    timeouts=config.UPSTREAM_TIMEOUTS,
+    on_response=record_upstream,
+    breakers={endpoint: breakers[provider] for endpoint, provider in ENDPOINT_PROVIDERS.items()},
+    adaptive_timeout=dict(
+        percentile=config.ADAPTIVE_TIMEOUT_PERCENTILE,
+        multiplier=config.ADAPTIVE_TIMEOUT_MULTIPLIER,
+        minimum=config.ADAPTIVE_TIMEOUT_MIN,
+    ) if config.ADAPTIVE_TIMEOUT_PERCENTILE > 0 else None,
+    quota=youtube_quota,
+)
+
+# Requests that may be waiting on upstream calls at once; the rest get local data or a 503
+admission = AdmissionLimiter(
+    "upstream",
+    limit=config.ADMISSION_LIMIT,
+    max_queue=config.ADMISSION_QUEUE,
+    max_wait=config.ADMISSION_MAX_WAIT_MS / 1000,
+)
+
+catalog = SongCatalog(config.CATALOG_PATH)
+
 # -------------------------
 # Music API Service
 # -------------------------
+# Provider requests are written once, as generators that yield the I/O they need
+# (an UpstreamCall, a VideoDetailsLookup or SPOTIFY_TOKEN) and get its result back.
+# MusicAPIService runs them on the calling thread; asgi.py runs them on the event loop.
+class UpstreamCall(NamedTuple):
+    method: str
+    endpoint: str
+    url: str
+    kwargs: dict
+
+class VideoDetailsLookup(NamedTuple):
+    video_ids: list
+    window_ms: Optional[int] = None
+
+SPOTIFY_TOKEN = "spotify_token"
+
 class MusicAPIService:
-    def __init__(self):
+    def __init__(self, client):
+        self.client = client
         self.spotify_token = None
         self.spotify_token_expires = 0
+        self.search_cache = TTLCache(
+            name="search",
+            ttl=config.SEARCH_CACHE_TTL,
+            stale_ttl=config.SEARCH_CACHE_STALE_TTL,
+            max_entries=config.SEARCH_CACHE_MAX_ENTRIES,
+            max_bytes=config.SEARCH_CACHE_MAX_BYTES,
+        )
+        # Concurrent identical fetches (and token refreshes) share one upstream call
+        self.inflight = SingleFlight()
+        # videos.list lookups from concurrent searches are merged, up to 50 ids per call
+        self.video_details = VideoDetailsBatcher(
+            self._fetch_video_details,
+            window_ms=config.VIDEO_BATCH_WINDOW_MS,
+            max_batch=50,
+            cache=TTLCache(
+                name="video",
+                ttl=config.VIDEO_DETAILS_CACHE_TTL,
+                stale_ttl=0,
+                max_entries=config.VIDEO_DETAILS_CACHE_MAX_ENTRIES,
+            ),
+        )
+
+    def _run(self, flow):
+        """Drive a provider flow to its return value, performing each step it yields"""
+        reply, error = None, None
+        while True:
+            try:
+                step = flow.send(reply) if error is None else flow.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                reply, error = self._perform(step), None
+            except Exception as e:
+                reply, error = None, e
+
+    def _perform(self, step):
+        if step is SPOTIFY_TOKEN:
+            return self.get_spotify_token()
+        if isinstance(step, VideoDetailsLookup):
+            return self.video_details.get(
+                step.video_ids, timeout=config.SEARCH_DEADLINE_MS / 1000, window_ms=step.window_ms
+            )
+        return getattr(self.client, step.method)(step.endpoint, step.url, **step.kwargs)
 
     def get_spotify_token(self):
         current_time = time.time()
@@ -59,33 +406,46 @@ class MusicAPIService:
             logger.info("Spotify credentials missing -> skipping Spotify auth")
             return None
 
+        return self.inflight.do("spotify_token", lambda: self._run(self._spotify_token_flow()))
+
+    def _spotify_token_flow(self):
+        current_time = time.time()
+        # Another caller may have refreshed the token while we were waiting
+        if self.spotify_token and current_time < self.spotify_token_expires:
+            return self.spotify_token
+
         try:
-            # Create base64 encoded credentials
-            credentials = f"{config.SPOTIFY_CLIENT_ID}:{config.SPOTIFY_CLIENT_SECRET}"
-            credentials_b64 = base64.b64encode(credentials.encode()).decode()
-            
-            resp = requests.post(
-                config.SPOTIFY_AUTH_URL,
-                data={"grant_type": "client_credentials"},
-                headers={
-                    "Authorization": f"Basic {credentials_b64}",
-                    "Content-Type": "application/x-www-form-urlencoded"
-                },
-                timeout=10,
-            )
-            if resp.status_code == 200:
-                token_data = resp.json()
-                self.spotify_token = token_data.get("access_token")
-                expires_in = int(token_data.get("expires_in", 3600))
-                self.spotify_token_expires = current_time + expires_in - 60
-                logger.info("Spotify token obtained successfully")
-                return self.spotify_token
-            else:
-                logger.warning("Spotify auth failed: %s %s", resp.status_code, resp.text)
+            resp = yield UpstreamCall("post", "spotify_auth", config.SPOTIFY_AUTH_URL, self._spotify_auth_request())
+            return self._store_spotify_token(resp, current_time)
         except Exception as e:
             logger.error("Spotify auth error: %s", e)
         return None
 
+    def _spotify_auth_request(self):
+        """Form body and headers of a client-credentials token request"""
+        # Create base64 encoded credentials
+        credentials = f"{config.SPOTIFY_CLIENT_ID}:{config.SPOTIFY_CLIENT_SECRET}"
+        credentials_b64 = base64.b64encode(credentials.encode()).decode()
+        return {
+            "data": {"grant_type": "client_credentials"},
+            "headers": {
+                "Authorization": f"Basic {credentials_b64}",
+                "Content-Type": "application/x-www-form-urlencoded"
+            },
+        }
+
+    def _store_spotify_token(self, resp, requested_at):
+        """Keep the token from a token response; returns it, or None if auth failed"""
+        if resp.status_code == 200:
+            token_data = resp.json()
+            self.spotify_token = token_data.get("access_token")
+            expires_in = int(token_data.get("expires_in", 3600))
+            self.spotify_token_expires = requested_at + expires_in - 60
+            logger.info("Spotify token obtained successfully")
+            return self.spotify_token
+        logger.warning("Spotify auth failed: %s %s", resp.status_code, resp.text)
+        return None
+
     def format_duration(self, ms):
         try:
             seconds = int(ms // 1000)
@@ -94,103 +454,133 @@ class MusicAPIService:
         except Exception:
             return "4:20"
 
-    def clean_title(self, title):
-        # Remove common video-specific text
-        remove_terms = [
-            "Official Video", "Official Music Video", "Official Audio", 
-            "Video Song", "Full Video", "HD Video", "Lyrical Video",
-            "Official Lyric Video", "Music Video", "[Official Video]",
-            "| Official Video", "- Official Video"
-        ]
-        cleaned = title
-        for term in remove_terms:
-            cleaned = cleaned.replace(term, "").strip()
-        return cleaned
+    def _cached_page(self, key, fetch, provider, index_artists=True):
+        """
+        Cached, coalesced (songs, next_page) for one provider page; empty pages
+        are not cached. While the provider's breaker is open (or its quota
+        budget is spent) only the cache (fresh or stale) is consulted.
+        """
+        def load():
+            songs, next_page = self.inflight.do(key, fetch)
+            return (songs, next_page) if songs else None
+
+        if not provider_available(provider):
+            page = self.search_cache.peek(key)
+        else:
+            page = self.search_cache.get_or_load(key, load)
+        return self._served_page(page, index_artists)
+
+    def cached_search_page(self, provider, artist, max_results, page):
+        """(songs, next_page) of a provider search page from the cache alone (even stale)"""
+        return self._served_page(self.search_cache.peek(make_key(provider, artist, max_results, page)))
+
+    def _served_page(self, page, index_artists=True):
+        if not page:
+            return [], None
+        songs, next_page = page
+        if index_artists:
+            artist_index.add(song_artists(songs))
+        return list(songs), next_page
 
     def search_youtube_songs(self, artist, max_results=10):
+        return self.search_youtube_page(artist, max_results)[0]
+
+    def search_youtube_page(self, artist, max_results=10, page_token=""):
+        """One page of YouTube songs plus the nextPageToken (None when exhausted)"""
+        key = make_key("youtube", artist, max_results, page_token)
+        return self._cached_page(
+            key, lambda: self._run(self._youtube_page_flow(artist, max_results, page_token)), "youtube"
+        )
+
+    def _youtube_page_flow(self, artist, max_results=10, page_token=""):
         if not config.YOUTUBE_API_KEY:
             logger.warning("YouTube API key not provided")
-            return []
+            return [], None
         try:
             # Search for videos
-            search_resp = requests.get(
-                config.YOUTUBE_SEARCH_URL,
-                params={
-                    "key": config.YOUTUBE_API_KEY,
-                    "q": f"{artist} hindi bollywood songs",
-                    "part": "snippet",
-                    "maxResults": max_results,
-                    "type": "video",
-                    "regionCode": "IN",
-                    "videoCategoryId": "10",  
-                },
-                timeout=12,
-            )
+            search_resp = yield UpstreamCall("get", "youtube_search", config.YOUTUBE_SEARCH_URL, {
+                "params": self._youtube_search_params(f"{artist} hindi bollywood songs", max_results, page_token),
+            })
             
             if search_resp.status_code != 200:
                 logger.error("YouTube search failed: %s", search_resp.text)
-                return []
+                return [], None
                 
-            search_data = search_resp.json()
-            video_ids = [item["id"]["videoId"] for item in search_data.get("items", [])]
+            search_data = youtube_search_decoder.decode(search_resp.content)
+            video_ids = [item.id.videoId for item in search_data.items if item.id.videoId]
             
             if not video_ids:
-                return []
-            
-            # Get detailed video information
-            video_resp = requests.get(
-                config.YOUTUBE_VIDEO_URL,
-                params={
-                    "key": config.YOUTUBE_API_KEY,
-                    "id": ",".join(video_ids),
-                    "part": "snippet,contentDetails,statistics"
-                },
-                timeout=12,
-            )
-            
-            if video_resp.status_code != 200:
-                logger.error("YouTube video details failed: %s", video_resp.text)
-                return []
-            
-            video_data = video_resp.json()
-            songs = []
+                return [], None
             
-            for item in video_data.get("items", []):
-                snippet = item.get("snippet", {})
-                content_details = item.get("contentDetails", {})
-                video_id = item.get("id")
-                
-                # Parse duration
-                duration_iso = content_details.get("duration", "PT4M20S")
-                duration = self.parse_youtube_duration(duration_iso)
-                
-                # Getting best thumbnail
-                thumbnails = snippet.get("thumbnails", {})
-                thumbnail_url = (
-                    thumbnails.get("maxres", {}).get("url") or
-                    thumbnails.get("high", {}).get("url") or
-                    thumbnails.get("medium", {}).get("url") or
-                    thumbnails.get("default", {}).get("url")
-                )
-                
-                songs.append({
-                    "title": self.clean_title(snippet.get("title", "Unknown")),
-                    "artist": artist,
-                    "youtube_id": video_id,
-                    "thumbnail": thumbnail_url,
-                    "year": snippet.get("publishedAt", "")[:4],
-                    "duration": duration,
-                    "source": "youtube",
-                    "play_url": f"https://www.youtube.com/watch?v={video_id}",
-                    "embed_url": f"https://www.youtube.com/embed/{video_id}?autoplay=1"
-                })
+            # Get detailed video information (batched with concurrent searches)
+            details = yield VideoDetailsLookup(video_ids, video_window.get())
+            songs = self._youtube_songs(artist, video_ids, details)
             
             logger.info(f"Found {len(songs)} YouTube songs for {artist}")
-            return songs
+            catalog.add(songs)
+            return songs, search_data.nextPageToken
             
         except Exception as e:
             logger.error("YouTube search error: %s", e)
-        return []
+        return [], None
+
+    def _youtube_search_params(self, query, max_results, page_token=None):
+        return {
+            "key": config.YOUTUBE_API_KEY,
+            "q": query,
+            "part": "snippet",
+            "maxResults": max_results,
+            "type": "video",
+            "regionCode": "IN",
+            "videoCategoryId": "10",
+            "pageToken": page_token or None,
+        }
+
+    def _youtube_songs(self, artist, video_ids, details):
+        """Songs for the searched video ids that videos.list returned, in search order"""
+        return [
+            self._video_song(
+                video_id, details[video_id].snippet, artist,
+                self.parse_youtube_duration(details[video_id].contentDetails.duration),
+            )
+            for video_id in video_ids
+            if video_id in details
+        ]
+
+    def _video_song(self, video_id, snippet, artist, duration):
+        return Song(
+            title=clean_title(snippet.title),
+            artist=artist,
+            youtube_id=video_id,
+            thumbnail=thumb_url("youtube", video_id),
+            year=snippet.publishedAt[:4],
+            duration=duration,
+            source="youtube",
+            play_url=f"https://www.youtube.com/watch?v={video_id}",
+            embed_url=f"https://www.youtube.com/embed/{video_id}?autoplay=1",
+        )
+
+    def _fetch_video_details(self, video_ids):
+        """Fetch videos.list for up to 50 ids -> {video_id: YouTubeVideo}"""
+        return self._run(self._video_details_flow(video_ids))
+
+    def _video_details_flow(self, video_ids):
+        resp = yield UpstreamCall(
+            "get", "youtube_videos", config.YOUTUBE_VIDEO_URL, {"params": self._video_details_params(video_ids)}
+        )
+        return self._video_details(resp)
+
+    def _video_details_params(self, video_ids):
+        return {
+            "key": config.YOUTUBE_API_KEY,
+            "id": ",".join(video_ids),
+            "part": "snippet,contentDetails,statistics"
+        }
+
+    def _video_details(self, resp):
+        if resp.status_code != 200:
+            raise RuntimeError(f"YouTube video details failed: {resp.status_code} {resp.text}")
+        return {video.id: video for video in youtube_videos_decoder.decode(resp.content).items}
 
     def parse_youtube_duration(self, duration_iso):
         """Parse ISO 8601 duration format (PT4M20S) to MM:SS"""
@@ -209,260 +599,1061 @@ class MusicAPIService:
         return "4:20"
 
     def search_spotify_songs(self, artist, max_results=10):
-        token = self.get_spotify_token()
+        return self.search_spotify_page(artist, max_results)[0]
+
+    def search_spotify_page(self, artist, max_results=10, offset=0):
+        """One page of Spotify songs plus the next offset (None when exhausted)"""
+        key = make_key("spotify", artist, max_results, offset)
+        return self._cached_page(
+            key, lambda: self._run(self._spotify_page_flow(artist, max_results, offset)), "spotify"
+        )
+
+    def _spotify_page_flow(self, artist, max_results=10, offset=0):
+        token = yield SPOTIFY_TOKEN
         if not token:
             logger.warning("Spotify token not available")
-            return []
+            return [], None
         try:
-            resp = requests.get(
-                config.SPOTIFY_SEARCH_URL,
-                headers={"Authorization": f"Bearer {token}"},
-                params={
-                    "q": f'artist:"{artist}" genre:bollywood OR genre:hindi OR genre:indian',
-                    "type": "track", 
-                    "limit": max_results,
-                    "market": "IN"
-                },
-                timeout=12,
-            )
+            resp = yield UpstreamCall("get", "spotify_search", config.SPOTIFY_SEARCH_URL, {
+                "headers": {"Authorization": f"Bearer {token}"},
+                "params": self._spotify_search_params(artist, max_results, offset),
+            })
             
             if resp.status_code != 200:
                 logger.error("Spotify search failed: %s", resp.text)
-                return []
-                
-            tracks = resp.json().get("tracks", {}).get("items", [])
-            songs = []
-            
-            for track in tracks:
-                # Getting best thumbnail
-                images = track.get("album", {}).get("images", [])
-                thumbnail_url = images[0]["url"] if images else None
-                
-                # Getting artist names
-                artists = [artist.get("name") for artist in track.get("artists", [])]
+                return [], None
                 
-                songs.append({
-                    "title": track.get("name"),
-                    "artist": ", ".join(artists),
-                    "album": track.get("album", {}).get("name"),
-                    "spotify_id": track.get("id"),
-                    "preview_url": track.get("preview_url"),
-                    "thumbnail": thumbnail_url,
-                    "duration": self.format_duration(track.get("duration_ms", 0)),
-                    "year": track.get("album", {}).get("release_date", "")[:4],
-                    "source": "spotify",
-                    "play_url": track.get("external_urls", {}).get("spotify"),
-                    "embed_url": f"https://open.spotify.com/embed/track/{track.get('id')}"
-                })
+            page = spotify_search_decoder.decode(resp.content).tracks
+            songs = self._spotify_songs(page.items)
             
             logger.info(f"Found {len(songs)} Spotify songs for {artist}")
-            return songs
+            catalog.add(songs)
+            return songs, (offset + len(page.items) if page.next else None)
             
         except Exception as e:
             logger.error("Spotify search error: %s", e)
-        return []
+        return [], None
+
+    def _spotify_search_params(self, artist, max_results, offset):
+        return {
+            "q": f'artist:"{artist}" genre:bollywood OR genre:hindi OR genre:indian',
+            "type": "track", 
+            "limit": max_results,
+            "offset": offset,
+            "market": "IN"
+        }
+
+    def _spotify_songs(self, tracks):
+        songs = []
+        for track in tracks:
+            # Getting best thumbnail (served through the thumbnail proxy)
+            images = track.album.images
+            thumbnail_url = spotify_thumb_url(images[0].url) if images else None
+            
+            # Getting artist names
+            artists = [a.name for a in track.artists if a.name]
+            
+            songs.append(Song(
+                title=track.name or "Unknown",
+                artist=", ".join(artists),
+                album=track.album.name,
+                spotify_id=track.id,
+                preview_url=track.preview_url,
+                thumbnail=thumbnail_url,
+                duration=self.format_duration(track.duration_ms),
+                year=(track.album.release_date or "")[:4],
+                source="spotify",
+                play_url=track.external_urls.get("spotify"),
+                embed_url=f"https://open.spotify.com/embed/track/{track.id}",
+            ))
+        return songs
+
+    def search_mood_page(self, query, max_results=8):
+        """
+        (songs, None) of a YouTube mood search, cached like provider pages under
+        its query. Mood songs are credited to the uploading channel, so they
+        stay out of the artist suggestions.
+        """
+        key = make_key("mood", query, max_results)
+        return self._cached_page(
+            key, lambda: self._run(self._mood_flow(query, max_results)), "youtube", index_artists=False
+        )
+
+    def _mood_flow(self, query, max_results=8):
+        try:
+            resp = yield UpstreamCall(
+                "get", "youtube_search", config.YOUTUBE_SEARCH_URL,
+                {"params": self._youtube_search_params(query, max_results)},
+            )
+
+            if resp.status_code != 200:
+                logger.error("YouTube mood search failed: %s", resp.text)
+                return [], None
+
+            items = self._mood_items(resp)
+
+            # Real durations come from videos.list; keep the old estimate if that fails
+            try:
+                details = yield VideoDetailsLookup([item.id.videoId for item in items])
+            except Exception as e:
+                logger.warning("YouTube mood durations unavailable: %s", e)
+                details = {}
+
+            songs = self._mood_songs(items, details)
+            catalog.add(songs)
+            return songs, None
+
+        except Exception as e:
+            logger.error("YouTube mood search error: %s", e)
+        return [], None
+
+    def _mood_items(self, resp):
+        return [item for item in youtube_search_decoder.decode(resp.content).items if item.id.videoId]
+
+    def _mood_songs(self, items, details):
+        """Songs credited to the uploading channel; "4:30" when the duration is unknown"""
+        songs = []
+        for item in items:
+            video = details.get(item.id.videoId)
+            duration = self.parse_youtube_duration(video.contentDetails.duration) if video else "4:30"
+            songs.append(self._video_song(item.id.videoId, item.snippet, item.snippet.channelTitle, duration))
+        return songs
+
+music_service = MusicAPIService(upstream)
+
+# -------------------------
+# Mood playlists
+# -------------------------
+# mood mapping with Indian artists
+MOOD_QUERIES = {
+    "happy": "bollywood happy songs dance",
+    "sad": "bollywood sad songs emotional arijit singh",
+    "romantic": "bollywood love songs romantic",
+    "motivation": "bollywood motivational songs inspirational",
+    "party": "bollywood party songs dance",
+    "chill": "bollywood chill relaxing songs",
+    "devotional": "hindi devotional bhajan songs",
+    "classical": "indian classical music raag"
+}
+
+MOOD_FALLBACK = {
+    "happy": [
+        {"title": "Kal Ho Naa Ho", "artist": "Sonu Nigam", "year": "2003", "duration": "5:08"},
+        {"title": "Gallan Goodiyaan", "artist": "Yashita Sharma", "year": "2014", "duration": "4:15"},
+        {"title": "London Thumakda", "artist": "Neha Kakkar", "year": "2014", "duration": "3:45"},
+    ],
+    "sad": [
+        {"title": "Tum Hi Ho", "artist": "Arijit Singh", "year": "2013", "duration": "4:22"},
+        {"title": "Channa Mereya", "artist": "Arijit Singh", "year": "2016", "duration": "4:49"},
+        {"title": "Ae Dil Hai Mushkil", "artist": "Arijit Singh", "year": "2016", "duration": "4:37"},
+    ],
+    "romantic": [
+        {"title": "Raataan Lambiyan", "artist": "Tanishk Bagchi", "year": "2021", "duration": "3:28"},
+        {"title": "Pehla Nasha", "artist": "Udit Narayan", "year": "2000", "duration": "6:12"},
+        {"title": "Tere Bina", "artist": "A.R. Rahman", "year": "2007", "duration": "5:45"},
+    ],
+    "motivation": [
+        {"title": "Zinda", "artist": "Shankar Mahadevan", "year": "2006", "duration": "5:30"},
+        {"title": "Chak De India", "artist": "Sukhwinder Singh", "year": "2007", "duration": "4:10"},
+        {"title": "Jai Ho", "artist": "A.R. Rahman", "year": "2008", "duration": "5:09"},
+    ],
+    "party": [
+        {"title": "Nagada Sang Dhol", "artist": "Osman Mir", "year": "2013", "duration": "4:32"},
+        {"title": "Tattad Tattad", "artist": "Arijit Singh", "year": "2013", "duration": "4:16"},
+        {"title": "Malhari", "artist": "Vishal Dadlani", "year": "2015", "duration": "4:32"},
+    ],
+    "chill": [
+        {"title": "Kun Faya Kun", "artist": "A.R. Rahman", "year": "2011", "duration": "7:50"},
+        {"title": "Ilahi", "artist": "Arijit Singh", "year": "2014", "duration": "5:02"},
+        {"title": "Mast Magan", "artist": "Arijit Singh", "year": "2014", "duration": "4:32"},
+    ],
+    "devotional": [
+        {"title": "Shri Hanuman Chalisa", "artist": "Hariharan", "year": "2008", "duration": "8:15"},
+        {"title": "Om Jai Jagdish Hare", "artist": "Anuradha Paudwal", "year": "1995", "duration": "6:30"},
+        {"title": "Gayatri Mantra", "artist": "Anuradha Paudwal", "year": "2000", "duration": "3:45"},
+    ],
+    "classical": [
+        {"title": "Raag Yaman", "artist": "Pandit Ravi Shankar", "year": "1960", "duration": "15:30"},
+        {"title": "Raag Bhairav", "artist": "Ustad Ali Akbar Khan", "year": "1965", "duration": "18:45"},
+        {"title": "Raag Malkauns", "artist": "Pandit Jasraj", "year": "1970", "duration": "22:15"},
+    ]
+}
+
+def warm_mood(mood):
+    """Warmer loader; None (the old playlist is kept) once the quota is down to the searches' share"""
+    if not youtube_quota.available("youtube_search", reserve=config.YOUTUBE_WARMER_RESERVE):
+        logger.info("Skipping %s mood refresh: YouTube quota budget is low", mood)
+        return None
+    return music_service.search_mood_page(MOOD_QUERIES[mood])[0]
+
+mood_warmer = SnapshotWarmer(
+    "mood",
+    MOOD_QUERIES,
+    warm_mood,
+    interval=config.MOOD_REFRESH_INTERVAL,
+    jitter=config.MOOD_REFRESH_JITTER,
+    path=config.MOOD_SNAPSHOT_PATH,
+    value_type=List[Song],
+)
+if config.MOOD_WARMER_ENABLED and config.YOUTUBE_API_KEY:
+    mood_warmer.start()
+
+# -------------------------
+# Artist suggestions
+# -------------------------
+artist_index = PrefixIndex(
+    path=config.SUGGEST_SNAPSHOT_PATH,
+    max_names=config.SUGGEST_MAX_NAMES,
+    snapshot_interval=config.SUGGEST_SNAPSHOT_INTERVAL,
+)
+# A fresh index starts from the fallback playlists (artists on several rank higher)
+if not len(artist_index):
+    artist_index.add(song["artist"] for songs in MOOD_FALLBACK.values() for song in songs)
+
+def song_artists(songs):
+    """
+    Distinct artist or channel names credited on `songs` (Spotify credits are
+    joined by ", "), so popularity counts responses rather than tracks
+    """
+    return list(dict.fromkeys(
+        name for song in songs for name in (song.artist or "").split(", ") if name
+    ))
+
+# -------------------------
+# Thumbnails
+# -------------------------
+THUMB_URLS = {"youtube": config.THUMB_YOUTUBE_URL, "spotify": config.THUMB_SPOTIFY_URL}
+
+def fetch_thumbnail(source, image_id):
+    """Original image bytes from the provider's CDN, or None"""
+    try:
+        resp = upstream.get(f"{source}_thumbnail", THUMB_URLS[source].format(id=image_id))
+    except Exception as e:
+        logger.warning("Thumbnail %s/%s fetch failed: %s", source, image_id, e)
+        return None
+    if resp.status_code != 200 or not resp.headers.get("Content-Type", "").startswith("image/"):
+        logger.warning("Thumbnail %s/%s unavailable: %s", source, image_id, resp.status_code)
+        return None
+    return resp.content
+
+thumbnails = ThumbnailStore(
+    DiskLRU(config.THUMB_CACHE_DIR, max_bytes=config.THUMB_CACHE_MAX_BYTES),
+    fetch_thumbnail,
+    quality=config.THUMB_QUALITY,
+    failure_ttl=config.THUMB_FAILURE_TTL,
+)
+
+# -------------------------
+# Provider fan-out
+# -------------------------
+provider_pool = ThreadPoolExecutor(
+    max_workers=config.PROVIDER_POOL_SIZE, thread_name_prefix="provider"
+)
+
+SEARCH_PROVIDERS = {
+    "youtube": music_service.search_youtube_page,
+    "spotify": music_service.search_spotify_page,
+}
+# Page state each provider starts from (YouTube pageToken / Spotify offset)
+FIRST_PAGES = {"youtube": "", "spotify": 0}
+# How many already-served song keys a cursor remembers for de-duplication
+CURSOR_SEEN_LIMIT = 50
+# videos.list collection window for the current search (set by batch searches, see
+# VideoDetailsBatcher); provider tasks run in a copy of the submitting context
+video_window = ContextVar("video_window", default=None)
+
+song_merger = SongMerger(
+    title_threshold=config.MERGE_TITLE_THRESHOLD,
+    artist_threshold=config.MERGE_ARTIST_THRESHOLD,
+    duration_tolerance=config.MERGE_DURATION_TOLERANCE,
+)
+
+def submit_providers(artist, limit, pages=None, pool=None):
+    """
+    Start one page fetch per provider that still has pages on `pool`
+    (provider_pool by default); returns {future: provider}
+    """
+    pages = FIRST_PAGES if pages is None else pages
+    pool = provider_pool if pool is None else pool
+    return {
+        pool.submit(copy_context().run, search, artist, limit, pages[name]): name
+        for name, search in SEARCH_PROVIDERS.items()
+        if pages.get(name) is not None
+    }
+
+def collect_providers(futures, artist, deadline_ms=None, ordered=True):
+    """
+    Yield (provider, (songs, next_page)) for every provider that answers
+    within `deadline_ms`. Ordered mode waits for the deadline and yields in
+    SEARCH_PROVIDERS order; otherwise providers are yielded as they finish.
+    Late providers keep running and still warm the cache for the next request.
+    """
+    if deadline_ms is None:
+        deadline_ms = config.SEARCH_DEADLINE_MS
+    if ordered:
+        done, _ = wait(futures, timeout=deadline_ms / 1000)
+        finished = sorted(done, key=lambda f: list(SEARCH_PROVIDERS).index(futures[f]))
+    else:
+        finished = as_completed(futures, timeout=deadline_ms / 1000)
+
+    answered = set()
+    try:
+        for future in finished:
+            answered.add(future)
+            page = finished_provider_page(futures[future], future)
+            if page is not None:
+                yield futures[future], page
+    except FuturesTimeoutError:
+        pass
+    for future in futures:
+        if future not in answered:
+            log_missed_deadline(futures[future], deadline_ms, artist)
+
+def finished_provider_page(provider, finished):
+    """(songs, next_page) of a provider fetch (future or task) that finished, or None if it failed"""
+    try:
+        return finished.result()
+    except Exception as e:
+        logger.error("%s provider error: %s", provider, e)
+        return None
 
-music_service = MusicAPIService()
+def log_missed_deadline(provider, deadline_ms, artist):
+    logger.warning("%s provider missed the %sms deadline for %s", provider, deadline_ms, artist)
+
+def fan_out_search(artist, limit, pages=None, deadline_ms=None):
+    """
+    Query every provider in parallel and wait at most `deadline_ms`.
+    Returns ({provider: (songs, next_page)}, [providers that answered in time]).
+    """
+    futures = submit_providers(artist, limit, pages)
+    results = dict(collect_providers(futures, artist, deadline_ms))
+    return results, list(results)
+
+def next_pages(pages, results):
+    """Providers in `results` advance to their next page; the rest retry the same page"""
+    pages = FIRST_PAGES if pages is None else pages
+    return {
+        name: results[name][1] if name in results else pages.get(name)
+        for name in SEARCH_PROVIDERS
+    }
+
+def merge_new_songs(served, songs, seen, limit):
+    """
+    Fold `songs` into `served` (up to `limit`) and return (added, updates).
+    The same track from another provider (or a second upload of it) is merged
+    into one canonical song instead of being listed twice; when that enriches
+    an already-served song it is replaced in place and reported in `updates`
+    as {"index", "song"}. `seen` is a dict of song keys used as an
+    insertion-ordered set and receives the keys of every merged member.
+    """
+    fresh = [song for song in songs if song_key(song) not in seen]
+    groups, changed = song_merger.merge(served, fresh)
+
+    updates = []
+    for index, (song, keys) in sorted(changed.items()):
+        seen.update(dict.fromkeys(keys))
+        if song is not served[index]:
+            served[index] = song
+            updates.append({"index": index, "song": song})
+
+    added = []
+    for song, keys in groups:
+        if len(served) >= limit:
+            break
+        seen.update(dict.fromkeys(keys))
+        served.append(song)
+        added.append(song)
+    return added, updates
 
 # -------------------------
 # Serve frontend static files
 # -------------------------
 FRONTEND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
 
+static_manifest = AssetManifest(FRONTEND_PATH, cache_dir=config.STATIC_CACHE_DIR)
+static_manifest.build()
+if config.STATIC_WATCH:
+    static_manifest.start_watcher()
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_frontend(path):
-    if not os.path.exists(FRONTEND_PATH):
+    asset = static_manifest.lookup(path)
+    if asset is None:
         return "Frontend directory not found", 404
-    
-    if path == "" or path == "index.html":
-        index_path = os.path.join(FRONTEND_PATH, "index.html")
-        if os.path.exists(index_path):
-            return send_from_directory(FRONTEND_PATH, "index.html")
-        else:
-            return "index.html not found", 404
-    
-    file_path = os.path.join(FRONTEND_PATH, path)
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        return send_from_directory(FRONTEND_PATH, path)
-    
-    # Default to index.html for SPA routing
-    index_path = os.path.join(FRONTEND_PATH, "index.html")
-    if os.path.exists(index_path):
-        return send_from_directory(FRONTEND_PATH, "index.html")
-    
-    return "File not found", 404
+    return static_manifest.serve(asset, request)
 
 # -------------------------
 # API Endpoints
 # -------------------------
-@app.route("/api/health", methods=["GET"])
-def api_health():
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            route=route, method=request.method, status=str(response.status_code),
+        )
+        metrics.ensure_flusher()
+    return response
+
+# Last ETag sent per endpoint key, so revalidations can 304 before any work is done
+response_etags = TTLCache(name="etag", ttl=config.RESPONSE_ETAG_TTL, stale_ttl=0, max_entries=4096)
+
+def payload_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def not_modified(etag, cache_control):
+    response = app.response_class(status=304)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+def public_base_url():
+    """Origin the API's own URLs are given under: PUBLIC_BASE_URL, else the request's"""
+    if config.PUBLIC_BASE_URL or not has_request_context():
+        return config.PUBLIC_BASE_URL
+    return request.host_url.rstrip("/")
+
+def encode_body(payload):
+    """JSON for a response, with absolute thumbnail URLs"""
+    return absolute_thumb_urls(json_encoder.encode(payload), public_base_url())
+
+def api_response(payload, status=200, cache_control=None, etag_key=None):
+    """
+    Encode an API payload (dicts, lists and Song structs) with msgspec.
+    With `cache_control`, the body is fingerprinted into an ETag and a
+    matching If-None-Match gets a 304; `etag_key` remembers that ETag for
+    cached_not_modified(), per origin since thumbnail URLs are absolute.
+    """
+    body = encode_body(payload)
+    if not cache_control:
+        return app.response_class(body, status=status, mimetype="application/json")
+
+    etag = payload_etag(body)
+    if etag_key is not None:
+        response_etags.set(etag_key + (public_base_url(),), (etag, cache_control))
+    if etag in parse_etags(request.headers.get("If-None-Match")):
+        return not_modified(etag, cache_control)
+    response = app.response_class(body, status=status, mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+def cached_not_modified(etag_key):
+    """304 if the client already holds the last response sent for `etag_key`, else None"""
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return None
+    entry = response_etags.get(etag_key + (public_base_url(),))
+    if entry is not None and entry[0] in parse_etags(if_none_match):
+        return not_modified(*entry)
+    return None
+
+def collect_cache_events():
+    for cache in (music_service.search_cache, music_service.video_details.cache, response_etags):
+        stats = cache.stats()
+        for result in ("hits", "stale_hits", "misses", "evictions"):
+            yield {"cache": cache.name, "result": result}, stats[result]
+
+metrics.register_collector(
+    "sangam_cache_events_total", "Cache lookups by cache and result", collect_cache_events
+)
+metrics.register_collector(
+    "sangam_singleflight_coalesced_total", "Callers that shared an in-flight upstream call",
+    lambda: [({}, music_service.inflight.stats()["coalesced"])],
+)
+
+metrics.register_collector(
+    "sangam_breaker_rejected_total", "Upstream calls rejected by an open circuit breaker",
+    lambda: [({"provider": name}, breaker.rejected) for name, breaker in breakers.items()],
+)
+metrics.register_collector(
+    "sangam_breaker_opened_total", "Times a provider circuit breaker opened",
+    lambda: [({"provider": name}, breaker.opened) for name, breaker in breakers.items()],
+)
+
+def health_payload(service, limiter):
+    """/api/health body for the server running `service` (and its client) behind `limiter`"""
     # Check API availability
     youtube_available = bool(config.YOUTUBE_API_KEY)
     spotify_available = bool(config.SPOTIFY_CLIENT_ID and config.SPOTIFY_CLIENT_SECRET)
     
-    return jsonify({
+    return {
         "success": True, 
         "message": "API is running",
         "apis": {
             "youtube": youtube_available,
             "spotify": spotify_available
-        }
-    }), 200
+        },
+        "cache": service.search_cache.stats(),
+        "upstream": service.client.stats(),
+        "breakers": {name: breaker.stats() for name, breaker in breakers.items()},
+        "admission": limiter.stats(),
+        "youtube_quota": youtube_quota.stats(),
+        "inflight": service.inflight.stats(),
+        "video_details": service.video_details.stats(),
+        "mood_warmer": mood_warmer.stats(),
+        "catalog": catalog.stats(),
+        "suggest": artist_index.stats(),
+        "thumbnails": thumbnails.stats(),
+        "static": static_manifest.stats()
+    }
+
+@app.route("/api/health", methods=["GET"])
+def api_health():
+    return api_response(health_payload(music_service, admission))
+
+def sample_songs(artist, limit):
+    return [
+        Song(
+            title=f"{artist} Song {i+1}", 
+            artist=artist, 
+            year=f"202{i % 5}", 
+            duration=f"{3 + i % 3}:{20 + i * 15 % 60:02d}", 
+            source="sample",
+            play_url=f"#sample-{i}",
+            thumbnail=PLACEHOLDER_URL,
+        )
+        for i in range(limit)
+    ]
+
+class SearchPage:
+    """
+    Merge state for one page of artist results: what has been served so far,
+    the song keys already seen (carried over from `cursor`) and which
+    provider pages were fully served. Each source's songs are turned into a
+    {"provider", "songs"[, "updates"]} chunk; closing_chunks() then adds the
+    sample fallback if needed and the final {"done", ...} chunk.
+    """
+
+    def __init__(self, artist, limit, cursor=None):
+        self.artist = artist
+        self.limit = limit
+        self.cursor = cursor
+        self.served = []
+        self.providers = []
+        self.results = {}
+        if cursor is None:
+            self.pages, self.seen = None, {}
+        else:
+            self.pages = {"youtube": cursor.youtube, "spotify": cursor.spotify}
+            self.seen = dict.fromkeys(cursor.seen)
+
+    @property
+    def full(self):
+        return len(self.served) >= self.limit
+
+    def opening_chunks(self):
+        """The catalog chunk that starts a first page, if the catalog has songs for it"""
+        if self.cursor is None:
+            chunk = self.catalog_chunk(
+                catalog.search_artist(self.artist, self.limit, max_age=config.CATALOG_MAX_AGE)
+            )
+            if chunk:
+                yield chunk
+
+    def catalog_chunk(self, songs):
+        """Chunk for songs we have already seen for this artist recently, or None"""
+        added, _ = merge_new_songs(self.served, songs, self.seen, self.limit)
+        if not added:
+            return None
+        CATALOG_HITS.inc()
+        self.providers.append("catalog")
+        return {"provider": "catalog", "songs": added}
+
+    def provider_chunk(self, name, page):
+        """Chunk for one provider's (songs, next_page), or None if it added nothing"""
+        self.providers.append(name)
+        added, updates = merge_new_songs(self.served, page[0], self.seen, self.limit)
+        # A provider only advances once its whole page has been served;
+        # otherwise the next cursor re-reads the page and `seen` skips what was sent
+        if all(song_key(song) in self.seen for song in page[0]):
+            self.results[name] = page
+        if updates:
+            return {"provider": name, "songs": added, "updates": updates}
+        if added:
+            return {"provider": name, "songs": added}
+        return None
+
+    def closing_chunks(self, sample=True):
+        # Remember merged tracks so catalog-first pages come back with both ids
+        catalog.add([song for song in self.served if song.youtube_id and song.spotify_id])
+
+        # Fallback to sample data if the first page has no results
+        if sample and not self.served and self.cursor is None:
+            FALLBACKS.inc(endpoint="search")
+            yield {"provider": "sample", "songs": sample_songs(self.artist, self.limit)}
+
+        following = next_pages(self.pages, self.results)
+        next_cursor = None
+        if any(page is not None for page in following.values()):
+            next_cursor = encode_cursor(SearchCursor(
+                artist=normalize_text(self.artist),
+                limit=self.limit,
+                youtube=following["youtube"],
+                spotify=following["spotify"],
+                seen=list(self.seen)[-CURSOR_SEEN_LIMIT:],
+            ))
+        logger.info(f"Returning {len(self.served)} songs for artist: {self.artist}")
+        yield {"done": True, "providers": self.providers, "next_cursor": next_cursor}
+
+def search_chunks(artist, limit, cursor=None, ordered=True, pool=None):
+    """
+    Yield {"provider", "songs"} chunks for one page of artist results, then a
+    final {"done", "providers", "next_cursor"} chunk. The first page starts
+    from the local catalog; later pages (`cursor`) only fetch the next slice
+    from each provider that still has results. A chunk may also carry
+    "updates": songs from earlier chunks (by position) that were merged with
+    the same track from this provider. Provider fetches run on `pool` (see
+    submit_providers()).
+    """
+    page = SearchPage(artist, limit, cursor)
+    yield from page.opening_chunks()
+
+    # Only go upstream for the shortfall; YouTube and Spotify are queried together
+    if not page.full:
+        futures = submit_providers(artist, limit, page.pages, pool)
+        for name, result in collect_providers(futures, artist, ordered=ordered):
+            chunk = page.provider_chunk(name, result)
+            if chunk:
+                yield chunk
+
+    yield from page.closing_chunks()
+
+def local_search_chunks(artist, limit, cursor=None):
+    """
+    search_chunks() from what this process already has (the catalog and
+    cached provider pages, even stale ones) without any upstream call and
+    without the sample fallback
+    """
+    page = SearchPage(artist, limit, cursor)
+    yield from page.opening_chunks()
+
+    pages = FIRST_PAGES if page.pages is None else page.pages
+    for name in SEARCH_PROVIDERS:
+        if page.full or pages.get(name) is None:
+            continue
+        result = music_service.cached_search_page(name, artist, limit, pages[name])
+        if result[0]:
+            chunk = page.provider_chunk(name, result)
+            if chunk:
+                yield chunk
+
+    yield from page.closing_chunks(sample=False)
+
+def search_page(artist, limit, cursor=None, pool=None):
+    """
+    One whole page of search_chunks():
+    (songs, providers that answered, next_cursor, sample fallback used)
+    """
+    return assemble_page(search_chunks(artist, limit, cursor, pool=pool))
+
+def assemble_page(chunks):
+    """(songs, providers that answered, next_cursor, sample fallback used) from a page's chunks"""
+    songs = []
+    fallback = False
+    for chunk in chunks:
+        if chunk.get("done"):
+            providers, next_cursor = chunk["providers"], chunk["next_cursor"]
+            continue
+        fallback = apply_chunk(songs, chunk) or fallback
+    return songs, providers, next_cursor, fallback
+
+def apply_chunk(songs, chunk):
+    """Add a search chunk to the page being assembled; True if it is the sample fallback"""
+    for update in chunk.get("updates", ()):
+        songs[update["index"]] = update["song"]
+    songs.extend(chunk["songs"])
+    return chunk["provider"] == "sample"
+
+def ndjson_line(item):
+    return encode_body(item) + b"\n"
+
+def stream_search(artist, limit, cursor):
+    """NDJSON: one line per provider as soon as it answers, then the final summary line"""
+    def generate():
+        for chunk in search_chunks(artist, limit, cursor, ordered=False):
+            yield ndjson_line(chunk)
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+def vary_on_accept(response):
+    """The search URL serves JSON or NDJSON by Accept, so caches must keep them apart"""
+    response.vary.add("Accept")
+    return response
+
+# Largest page a search may ask for (the most YouTube maxResults and Spotify limit allow)
+SEARCH_MAX_LIMIT = 50
+
+def clamp_limit(limit):
+    return max(1, min(limit, SEARCH_MAX_LIMIT))
+
+def parse_search_args(artist):
+    """
+    (cursor, limit, etag key) for a search request, raising ValueError for a bad cursor.
+    limit is clamped to 1..SEARCH_MAX_LIMIT, and the cursor token goes into the key
+    as is: it is base64, so normalizing (lowercasing) it would merge distinct cursors.
+    """
+    cursor_token = request.args.get("cursor")
+    cursor = None
+    if cursor_token:
+        cursor = decode_cursor(cursor_token)
+        if cursor.artist != normalize_text(artist):
+            raise ValueError("Cursor does not match artist")
+        limit = cursor.limit
+    else:
+        try:
+            limit = int(request.args.get("limit", 10))
+        except Exception:
+            limit = 10
+    limit = clamp_limit(limit)
+    return cursor, limit, make_key("search", artist, limit) + (cursor_token or "",)
+
+def search_request(artist):
+    """(cursor, limit, etag key) of a search request; aborts with its 400, or a 304"""
+    after_this_request(vary_on_accept)
+    try:
+        cursor, limit, etag_key = parse_search_args(artist)
+    except ValueError as e:
+        abort(api_response({"success": False, "error": str(e)}, 400))
+
+    if not wants_ndjson():
+        cached = cached_not_modified(etag_key)
+        if cached is not None:
+            abort(cached)
+    return cursor, limit, etag_key
+
+def overloaded_response(overloaded):
+    """Fast 503 telling the client when to come back"""
+    response = api_response({"success": False, "error": "Service busy, please retry"}, 503)
+    response.headers["Retry-After"] = str(overloaded.retry_after)
+    return response
+
+def shed_search_response(chunks, overloaded):
+    """
+    Response for a search turned away by admission control: its
+    local_search_chunks() (not cacheable by clients), or a 503 when there
+    are no local songs for it
+    """
+    songs, providers, next_cursor, _ = assemble_page(chunks)
+    if not songs:
+        SHED_REQUESTS.inc(route="search", outcome="rejected")
+        return overloaded_response(overloaded)
+
+    SHED_REQUESTS.inc(route="search", outcome="local")
+    if wants_ndjson():
+        return Response(b"".join(ndjson_line(chunk) for chunk in chunks), mimetype="application/x-ndjson")
+    return search_response(songs, providers, next_cursor, fallback=True, etag_key=None)
+
+def search_response(songs, completed, next_cursor, fallback, etag_key):
+    cache_control = config.SEARCH_CACHE_CONTROL
+    if fallback:
+        cache_control, etag_key = config.FALLBACK_CACHE_CONTROL, None
+
+    response = api_response(
+        {"success": True, "songs": songs, "next_cursor": next_cursor},
+        cache_control=cache_control,
+        etag_key=etag_key,
+    )
+    response.headers["X-Providers"] = ",".join(completed)
+    return response
 
 @app.route("/api/search/<artist>", methods=["GET"])
 def api_search(artist):
+    cursor, limit, etag_key = search_request(artist)
+    try:
+        ticket = admission.acquire()
+    except Overloaded as e:
+        return shed_search_response(list(local_search_chunks(artist, limit, cursor)), e)
+
+    if wants_ndjson():
+        response = stream_search(artist, limit, cursor)
+        response.call_on_close(lambda: admission.release(ticket))
+        return response
+    try:
+        return search_response(*search_page(artist, limit, cursor), etag_key)
+    finally:
+        admission.release(ticket)
+
+# -------------------------
+# Batch search
+# -------------------------
+batch_pool = ThreadPoolExecutor(max_workers=config.BATCH_POOL_SIZE, thread_name_prefix="batch")
+batch_provider_pool = ThreadPoolExecutor(
+    max_workers=config.BATCH_PROVIDER_POOL_SIZE, thread_name_prefix="batch-provider"
+)
+
+def parse_batch(body):
+    """[(artist, limit)] from a batch request body, raising ValueError when it is invalid"""
+    batch = decode_batch_request(body)
+    searches = []
+    for item in batch.artists:
+        if isinstance(item, str):
+            artist, limit = item, batch.limit
+        else:
+            artist, limit = item.artist, item.limit or batch.limit
+        if not artist.strip():
+            raise ValueError("Artist names must not be empty")
+        searches.append((artist.strip(), clamp_limit(limit)))
+    if not searches:
+        raise ValueError("No artists given")
+    if len(searches) > config.BATCH_MAX_ARTISTS:
+        raise ValueError(f"At most {config.BATCH_MAX_ARTISTS} artists per batch")
+    return searches
+
+def batch_request():
+    """[(artist, limit)] of a batch request; aborts with its 400"""
+    try:
+        return parse_batch(request.get_data())
+    except ValueError as e:
+        abort(api_response({"success": False, "error": str(e)}, 400))
+
+def shed_batch_response(overloaded):
+    SHED_REQUESTS.inc(route="batch", outcome="rejected")
+    return overloaded_response(overloaded)
+
+class BatchResults:
+    """Per-artist results of one batch as they come in: NDJSON lines, then a summary or the whole response"""
+
+    def __init__(self, searches):
+        self.searches = searches
+        self.entries = [None] * len(searches)
+        self.failed = 0
+
+    def add(self, index, result):
+        """Record an artist's result; returns its NDJSON line"""
+        artist, limit = self.searches[index]
+        entry = {"index": index, "artist": artist, "limit": limit, **result}
+        self.entries[index] = entry
+        self.failed += not result["success"]
+        return ndjson_line(entry)
+
+    def summary_line(self):
+        return ndjson_line({"done": True, "succeeded": len(self.searches) - self.failed, "failed": self.failed})
+
+    def response(self):
+        return api_response({
+            "success": self.failed < len(self.entries),
+            "results": self.entries,
+            "succeeded": len(self.entries) - self.failed,
+            "failed": self.failed,
+        })
+
+def batch_result(page):
+    songs, providers, next_cursor, fallback = page
+    return {"songs": songs, "providers": providers, "next_cursor": next_cursor, "fallback": fallback}
+
+def finished_batch_result(searches, index, finished):
+    """Result for an artist whose search (future or task) finished, successfully or not"""
+    try:
+        result = {"success": True, **finished.result()}
+        BATCH_SEARCHES.inc(outcome="ok")
+    except Exception as e:
+        logger.error("Batch search error for %s: %s", searches[index][0], e)
+        result = {"success": False, "error": str(e)}
+        BATCH_SEARCHES.inc(outcome="error")
+    return result
+
+def timed_out_batch_result():
+    BATCH_SEARCHES.inc(outcome="timeout")
+    return {"success": False, "error": f"Timed out after {config.BATCH_DEADLINE_MS}ms"}
+
+def batch_search(artist, limit):
+    """First page for one artist of a batch; its video lookups wait for the rest of the batch"""
+    video_window.set(config.BATCH_VIDEO_WINDOW_MS)
+    return batch_result(search_page(artist, limit, pool=batch_provider_pool))
+
+def run_batch(searches):
+    """
+    Yield (index, result) as each artist finishes. An artist that fails, or
+    is still running at BATCH_DEADLINE_MS, gets {"success": False, "error"}
+    without holding up the others.
+    """
+    futures = {
+        batch_pool.submit(copy_context().run, batch_search, artist, limit): index
+        for index, (artist, limit) in enumerate(searches)
+    }
+    answered = set()
     try:
-        limit = int(request.args.get("limit", 10))
+        for future in as_completed(futures, timeout=config.BATCH_DEADLINE_MS / 1000):
+            answered.add(future)
+            yield futures[future], finished_batch_result(searches, futures[future], future)
+    except FuturesTimeoutError:
+        pass
+    for future, index in futures.items():
+        if future not in answered:
+            # Queued searches are dropped; running ones finish and warm the caches
+            future.cancel()
+            yield index, timed_out_batch_result()
+
+@app.route("/api/search/batch", methods=["GET"])
+def api_search_batch_get():
+    """Without this rule, GET /api/search/batch would search for an artist named batch"""
+    response = api_response({"success": False, "error": "Use POST for batch searches"}, 405)
+    response.headers["Allow"] = "POST"
+    return response
+
+@app.route("/api/search/batch", methods=["POST"])
+def api_search_batch():
+    """
+    Search several artists in one round trip:
+    {"artists": ["Arijit Singh", {"artist": "Shreya Ghoshal", "limit": 5}], "limit": 10}.
+    Returns one result per artist in request order, or with Accept:
+    application/x-ndjson one line per artist as it finishes, then a summary line.
+    """
+    searches = batch_request()
+    # A batch takes one admission slot; its artists are bounded by batch_pool and
+    # their provider fetches by batch_provider_pool
+    try:
+        ticket = admission.acquire()
+    except Overloaded as e:
+        return shed_batch_response(e)
+
+    results = BatchResults(searches)
+    if wants_ndjson():
+        def generate():
+            for index, result in run_batch(searches):
+                yield results.add(index, result)
+            yield results.summary_line()
+        response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+        response.call_on_close(lambda: admission.release(ticket))
+        return response
+
+    try:
+        for index, result in run_batch(searches):
+            results.add(index, result)
+        return results.response()
+    finally:
+        admission.release(ticket)
+
+@app.route("/api/suggest", methods=["GET"])
+def api_suggest():
+    """Artist names for a typed prefix, served from the in-memory index (no upstream calls)"""
+    query = request.args.get("q", "")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 8)), 20))
     except Exception:
-        limit = 10
+        limit = 8
+    return api_response(
+        {"success": True, "query": query, "suggestions": artist_index.suggest(query, limit)},
+        cache_control=config.SUGGEST_CACHE_CONTROL,
+    )
 
-    all_songs = []
-    
-    # Try YouTube first 
-    youtube_songs = music_service.search_youtube_songs(artist, limit)
-    all_songs.extend(youtube_songs)
-    
-    # If not enough songs, try Spotify
-    if len(all_songs) < limit:
-        remaining = limit - len(all_songs)
-        spotify_songs = music_service.search_spotify_songs(artist, remaining)
-        all_songs.extend(spotify_songs)
-    
-    # Fallback to sample data if no results
-    if not all_songs:
-        all_songs = [
-            {
-                "title": f"{artist} Song {i+1}", 
-                "artist": artist, 
-                "year": f"202{i % 5}", 
-                "duration": f"{3 + i % 3}:{20 + i * 15 % 60:02d}", 
-                "source": "sample",
-                "play_url": f"#sample-{i}",
-                "thumbnail": "https://via.placeholder.com/300x300/667eea/ffffff?text=🎵"
-            }
-            for i in range(limit)
-        ]
+def placeholder_response(cache_control):
+    response = app.response_class(PLACEHOLDER_SVG, mimetype="image/svg+xml")
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+@app.route("/api/thumb/placeholder", methods=["GET"])
+def api_thumb_placeholder():
+    return placeholder_response(config.THUMB_CACHE_CONTROL)
+
+@app.route("/api/thumb/<source>/<image_id>", methods=["GET"])
+def api_thumb(source, image_id):
+    """Provider thumbnail as a small square variant (?size=px), WebP when the client takes it"""
+    if source not in THUMB_SOURCES or not IMAGE_ID_RE.match(image_id):
+        return api_response({"success": False, "error": "Unknown thumbnail"}, 404)
+    size = snap_size(request.args.get("size"), config.THUMB_DEFAULT_SIZE)
+    fmt = request.args.get("format")
+    if fmt not in THUMB_FORMATS:
+        fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+
+    try:
+        variant = thumbnails.variant(source, image_id, size, fmt)
+    except Exception as e:
+        logger.error("Thumbnail error: %s", e)
+        variant = None
+    if variant is None:
+        FALLBACKS.inc(endpoint="thumb")
+        return placeholder_response(config.FALLBACK_CACHE_CONTROL)
+
+    path, mimetype = variant
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    response.headers["Cache-Control"] = config.THUMB_CACHE_CONTROL
+    response.headers["Vary"] = "Accept"
+    return response
+
+def mood_response(songs, etag_key):
+    artist_index.add(song_artists(songs))
+    return api_response(
+        {"success": True, "songs": songs},
+        cache_control=config.MOOD_CACHE_CONTROL,
+        etag_key=etag_key,
+    )
 
-    logger.info(f"Returning {len(all_songs)} songs for artist: {artist}")
-    return jsonify({"success": True, "songs": all_songs[:limit]}), 200
+def mood_fallback_response(mood):
+    """Predefined mood songs in sample data format"""
+    songs = [
+        Song(
+            **song,
+            source="sample",
+            play_url=f"#sample-{mood}",
+            thumbnail=PLACEHOLDER_URL,
+        )
+        for song in MOOD_FALLBACK.get(mood.lower(), MOOD_FALLBACK["happy"])
+    ]
+    FALLBACKS.inc(endpoint="mood")
+    return api_response({"success": True, "songs": songs}, cache_control=config.FALLBACK_CACHE_CONTROL)
+
+def mood_request(mood):
+    """(mood key, search query, etag key) of a mood request; aborts with a 304"""
+    mood_key = mood.lower()
+    etag_key = make_key("mood", mood_key)
+    cached = cached_not_modified(etag_key)
+    if cached is not None:
+        abort(cached)
+    return mood_key, MOOD_QUERIES.get(mood_key, "bollywood songs"), etag_key
+
+def mood_searchable():
+    """Cold start: search YouTube for mood-based songs unless its breaker is open or the quota is spent"""
+    return bool(config.YOUTUBE_API_KEY) and provider_available("youtube")
+
+def searched_mood_response(mood, songs, etag_key):
+    if songs:
+        logger.info(f"Found {len(songs)} YouTube songs for mood: {mood}")
+        return mood_response(songs, etag_key)
+    return mood_fallback_response(mood)
+
+def shed_mood_response(mood):
+    SHED_REQUESTS.inc(route="mood", outcome="local")
+    return mood_fallback_response(mood)
+
+def mood_error_response(error):
+    logger.error("Mood search error: %s", error)
+    return api_response({"success": False, "error": str(error)}, 500)
 
 @app.route("/api/mood/<mood>", methods=["GET"])
 def api_mood(mood):
-    # mood mapping with Indian artists
-    mood_queries = {
-        "happy": "bollywood happy songs dance",
-        "sad": "bollywood sad songs emotional arijit singh",
-        "romantic": "bollywood love songs romantic",
-        "motivation": "bollywood motivational songs inspirational",
-        "party": "bollywood party songs dance",
-        "chill": "bollywood chill relaxing songs",
-        "devotional": "hindi devotional bhajan songs",
-        "classical": "indian classical music raag"
-    }
-    
-    query = mood_queries.get(mood.lower(), "bollywood songs")
-    
+    mood_key, query, etag_key = mood_request(mood)
     try:
-        # Search YouTube for mood-based songs
-        if config.YOUTUBE_API_KEY:
-            resp = requests.get(
-                config.YOUTUBE_SEARCH_URL,
-                params={
-                    "key": config.YOUTUBE_API_KEY,
-                    "q": query,
-                    "part": "snippet",
-                    "maxResults": 8,
-                    "type": "video",
-                    "regionCode": "IN",
-                    "videoCategoryId": "10",
-                },
-                timeout=12,
-            )
-            
-            if resp.status_code == 200:
-                items = resp.json().get("items", [])
-                songs = []
-                for item in items:
-                    snippet = item.get("snippet", {})
-                    video_id = item.get("id", {}).get("videoId")
-                    thumbnail = snippet.get("thumbnails", {}).get("medium", {}).get("url")
-                    
-                    songs.append({
-                        "title": music_service.clean_title(snippet.get("title", "Unknown")),
-                        "artist": snippet.get("channelTitle", "Unknown Artist"),
-                        "youtube_id": video_id,
-                        "thumbnail": thumbnail,
-                        "year": snippet.get("publishedAt", "")[:4],
-                        "duration": "4:30",
-                        "source": "youtube",
-                        "play_url": f"https://www.youtube.com/watch?v={video_id}",
-                        "embed_url": f"https://www.youtube.com/embed/{video_id}?autoplay=1"
-                    })
-                
-                if songs:
-                    logger.info(f"Found {len(songs)} YouTube songs for mood: {mood}")
-                    return jsonify({"success": True, "songs": songs}), 200
-        
-        # Fallback to predefined mood songs
-        mood_fallback = {
-            "happy": [
-                {"title": "Kal Ho Naa Ho", "artist": "Sonu Nigam", "year": "2003", "duration": "5:08"},
-                {"title": "Gallan Goodiyaan", "artist": "Yashita Sharma", "year": "2014", "duration": "4:15"},
-                {"title": "London Thumakda", "artist": "Neha Kakkar", "year": "2014", "duration": "3:45"},
-            ],
-            "sad": [
-                {"title": "Tum Hi Ho", "artist": "Arijit Singh", "year": "2013", "duration": "4:22"},
-                {"title": "Channa Mereya", "artist": "Arijit Singh", "year": "2016", "duration": "4:49"},
-                {"title": "Ae Dil Hai Mushkil", "artist": "Arijit Singh", "year": "2016", "duration": "4:37"},
-            ],
-            "romantic": [
-                {"title": "Raataan Lambiyan", "artist": "Tanishk Bagchi", "year": "2021", "duration": "3:28"},
-                {"title": "Pehla Nasha", "artist": "Udit Narayan", "year": "2000", "duration": "6:12"},
-                {"title": "Tere Bina", "artist": "A.R. Rahman", "year": "2007", "duration": "5:45"},
-            ],
-            "motivation": [
-                {"title": "Zinda", "artist": "Shankar Mahadevan", "year": "2006", "duration": "5:30"},
-                {"title": "Chak De India", "artist": "Sukhwinder Singh", "year": "2007", "duration": "4:10"},
-                {"title": "Jai Ho", "artist": "A.R. Rahman", "year": "2008", "duration": "5:09"},
-            ],
-            "party": [
-                {"title": "Nagada Sang Dhol", "artist": "Osman Mir", "year": "2013", "duration": "4:32"},
-                {"title": "Tattad Tattad", "artist": "Arijit Singh", "year": "2013", "duration": "4:16"},
-                {"title": "Malhari", "artist": "Vishal Dadlani", "year": "2015", "duration": "4:32"},
-            ],
-            "chill": [
-                {"title": "Kun Faya Kun", "artist": "A.R. Rahman", "year": "2011", "duration": "7:50"},
-                {"title": "Ilahi", "artist": "Arijit Singh", "year": "2014", "duration": "5:02"},
-                {"title": "Mast Magan", "artist": "Arijit Singh", "year": "2014", "duration": "4:32"},
-            ],
-            "devotional": [
-                {"title": "Shri Hanuman Chalisa", "artist": "Hariharan", "year": "2008", "duration": "8:15"},
-                {"title": "Om Jai Jagdish Hare", "artist": "Anuradha Paudwal", "year": "1995", "duration": "6:30"},
-                {"title": "Gayatri Mantra", "artist": "Anuradha Paudwal", "year": "2000", "duration": "3:45"},
-            ],
-            "classical": [
-                {"title": "Raag Yaman", "artist": "Pandit Ravi Shankar", "year": "1960", "duration": "15:30"},
-                {"title": "Raag Bhairav", "artist": "Ustad Ali Akbar Khan", "year": "1965", "duration": "18:45"},
-                {"title": "Raag Malkauns", "artist": "Pandit Jasraj", "year": "1970", "duration": "22:15"},
-            ]
-        }
-        
-        songs = mood_fallback.get(mood.lower(), mood_fallback["happy"])
-        # sample data format
-        for song in songs:
-            song.update({
-                "source": "sample",
-                "play_url": f"#sample-{mood}",
-                "thumbnail": "https://via.placeholder.com/300x300/667eea/ffffff?text=🎵"
-            })
-        
-        return jsonify({"success": True, "songs": songs}), 200
+        # Serve the precomputed playlist when the warmer has one
+        songs = mood_warmer.get(mood_key)
+        if songs:
+            return mood_response(songs, etag_key)
+
+        songs = []
+        if mood_searchable():
+            with admission.slot():
+                songs, _ = music_service.search_mood_page(query)
+        return searched_mood_response(mood, songs, etag_key)
+
+    except Overloaded:
+        return shed_mood_response(mood)
         
     except Exception as e:
-        logger.error("Mood search error: %s", e)
-        return jsonify({"success": False, "error": str(e)}), 500
+        return mood_error_response(e)
 
 @app.route("/api/play/<song_id>", methods=["GET"])
 def api_play(song_id):
@@ -472,29 +1663,29 @@ def api_play(song_id):
     try:
         if source == "youtube":
             # Return YouTube URLs
-            return jsonify({
+            return api_response({
                 "success": True,
                 "play_url": f"https://www.youtube.com/watch?v={song_id}",
                 "embed_url": f"https://www.youtube.com/embed/{song_id}?autoplay=1",
                 "source": "youtube"
-            }), 200
+            }, cache_control=config.PLAY_CACHE_CONTROL)
         elif source == "spotify":
             # Return Spotify URLs
-            return jsonify({
+            return api_response({
                 "success": True,
                 "play_url": f"https://open.spotify.com/track/{song_id}",
                 "embed_url": f"https://open.spotify.com/embed/track/{song_id}",
                 "source": "spotify"
-            }), 200
+            }, cache_control=config.PLAY_CACHE_CONTROL)
         else:
-            return jsonify({
+            return api_response({
                 "success": False,
                 "error": "Unsupported source"
-            }), 400
+            }, 400)
             
     except Exception as e:
         logger.error("Play error: %s", e)
-        return jsonify({"success": False, "error": str(e)}), 500
+        return api_response({"success": False, "error": str(e)}, 500)
 
 # -----------------------------------------------------------------
 # Run my Sangam app
@@ -0,0 +1,489 @@
+"""
+ASGI entry point: the same API served from an asyncio event loop.
+
+    uvicorn asgi:app --workers 2 --port 5000
+
+Search, batch search, mood, suggest, play and health run as coroutines on
+an httpx client, so a request waiting on YouTube or Spotify holds a socket
+and a coroutine instead of a worker thread. Every other route (static
+frontend, thumbnails, metrics, CORS preflights) is the Flask app itself,
+run in a small thread pool. Only the waiting lives here: request parsing,
+provider requests and parsing, merging, responses, routing, CORS headers,
+ETags, caches, breakers and request metrics all come from app.py, so both
+servers answer alike.
+
+Needs the optional packages in requirement-asgi.txt.
+"""
+import asyncio
+import inspect
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    FIRST_PAGES,
+    SPOTIFY_TOKEN,
+    BatchResults,
+    MusicAPIService,
+    SearchPage,
+    VideoDetailsLookup,
+    api_play,
+    api_response,
+    api_suggest,
+    api_thumb_placeholder,
+    app as flask_app,
+    assemble_page,
+    batch_request,
+    batch_result,
+    config,
+    finished_batch_result,
+    finished_provider_page,
+    health_payload,
+    local_search_chunks,
+    log_missed_deadline,
+    mood_error_response,
+    mood_request,
+    mood_response,
+    mood_searchable,
+    mood_warmer,
+    music_service,
+    ndjson_line,
+    provider_available,
+    record_upstream,
+    search_request,
+    search_response,
+    searched_mood_response,
+    shed_batch_response,
+    shed_mood_response,
+    shed_search_response,
+    timed_out_batch_result,
+    upstream,
+    video_window,
+    wants_ndjson,
+)
+from admission import AsyncAdmissionLimiter, Overloaded
+from batcher import AsyncVideoDetailsBatcher
+from http_client import AsyncUpstreamClient
+from singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Async Music API Service
+# -------------------------
+class AsyncMusicAPIService(MusicAPIService):
+    """
+    MusicAPIService that runs the same provider flows on the event loop: its
+    search methods return coroutines. The search and video-details caches
+    are those of `service`, so the threaded and the async code paths fill
+    and read the same entries.
+    """
+
+    def __init__(self, service, client):
+        self.client = client
+        self.spotify_token = None
+        self.spotify_token_expires = 0
+        self.search_cache = service.search_cache
+        self.inflight = AsyncSingleFlight()
+        self.video_details = AsyncVideoDetailsBatcher(
+            self._fetch_video_details,
+            window_ms=config.VIDEO_BATCH_WINDOW_MS,
+            max_batch=50,
+            cache=service.video_details.cache,
+        )
+
+    async def _run(self, flow):
+        reply, error = None, None
+        while True:
+            try:
+                step = flow.send(reply) if error is None else flow.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                reply, error = await self._perform(step), None
+            except Exception as e:
+                reply, error = None, e
+
+    async def _perform(self, step):
+        if step is SPOTIFY_TOKEN:
+            return await self.get_spotify_token()
+        if isinstance(step, VideoDetailsLookup):
+            return await self.video_details.get(
+                step.video_ids, timeout=config.SEARCH_DEADLINE_MS / 1000, window_ms=step.window_ms
+            )
+        return await getattr(self.client, step.method)(step.endpoint, step.url, **step.kwargs)
+
+    async def get_spotify_token(self):
+        token = super().get_spotify_token()
+        return await token if inspect.isawaitable(token) else token
+
+    async def _cached_page(self, key, fetch, provider, index_artists=True):
+        async def load():
+            songs, next_page = await self.inflight.do(key, fetch)
+            return (songs, next_page) if songs else None
+
+        if not provider_available(provider):
+            page = self.search_cache.peek(key)
+        else:
+            page = await self.search_cache.get_or_load_async(key, load)
+        return self._served_page(page, index_artists)
+
+# Same retries, timeouts, breakers and quota budget as the threaded client
+async_upstream = AsyncUpstreamClient(
+    max_connections=config.ASGI_MAX_CONNECTIONS,
+    pool_maxsize=config.UPSTREAM_POOL_MAXSIZE,
+    retries=upstream.retries,
+    backoff=upstream.backoff,
+    timeout=upstream.timeout,
+    timeouts=upstream.timeouts,
+    on_response=record_upstream,
+    breakers=upstream.breakers,
+    adaptive_timeout=upstream.adaptive_timeout,
+    quota=upstream.quota,
+)
+async_music_service = AsyncMusicAPIService(music_service, async_upstream)
+
+# A waiting request costs a coroutine here rather than a thread, so the limits are higher
+async_admission = AsyncAdmissionLimiter(
+    "upstream",
+    limit=config.ASGI_ADMISSION_LIMIT,
+    max_queue=config.ASGI_ADMISSION_QUEUE,
+    max_wait=config.ADMISSION_MAX_WAIT_MS / 1000,
+)
+
+# -------------------------
+# Provider fan-out
+# -------------------------
+SEARCH_PROVIDERS = {
+    "youtube": async_music_service.search_youtube_page,
+    "spotify": async_music_service.search_spotify_page,
+}
+# Tasks that may outlive their request (late providers, batch searches past the deadline)
+background_tasks = set()
+# Artists of all batches searched at once (BATCH_POOL_SIZE threads in the Flask app)
+batch_slots = asyncio.Semaphore(config.BATCH_POOL_SIZE)
+
+def spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def submit_providers(artist, limit, pages=None):
+    """Start one page fetch task per provider that still has pages; returns {task: provider}"""
+    pages = FIRST_PAGES if pages is None else pages
+    return {
+        spawn(search(artist, limit, pages[name])): name
+        for name, search in SEARCH_PROVIDERS.items()
+        if pages.get(name) is not None
+    }
+
+async def finished_within(tasks, timeout, ordered=True):
+    """
+    Yield tasks as they finish, until all have or `timeout` seconds have
+    passed. Ordered mode waits for all of them first and yields them in
+    the order of `tasks`.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    order = list(tasks)
+    pending = set(tasks)
+    while pending:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        done, pending = await asyncio.wait(
+            pending, timeout=remaining,
+            return_when=asyncio.ALL_COMPLETED if ordered else asyncio.FIRST_COMPLETED,
+        )
+        for task in sorted(done, key=order.index):
+            yield task
+
+async def collect_providers(tasks, artist, deadline_ms=None, ordered=True):
+    """collect_providers() of the Flask app, for provider tasks"""
+    if deadline_ms is None:
+        deadline_ms = config.SEARCH_DEADLINE_MS
+    answered = set()
+    async for task in finished_within(tasks, deadline_ms / 1000, ordered):
+        answered.add(task)
+        page = finished_provider_page(tasks[task], task)
+        if page is not None:
+            yield tasks[task], page
+    for task in tasks:
+        if task not in answered:
+            log_missed_deadline(tasks[task], deadline_ms, artist)
+
+async def search_chunks(artist, limit, cursor=None, ordered=True):
+    """search_chunks() of the Flask app as an async generator"""
+    page = SearchPage(artist, limit, cursor)
+    for chunk in await asyncio.to_thread(lambda: list(page.opening_chunks())):
+        yield chunk
+
+    if not page.full:
+        tasks = submit_providers(artist, limit, page.pages)
+        async for name, result in collect_providers(tasks, artist, ordered=ordered):
+            chunk = page.provider_chunk(name, result)
+            if chunk:
+                yield chunk
+
+    for chunk in page.closing_chunks():
+        yield chunk
+
+async def search_page(artist, limit, cursor=None):
+    """(songs, providers that answered, next_cursor, sample fallback used)"""
+    return assemble_page([chunk async for chunk in search_chunks(artist, limit, cursor)])
+
+async def batch_search(artist, limit, started, index):
+    async with batch_slots:
+        started.add(index)
+        video_window.set(config.BATCH_VIDEO_WINDOW_MS)
+        return batch_result(await search_page(artist, limit))
+
+async def run_batch(searches):
+    """run_batch() of the Flask app: (index, result) as each artist finishes"""
+    started = set()
+    tasks = {
+        spawn(batch_search(artist, limit, started, index)): index
+        for index, (artist, limit) in enumerate(searches)
+    }
+    answered = set()
+    async for task in finished_within(tasks, config.BATCH_DEADLINE_MS / 1000, ordered=False):
+        answered.add(task)
+        yield tasks[task], finished_batch_result(searches, tasks[task], task)
+    for task, index in tasks.items():
+        if task not in answered:
+            # Queued searches are dropped; running ones finish and warm the caches
+            if index not in started:
+                task.cancel()
+            yield index, timed_out_batch_result()
+
+# -------------------------
+# API Endpoints
+# -------------------------
+class StreamingResponse(flask_app.response_class):
+    """Response whose body is an async iterator of bytes, sent as it is produced"""
+
+    def __init__(self, chunks, mimetype="application/x-ndjson"):
+        super().__init__(mimetype=mimetype)
+        self.chunks = chunks
+
+async def ndjson(chunks):
+    async for chunk in chunks:
+        yield ndjson_line(chunk)
+
+async def api_search_async(artist):
+    cursor, limit, etag_key = search_request(artist)
+    try:
+        ticket = await async_admission.acquire()
+    except Overloaded as e:
+        chunks = await asyncio.to_thread(lambda: list(local_search_chunks(artist, limit, cursor)))
+        return shed_search_response(chunks, e)
+
+    if wants_ndjson():
+        response = StreamingResponse(ndjson(search_chunks(artist, limit, cursor, ordered=False)))
+        response.call_on_close(lambda: async_admission.release(ticket))
+        return response
+    try:
+        return search_response(*await search_page(artist, limit, cursor), etag_key)
+    finally:
+        async_admission.release(ticket)
+
+async def api_search_batch_async():
+    searches = batch_request()
+    try:
+        ticket = await async_admission.acquire()
+    except Overloaded as e:
+        return shed_batch_response(e)
+
+    results = BatchResults(searches)
+    if wants_ndjson():
+        async def generate():
+            async for index, result in run_batch(searches):
+                yield results.add(index, result)
+            yield results.summary_line()
+        response = StreamingResponse(generate())
+        response.call_on_close(lambda: async_admission.release(ticket))
+        return response
+
+    try:
+        async for index, result in run_batch(searches):
+            results.add(index, result)
+        return results.response()
+    finally:
+        async_admission.release(ticket)
+
+async def api_mood_async(mood):
+    mood_key, query, etag_key = mood_request(mood)
+    try:
+        songs = mood_warmer.get(mood_key)
+        if songs:
+            return mood_response(songs, etag_key)
+
+        songs = []
+        if mood_searchable():
+            async with async_admission.slot():
+                songs, _ = await async_music_service.search_mood_page(query)
+        return searched_mood_response(mood, songs, etag_key)
+
+    except Overloaded:
+        return shed_mood_response(mood)
+
+    except Exception as e:
+        return mood_error_response(e)
+
+def api_health():
+    """/api/health with this server's client, coalescing, batcher and admission stats"""
+    return api_response(health_payload(async_music_service, async_admission))
+
+def inline(view):
+    """A Flask view that never blocks (no I/O), called directly on the event loop"""
+    async def run(**kwargs):
+        return view(**kwargs)
+    return run
+
+# Flask endpoint -> coroutine serving it; every other endpoint goes to the Flask app
+ASYNC_VIEWS = {
+    "api_search": api_search_async,
+    "api_search_batch": api_search_batch_async,
+    "api_mood": api_mood_async,
+    "api_health": inline(api_health),
+    "api_suggest": inline(api_suggest),
+    "api_play": inline(api_play),
+    "api_thumb_placeholder": inline(api_thumb_placeholder),
+}
+
+# -------------------------
+# ASGI <-> Flask
+# -------------------------
+wsgi_pool = ThreadPoolExecutor(max_workers=config.ASGI_THREADS, thread_name_prefix="wsgi")
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI http scope and its request body"""
+    script_name = scope.get("root_path", "")
+    path = scope["path"]
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def call_wsgi(wsgi_app, environ):
+    """Run a WSGI app (or response) to completion -> (status, ASGI headers, body)"""
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [int(status.split(" ", 1)[0]), headers]
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    status, headers = started
+    return status, asgi_headers(headers), body
+
+def asgi_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return body
+
+def match_endpoint(environ):
+    try:
+        return flask_app.url_map.bind_to_environ(environ).match()[0]
+    except HTTPException:
+        return None
+
+async def dispatch(view, environ, send):
+    """Flask's full_dispatch_request() around an async view"""
+    with flask_app.request_context(environ):
+        try:
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    rv = await view(**request.view_args)
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(rv)
+        except Exception as e:
+            response = flask_app.handle_exception(e)
+
+        if not isinstance(response, StreamingResponse):
+            await send_response(send, *call_wsgi(response, environ))
+            return
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": asgi_headers(response.headers.to_wsgi_list()),
+            })
+            if environ["REQUEST_METHOD"] != "HEAD":
+                async for chunk in response.chunks:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            # Runs call_on_close() callbacks, e.g. releasing an admission slot
+            response.close()
+
+async def send_response(send, status, headers, body):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_upstream.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported ASGI scope {scope['type']!r}")
+
+    environ = build_environ(scope, await read_body(receive))
+    view = ASYNC_VIEWS.get(match_endpoint(environ))
+    if view is not None:
+        await dispatch(view, environ, send)
+        return
+    loop = asyncio.get_running_loop()
+    await send_response(send, *await loop.run_in_executor(wsgi_pool, call_wsgi, flask_app, environ))
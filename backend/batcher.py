@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+logger = logging.getLogger(__name__)
+
+
+class VideoDetailsBatcher:
+    """
+    Micro-batches YouTube videos.list lookups across concurrent callers.
+
+    Ids requested within `window_ms` of each other are merged into one
+    upstream call per `max_batch` ids, and each caller gets back only the
+    records it asked for. Found records go into `cache` (keyed by id), so a
+    repeat id never reaches the detail endpoint again while it is cached.
+
+    `fetch(ids)` must return {video_id: item} and may raise; the exception
+    is then delivered to every caller waiting on that batch.
+
+    A caller that knows more lookups are on their way (the searches of one
+    batch request) can pass a longer `window_ms`; the batch it opens or
+    joins then stays open that long, so those lookups share upstream calls.
+    """
+
+    def __init__(self, fetch, window_ms=5, max_batch=50, cache=None, workers=4):
+        self.fetch = fetch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache = cache
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._linger = 0.0  # longest window requested by a caller in the open batch
+        self._pending = {}
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video-batch")
+
+        self.batches = 0
+        self.ids_fetched = 0
+        self.cache_hits = 0
+        self.shared = 0
+
+    def get(self, video_ids, timeout=None, window_ms=None):
+        """Return {video_id: item} for every id that YouTube knows about"""
+        results = {}
+        futures = {}
+        with self._cond:
+            for video_id in dict.fromkeys(video_ids):
+                item = self.cache.get(video_id) if self.cache is not None else None
+                if item is not None:
+                    self.cache_hits += 1
+                    results[video_id] = item
+                    continue
+                future = self._pending.get(video_id)
+                if future is None:
+                    future = Future()
+                    self._pending[video_id] = future
+                    self._queue.append(video_id)
+                else:
+                    self.shared += 1
+                futures[video_id] = future
+            if futures:
+                if window_ms:
+                    self._linger = max(self._linger, window_ms / 1000)
+                self._ensure_thread()
+                self._cond.notify()
+
+        done, not_done = wait_futures(futures.values(), timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} video lookups timed out")
+        for video_id, future in futures.items():
+            item = future.result()
+            if item is not None:
+                results[video_id] = item
+        return results
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="video-batcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # Hold the batch open for a short window so concurrent searches can join it
+                opened = time.monotonic()
+                while len(self._queue) < self.max_batch:
+                    remaining = opened + max(self.window, self._linger) - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                if not self._queue:
+                    self._linger = 0.0
+                self.batches += 1
+                self.ids_fetched += len(batch)
+            try:
+                self._executor.submit(self._dispatch, batch)
+            except Exception as e:  # e.g. RuntimeError once the interpreter is shutting down
+                logger.error("Video details batch could not be dispatched: %s", e)
+                self._resolve(batch, {}, e)
+
+    def _dispatch(self, batch):
+        try:
+            items = self.fetch(batch)
+            error = None
+        except Exception as e:
+            items = {}
+            error = e
+        self._resolve(batch, items, error)
+
+    def _resolve(self, batch, items, error):
+        """Hand each caller waiting on `batch` its item, or the batch's error"""
+        with self._cond:
+            futures = [(video_id, self._pending.pop(video_id)) for video_id in batch]
+        for video_id, future in futures:
+            if error is not None:
+                future.set_exception(error)
+                continue
+            item = items.get(video_id)
+            if item is not None and self.cache is not None:
+                self.cache.set(video_id, item)
+            future.set_result(item)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "ids_fetched": self.ids_fetched,
+                "cache_hits": self.cache_hits,
+                "shared": self.shared,
+                "pending": len(self._pending),
+            }
+
+
+class AsyncVideoDetailsBatcher:
+    """
+    VideoDetailsBatcher for asyncio callers on one event loop.
+
+    `fetch(ids)` is a coroutine function. Instead of a collector thread, the
+    first id of a batch arms a timer on the loop; the batch is dispatched
+    when the window (stretched by callers' longer `window_ms`) runs out or
+    as soon as `max_batch` ids are queued. `cache` may be shared with the
+    threaded batcher.
+    """
+
+    def __init__(self, fetch, window_ms=5, max_batch=50, cache=None):
+        self.fetch = fetch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache = cache
+
+        self._queue = []
+        self._pending = {}
+        self._opened = None  # loop time the open batch started
+        self._timer = None
+        self._tasks = set()
+
+        self.batches = 0
+        self.ids_fetched = 0
+        self.cache_hits = 0
+        self.shared = 0
+
+    async def get(self, video_ids, timeout=None, window_ms=None):
+        """Return {video_id: item} for every id that YouTube knows about"""
+        loop = asyncio.get_running_loop()
+        results = {}
+        futures = {}
+        for video_id in dict.fromkeys(video_ids):
+            item = self.cache.get(video_id) if self.cache is not None else None
+            if item is not None:
+                self.cache_hits += 1
+                results[video_id] = item
+                continue
+            future = self._pending.get(video_id)
+            if future is None:
+                future = loop.create_future()
+                self._pending[video_id] = future
+                self._queue.append(video_id)
+            else:
+                self.shared += 1
+            futures[video_id] = future
+        if not futures:
+            return results
+
+        self._schedule(loop, max(self.window, (window_ms or 0) / 1000))
+        try:
+            items = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.shield(f) for f in futures.values())), timeout
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{len(futures)} video lookups timed out") from None
+        for video_id, item in zip(futures, items):
+            if item is not None:
+                results[video_id] = item
+        return results
+
+    def _schedule(self, loop, window):
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+            return
+        if self._timer is None:
+            self._opened = loop.time()
+        elif self._opened + window <= self._timer.when():
+            return
+        else:
+            self._timer.cancel()
+        self._timer = loop.call_at(self._opened + window, self._flush)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            self.batches += 1
+            self.ids_fetched += len(batch)
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            items = await self.fetch(batch)
+            error = None
+        except Exception as e:
+            items = {}
+            error = e
+
+        for video_id in batch:
+            future = self._pending.pop(video_id)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+                continue
+            item = items.get(video_id)
+            if item is not None and self.cache is not None:
+                self.cache.set(video_id, item)
+            future.set_result(item)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "ids_fetched": self.ids_fetched,
+            "cache_hits": self.cache_hits,
+            "shared": self.shared,
+            "pending": len(self._pending),
+        }
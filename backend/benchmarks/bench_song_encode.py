@@ -0,0 +1,134 @@
+"""
+Micro-benchmark: provider JSON -> song list -> response body.
+
+Compares the old path (resp.json() dicts, ad-hoc song dicts, Flask's JSON
+provider as used by jsonify) with the msgspec path (typed decode into
+structs, Song structs, msgspec encode). Reports time per response and
+bytes allocated per response (tracemalloc).
+
+    python backend/benchmarks/bench_song_encode.py [--songs 10] [--rounds 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import Flask  # noqa: E402
+
+from models import Song, json_encoder, youtube_videos_decoder  # noqa: E402
+
+
+def make_payload(n):
+    """A videos.list response body shaped like the real one"""
+    items = []
+    for i in range(n):
+        items.append({
+            "kind": "youtube#video",
+            "etag": f"etag-{i}",
+            "id": f"vid{i:08d}",
+            "snippet": {
+                "publishedAt": "2016-10-28T10:00:00Z",
+                "channelId": "UCq-Fj5jknLsUf-MWSy4_brA",
+                "title": f"Channa Mereya Song {i} | Official Video | Arijit Singh",
+                "description": "Presenting the full video song " * 20,
+                "thumbnails": {
+                    size: {"url": f"https://i.ytimg.com/vi/vid{i:08d}/{size}.jpg", "width": 480, "height": 360}
+                    for size in ("default", "medium", "high", "standard", "maxres")
+                },
+                "channelTitle": "T-Series",
+                "tags": ["arijit singh", "bollywood", "hindi songs"],
+                "categoryId": "10",
+            },
+            "contentDetails": {"duration": "PT4M49S", "dimension": "2d", "definition": "hd"},
+            "statistics": {"viewCount": "612345678", "likeCount": "3456789", "commentCount": "98765"},
+        })
+    return json.dumps({"kind": "youtube#videoListResponse", "items": items}).encode()
+
+
+def dict_path(body, provider):
+    songs = []
+    for item in json.loads(body).get("items", []):
+        snippet = item.get("snippet", {})
+        thumbnails = snippet.get("thumbnails", {})
+        video_id = item.get("id")
+        songs.append({
+            "title": snippet.get("title", "Unknown"),
+            "artist": "Arijit Singh",
+            "youtube_id": video_id,
+            "thumbnail": (
+                thumbnails.get("maxres", {}).get("url") or
+                thumbnails.get("high", {}).get("url") or
+                thumbnails.get("medium", {}).get("url") or
+                thumbnails.get("default", {}).get("url")
+            ),
+            "year": snippet.get("publishedAt", "")[:4],
+            "duration": item.get("contentDetails", {}).get("duration", "PT4M20S"),
+            "source": "youtube",
+            "play_url": f"https://www.youtube.com/watch?v={video_id}",
+            "embed_url": f"https://www.youtube.com/embed/{video_id}?autoplay=1",
+        })
+    return provider.dumps({"success": True, "songs": songs}).encode()
+
+
+def struct_path(body):
+    songs = []
+    for video in youtube_videos_decoder.decode(body).items:
+        snippet = video.snippet
+        songs.append(Song(
+            title=snippet.title,
+            artist="Arijit Singh",
+            youtube_id=video.id,
+            thumbnail=snippet.thumbnails.best(),
+            year=snippet.publishedAt[:4],
+            duration=video.contentDetails.duration,
+            source="youtube",
+            play_url=f"https://www.youtube.com/watch?v={video.id}",
+            embed_url=f"https://www.youtube.com/embed/{video.id}?autoplay=1",
+        ))
+    return json_encoder.encode({"success": True, "songs": songs})
+
+
+def allocated(fn, rounds=50):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for _ in range(rounds):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--songs", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    body = make_payload(args.songs)
+    provider = Flask("bench").json
+
+    assert json.loads(dict_path(body, provider)) == json.loads(struct_path(body)), "paths disagree"
+
+    paths = {
+        "dict + jsonify": lambda: dict_path(body, provider),
+        "Song + msgspec": lambda: struct_path(body),
+    }
+    results = {}
+    for name, fn in paths.items():
+        seconds = min(timeit.repeat(fn, number=args.rounds, repeat=5)) / args.rounds
+        results[name] = (seconds * 1e6, allocated(fn))
+
+    print(f"{args.songs} songs per response, {len(body)} byte provider payload")
+    print(f"{'path':<18}{'us/response':>14}{'peak alloc (B)':>18}")
+    for name, (us, peak) in results.items():
+        print(f"{name:<18}{us:>14.1f}{peak:>18,}")
+    (old_us, old_peak), (new_us, new_peak) = results.values()
+    print(f"speedup x{old_us / new_us:.1f}, allocation -{100 * (1 - new_peak / old_peak):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
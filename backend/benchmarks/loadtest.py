@@ -0,0 +1,453 @@
+"""
+Load test: stub providers + gunicorn (or uvicorn) + an open-loop client at a target RPS.
+
+For every worker/thread configuration this starts the provider stand-ins
+(stub_providers.py) and a fresh gunicorn running app:app against them, then
+fires a weighted mix of /api/search, /api/mood, /api/thumb and static asset requests on
+a fixed schedule. Latency is measured from each request's scheduled start,
+so a backed-up server shows up as latency instead of silently lowering the
+offered load. Results (throughput, error counts, p50/p95/p99 per route) are
+written as a JSON baseline that later runs can be compared against.
+
+    python backend/benchmarks/loadtest.py --configs 1x8,2x4,4x2 --rps 50 --duration 30 \\
+        --profile realistic --output baseline.json
+    python backend/benchmarks/loadtest.py --configs 2x4 --compare baseline.json
+
+--compare exits non-zero when a route's p95/p99 or throughput regresses by
+more than --tolerance percent.
+
+--server uvicorn runs the ASGI app (asgi:app) instead, WORKERSxTHREADS then
+being uvicorn workers x Flask fallback threads. --connections switches to a
+closed loop: that many clients each send their next request as soon as the
+last one returns, which measures how many concurrent connections a server
+keeps moving. The "cold" route searches a new artist every time, so every
+request waits on the providers:
+
+    python backend/benchmarks/loadtest.py --server uvicorn --configs 2x8 \\
+        --connections 8,64,256 --mix cold=1 --profile slow
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_providers import add_profile_arguments, backend_env, profile_from_args  # noqa: E402
+
+ARTISTS = [
+    "Arijit Singh", "Shreya Ghoshal", "Lata Mangeshkar", "Kishore Kumar", "A R Rahman",
+    "Sonu Nigam", "Neha Kakkar", "Atif Aslam", "Jubin Nautiyal", "Sunidhi Chauhan",
+    "Mohammed Rafi", "Asha Bhosle", "Udit Narayan", "Alka Yagnik", "Pritam",
+    "Vishal Shekhar", "Armaan Malik", "Shankar Mahadevan", "KK", "Badshah",
+]
+MOODS = ["happy", "sad", "romantic", "energetic", "chill", "party", "devotional"]
+STATIC_PATHS = ["/", "/assets/css/style.css", "/assets/js/main.js"]
+DEFAULT_MIX = "search=6,mood=2,static=2"
+# Distinct thumbnails the "thumb" route cycles through (a results page worth per artist)
+SEARCH_ROUTES = ("search", "cold")
+THUMB_IDS = [f"{i:03d}{i * 2654435761 % 2 ** 32:08x}" for i in range(200)]
+PERCENTILES = (50, 95, 99)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def parse_configs(spec):
+    """ "1x8,2x4" -> [(1, 8), (2, 4)] (gunicorn workers x threads)"""
+    configs = []
+    for part in spec.split(","):
+        workers, _, threads = part.strip().partition("x")
+        configs.append((int(workers), int(threads or 1)))
+    return configs
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        route, _, weight = part.partition("=")
+        if route.strip() not in ("search", "cold", "mood", "thumb", "static"):
+            raise ValueError(f"Unknown route {route!r}")
+        mix[route.strip()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples, duration):
+    """samples: [(latency seconds, ok: True, False, "degraded" or "shed")] -> JSON-ready summary (ms)"""
+    latencies = sorted(latency for latency, _ in samples)
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "degraded": sum(1 for _, ok in samples if ok == "degraded"),
+        "shed": sum(1 for _, ok in samples if ok == "shed"),
+        "throughput_rps": round(sum(1 for _, ok in samples if ok is True) / duration, 2),
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": round(1000 * latencies[-1], 2) if latencies else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(latencies, pct)
+        summary[f"p{pct}_ms"] = round(1000 * value, 2) if value is not None else None
+    return summary
+
+
+# -------------------------
+# Processes under test
+# -------------------------
+class StubProcess:
+    """stub_providers.py in its own process, so the client's GIL doesn't skew it"""
+
+    def __init__(self, args):
+        self.port = free_port()
+        command = [
+            sys.executable, os.path.join(BENCH_DIR, "stub_providers.py"),
+            "--port", str(self.port), "--profile", args.profile, "--seed", str(args.seed),
+        ]
+        for flag in ("latency", "jitter", "error_rate"):
+            value = getattr(args, flag)
+            if value:
+                command += ["--" + flag.replace("_", "-"), value]
+        self.proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        self.proc.stdout.readline()
+        self.base = f"http://127.0.0.1:{self.port}"
+
+    def env(self):
+        return backend_env(self.base)
+
+    def stats(self):
+        return requests.get(self.base + "/__stats", timeout=5).json()
+
+    def stop(self):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+class ServerProcess:
+    """gunicorn (app:app) or uvicorn (asgi:app) on a free port, with scratch data dirs"""
+
+    def __init__(self, workers, threads, env, args):
+        self.port = free_port()
+        self.workdir = tempfile.mkdtemp(prefix="sangam-loadtest-")
+        self.log = open(os.path.join(self.workdir, "gunicorn.log"), "w")
+        server_env = {
+            **os.environ,
+            **env,
+            "FLASK_DEBUG": "False",
+            "CATALOG_PATH": os.path.join(self.workdir, "catalog.db"),
+            "METRICS_DIR": os.path.join(self.workdir, "metrics"),
+            "STATIC_CACHE_DIR": os.path.join(self.workdir, "static"),
+            "THUMB_CACHE_DIR": os.path.join(self.workdir, "thumbs"),
+            "SUGGEST_SNAPSHOT_PATH": os.path.join(self.workdir, "suggest.json"),
+            "MOOD_SNAPSHOT_PATH": os.path.join(self.workdir, "moods.json"),
+            "MOOD_WARMER_ENABLED": "True" if args.mood_warmer else "False",
+            "ASGI_THREADS": str(threads),
+        }
+        if args.server == "uvicorn":
+            command = [
+                sys.executable, "-m", "uvicorn", "asgi:app",
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+                "--backlog", "4096",
+            ]
+        else:
+            command = [
+                sys.executable, "-m", "gunicorn", "app:app",
+                "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(workers), "--threads", str(threads),
+                "--log-level", "warning", "--backlog", "4096",
+            ]
+        self.proc = subprocess.Popen(
+            command, cwd=BACKEND_DIR, env=server_env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        self.base = f"http://127.0.0.1:{self.port}"
+        wait_for(self.base + "/api/health")
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# -------------------------
+# Client
+# -------------------------
+class LoadGenerator:
+    """Open-loop request schedule at a fixed rate with a weighted route mix"""
+
+    def __init__(self, base, rps, mix, seed, max_clients=256, timeout=30.0):
+        self.base = base
+        self.rps = rps
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self.max_clients = max_clients
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["Accept-Encoding"] = "gzip"
+        return session
+
+    def _next_request(self):
+        with self._lock:
+            return self._pick_request()
+
+    def _pick_request(self):
+        route = self.random.choices(self.routes, self.weights)[0]
+        if route == "cold":
+            return route, f"/api/search/Artist {self.random.getrandbits(40):x}?limit=10"
+        if route == "search":
+            # Skewed towards a few popular artists, like real traffic
+            artist = ARTISTS[min(int(self.random.expovariate(0.25)), len(ARTISTS) - 1)]
+            return route, f"/api/search/{artist}?limit=10"
+        if route == "mood":
+            return route, f"/api/mood/{self.random.choice(MOODS)}"
+        if route == "thumb":
+            image_id = THUMB_IDS[min(int(self.random.expovariate(0.02)), len(THUMB_IDS) - 1)]
+            return route, f"/api/thumb/youtube/{image_id}?size=120&format=webp"
+        return route, self.random.choice(STATIC_PATHS)
+
+    def _fire(self, route, path, scheduled, samples):
+        try:
+            resp = self._session().get(self.base + path, timeout=self.timeout)
+            ok = resp.status_code < 400
+            # Turned away by admission control: a quick 503 with Retry-After
+            if resp.status_code == 503 and "Retry-After" in resp.headers:
+                ok = "shed"
+            # A search no provider answered (sample data, open breaker) is fast but not a result
+            if ok is True and route in SEARCH_ROUTES and not resp.headers.get("X-Providers"):
+                ok = "degraded"
+        except requests.RequestException:
+            ok = False
+        samples.append((route, time.perf_counter() - scheduled, ok))
+
+    def run_closed(self, duration, connections):
+        """`connections` clients back to back for `duration` seconds; returns [(route, latency, ok)]"""
+        samples = []
+        stop = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < stop:
+                route, path = self._next_request()
+                self._fire(route, path, time.perf_counter(), samples)
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples
+
+    def run(self, duration):
+        """Fire requests for `duration` seconds; returns [(route, latency, ok)]"""
+        samples = []
+        total = int(self.rps * duration)
+        with ThreadPoolExecutor(max_workers=self.max_clients) as executor:
+            start = time.perf_counter()
+            for i in range(total):
+                scheduled = start + i / self.rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                route, path = self._next_request()
+                executor.submit(self._fire, route, path, scheduled, samples)
+        return samples
+
+
+def run_config(workers, threads, args, mix, connections=None):
+    stub = StubProcess(args)
+    server = None
+    try:
+        server = ServerProcess(workers, threads, stub.env(), args)
+
+        def run(seed, duration):
+            generator = LoadGenerator(server.base, args.rps, mix, seed, args.max_clients)
+            if connections:
+                return generator.run_closed(duration, connections)
+            return generator.run(duration)
+
+        if args.warmup:
+            run(args.seed + 1, args.warmup)
+        started = time.perf_counter()
+        samples = run(args.seed, args.duration)
+        elapsed = time.perf_counter() - started
+        result = {
+            "overall": summarize([(latency, ok) for _, latency, ok in samples], elapsed),
+            "routes": {
+                route: summarize([(latency, ok) for r, latency, ok in samples if r == route], elapsed)
+                for route in mix
+            },
+            "upstream": stub.stats(),
+        }
+        return result
+    finally:
+        if server is not None:
+            server.stop()
+        stub.stop()
+
+
+# -------------------------
+# Reporting
+# -------------------------
+def print_results(runs):
+    width = max(8, max(len(name) for name in runs) + 2)
+    header = f"{'config':<{width}}{'route':<9}{'req':>7}{'err':>6}{'degr':>6}{'shed':>6}{'rps':>9}" + "".join(
+        f"{f'p{pct} ms':>10}" for pct in PERCENTILES
+    )
+    print(header)
+    for name, run in runs.items():
+        for route, summary in [("all", run["overall"])] + list(run["routes"].items()):
+            print(
+                f"{name:<{width}}{route:<9}{summary['requests']:>7}{summary['errors']:>6}"
+                f"{summary.get('degraded', 0):>6}{summary.get('shed', 0):>6}"
+                f"{summary['throughput_rps']:>9.1f}"
+                + "".join(f"{_fmt(summary[f'p{pct}_ms']):>10}" for pct in PERCENTILES)
+            )
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def compare(baseline, runs, tolerance):
+    """Print deltas against a baseline; returns the list of regressions"""
+    regressions = []
+    print(f"\nvs baseline {baseline['meta'].get('created')} (tolerance {tolerance:.0f}%)")
+    for name, run in runs.items():
+        old_run = baseline["runs"].get(name)
+        if old_run is None:
+            print(f"{name}: not in baseline")
+            continue
+        for route, summary in [("all", run["overall"])] + list(run["routes"].items()):
+            old = old_run["overall"] if route == "all" else old_run["routes"].get(route)
+            if not old:
+                continue
+            cells = []
+            for metric, higher_is_worse in (("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+                before, after = old.get(metric), summary.get(metric)
+                if not before or after is None:
+                    continue
+                change = 100.0 * (after - before) / before
+                worse = change > tolerance if higher_is_worse else change < -tolerance
+                cells.append(f"{metric} {before:.1f}->{after:.1f} ({change:+.0f}%)" + (" !" if worse else ""))
+                if worse:
+                    regressions.append((name, route, metric, before, after))
+            print(f"{name:<8}{route:<9}" + "  ".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--configs", default="1x8,2x4,4x2", help="WORKERSxTHREADS list")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn",
+                        help="gunicorn app:app (sync) or uvicorn asgi:app (asyncio)")
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--connections", help="closed-loop client counts, e.g. 8,64,256 (ignores --rps)")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds per config")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds per config")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route weights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-clients", type=int, default=256, help="client threads (in-flight cap)")
+    parser.add_argument("--mood-warmer", action="store_true", help="leave the mood warmer enabled")
+    parser.add_argument("--output", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression in percent")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    runs = {}
+    levels = [int(n) for n in args.connections.split(",")] if args.connections else [None]
+    for workers, threads in parse_configs(args.configs):
+        for connections in levels:
+            name = f"{workers}x{threads}"
+            if args.server != "gunicorn":
+                name = f"{args.server}-{name}"
+            if connections:
+                name += f"@{connections}"
+            load = f"{connections} connections" if connections else f"{args.rps:g} rps"
+            print(f"running {name} at {load} for {args.duration:g}s ...", flush=True)
+            runs[name] = run_config(workers, threads, args, mix, connections)
+
+    results = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "server": args.server,
+            "rps": args.rps,
+            "connections": args.connections,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": mix,
+            "seed": args.seed,
+            "profile": profile_from_args(args),
+            "profile_name": args.profile,
+            "mood_warmer": args.mood_warmer,
+        },
+        "runs": runs,
+    }
+    print()
+    print_results(runs)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, runs, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0f}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
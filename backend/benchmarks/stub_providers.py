@@ -0,0 +1,359 @@
+"""
+Local stand-ins for the YouTube Data API and Spotify Web API endpoints the
+backend calls (search.list, videos.list, client-credentials token, search)
+and for the two image CDNs behind the thumbnail proxy.
+
+Responses are deterministic for a given query and page, shaped like the real
+ones, and delayed/failed according to a latency profile so load tests can be
+repeated without credentials or quota.
+
+    python backend/benchmarks/stub_providers.py --port 9100 --profile realistic
+    python backend/benchmarks/stub_providers.py --profile flaky --error-rate youtube_search=0.2
+
+Point the backend at it with the env vars printed by `--print-env`.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ENDPOINTS = (
+    "youtube_search", "youtube_videos", "spotify_auth", "spotify_search",
+    "youtube_thumbnail", "spotify_thumbnail",
+)
+
+PATHS = {
+    "/youtube/v3/search": "youtube_search",
+    "/youtube/v3/videos": "youtube_videos",
+    "/spotify/api/token": "spotify_auth",
+    "/spotify/v1/search": "spotify_search",
+}
+# Image paths carry the id: /youtube/vi/<id>/hqdefault.jpg, /spotify/image/<id>
+IMAGE_PREFIXES = {"/youtube/vi/": "youtube_thumbnail", "/spotify/image/": "spotify_thumbnail"}
+
+# endpoint -> (latency ms, jitter ms, error rate); "*" applies to every endpoint
+PROFILES = {
+    "instant": {"*": (0, 0, 0.0)},
+    "realistic": {
+        "youtube_search": (120, 40, 0.0),
+        "youtube_videos": (60, 20, 0.0),
+        "spotify_auth": (80, 20, 0.0),
+        "spotify_search": (90, 30, 0.0),
+        "youtube_thumbnail": (30, 10, 0.0),
+        "spotify_thumbnail": (30, 10, 0.0),
+    },
+    "slow": {
+        "youtube_search": (600, 300, 0.0),
+        "youtube_videos": (250, 100, 0.0),
+        "spotify_auth": (300, 100, 0.0),
+        "spotify_search": (800, 400, 0.0),
+        "youtube_thumbnail": (150, 50, 0.0),
+        "spotify_thumbnail": (150, 50, 0.0),
+    },
+    "flaky": {
+        "youtube_search": (150, 80, 0.05),
+        "youtube_videos": (80, 40, 0.05),
+        "spotify_auth": (100, 40, 0.02),
+        "spotify_search": (120, 60, 0.1),
+        "youtube_thumbnail": (40, 20, 0.05),
+        "spotify_thumbnail": (40, 20, 0.05),
+    },
+}
+
+PAGE_COUNT = 5
+SPOTIFY_TOTAL = 100
+
+
+def load_profile(name, overrides=None):
+    """Resolve a named profile to {endpoint: [latency_ms, jitter_ms, error_rate]}"""
+    spec = PROFILES[name]
+    profile = {
+        endpoint: list(spec.get(endpoint, spec.get("*", (0, 0, 0.0))))
+        for endpoint in ENDPOINTS
+    }
+    for field, values in (overrides or {}).items():
+        index = ("latency", "jitter", "error_rate").index(field)
+        for endpoint, value in values.items():
+            targets = ENDPOINTS if endpoint == "*" else (endpoint,)
+            for target in targets:
+                profile[target][index] = value
+    return profile
+
+
+def parse_overrides(spec):
+    """Parse "youtube_search=0.2,*=0.01" into {endpoint: float}"""
+    values = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        endpoint, _, value = part.partition("=")
+        endpoint = endpoint.strip()
+        if endpoint != "*" and endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {endpoint!r}")
+        values[endpoint] = float(value)
+    return values
+
+
+def _digest(*parts):
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _song_seconds(number):
+    """Track length shared by both providers, so cross-provider copies can be merged"""
+    return 150 + number * 37 % 180
+
+
+def youtube_search_body(query, page_token, max_results):
+    page = int(page_token[1:]) if page_token.startswith("p") and page_token[1:].isdigit() else 0
+    artist = query.replace(" hindi bollywood songs", "")
+    items = []
+    for i in range(max_results):
+        number = page * max_results + i + 1
+        # The song number leads the id so videos.list can describe the same song
+        video_id = f"{number:03d}{_digest(query, page, i)[:8]}"
+        items.append({
+            "id": {"kind": "youtube#video", "videoId": video_id},
+            "snippet": {
+                "title": f"{artist} - Song {number} (Official Video)",
+                "channelTitle": f"{artist} Official",
+                "publishedAt": f"{2010 + (page + i) % 14}-06-01T00:00:00Z",
+                "thumbnails": {
+                    "high": {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"},
+                },
+            },
+        })
+    return {
+        "items": items,
+        "nextPageToken": f"p{page + 1}" if page + 1 < PAGE_COUNT else None,
+    }
+
+
+def youtube_videos_body(ids):
+    items = []
+    for video_id in ids:
+        number = int(video_id[:3]) if video_id[:3].isdigit() else 0
+        seconds = _song_seconds(number)
+        items.append({
+            "id": video_id,
+            "snippet": {
+                "title": f"Song {number} (Official Video)",
+                "channelTitle": "Official",
+                "publishedAt": "2019-06-01T00:00:00Z",
+                "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+            },
+            "contentDetails": {"duration": f"PT{seconds // 60}M{seconds % 60}S"},
+        })
+    return {"items": items}
+
+
+def spotify_search_body(query, offset, limit):
+    artist = query.split('"')[1] if query.count('"') >= 2 else query
+    items = []
+    for i in range(offset, min(offset + limit, SPOTIFY_TOTAL)):
+        track_id = _digest(artist, i)[:22]
+        items.append({
+            "id": track_id,
+            "name": f"Song {i + 1}",
+            "artists": [{"name": artist}],
+            "album": {
+                "name": f"{artist} Album {i // 10 + 1}",
+                "images": [{"url": f"https://i.scdn.co/image/{track_id}"}],
+                "release_date": f"{2010 + i % 14}-01-01",
+            },
+            "preview_url": None,
+            "duration_ms": _song_seconds(i + 1) * 1000 + 800,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        })
+    following = offset + limit
+    return {"tracks": {
+        "items": items,
+        "next": f"https://api.spotify.com/v1/search?offset={following}" if following < SPOTIFY_TOTAL else None,
+    }}
+
+
+_IMAGE = None
+
+
+def image_body():
+    """A 480x360 JPEG roughly the weight of a real hqdefault thumbnail (built once)"""
+    global _IMAGE
+    if _IMAGE is None:
+        import io
+        from PIL import Image, ImageDraw
+
+        image = Image.new("RGB", (480, 360), (102, 126, 234))
+        draw = ImageDraw.Draw(image)
+        rng = random.Random(0)
+        for _ in range(200):
+            x, y = rng.randrange(480), rng.randrange(360)
+            draw.ellipse((x, y, x + rng.randrange(10, 60), y + rng.randrange(10, 60)),
+                         fill=tuple(rng.randrange(256) for _ in range(3)))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=90)
+        _IMAGE = out.getvalue()
+    return _IMAGE
+
+
+def backend_env(base):
+    """Backend env vars pointing Config at a stub server at `base`"""
+    return {
+        "YOUTUBE_SEARCH_URL": base + "/youtube/v3/search",
+        "YOUTUBE_VIDEO_URL": base + "/youtube/v3/videos",
+        "SPOTIFY_AUTH_URL": base + "/spotify/api/token",
+        "SPOTIFY_SEARCH_URL": base + "/spotify/v1/search",
+        "THUMB_YOUTUBE_URL": base + "/youtube/vi/{id}/hqdefault.jpg",
+        "THUMB_SPOTIFY_URL": base + "/spotify/image/{id}",
+        "YOUTUBE_API_KEY": "stub-key",
+        "SPOTIFY_CLIENT_ID": "stub-client",
+        "SPOTIFY_CLIENT_SECRET": "stub-secret",
+        # The stand-ins have no quota to protect
+        "YOUTUBE_DAILY_QUOTA": "0",
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, profile, seed=None):
+        super().__init__(address, StubHandler)
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.failures = {endpoint: 0 for endpoint in ENDPOINTS}
+
+    def plan(self, endpoint):
+        """(delay seconds, fail?) for one call"""
+        latency, jitter, error_rate = self.profile[endpoint]
+        with self.lock:
+            self.calls[endpoint] += 1
+            delay = max(0.0, latency + self.random.uniform(-jitter, jitter)) / 1000.0
+            fail = self.random.random() < error_rate
+            if fail:
+                self.failures[endpoint] += 1
+        return delay, fail
+
+    def stats(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "failures": dict(self.failures)}
+
+    def env(self):
+        return backend_env(f"http://{self.server_address[0]}:{self.server_address[1]}")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the backend gave up on this call (timeout)
+
+    def _handle(self, endpoint, build):
+        delay, fail = self.server.plan(endpoint)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._send(503, {"error": {"code": 503, "message": "stub failure"}})
+        elif endpoint in IMAGE_PREFIXES.values():
+            self._send(200, build(), "image/jpeg")
+        else:
+            self._send(200, build())
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if PATHS.get(url.path) != "spotify_auth":
+            return self._send(404, {"error": "not found"})
+        self._handle("spotify_auth", lambda: {
+            "access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600,
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/__stats":
+            return self._send(200, self.server.stats())
+        endpoint = PATHS.get(url.path)
+        if endpoint == "youtube_search":
+            build = lambda: youtube_search_body(  # noqa: E731
+                query.get("q", ""), query.get("pageToken", ""), int(query.get("maxResults", 5)),
+            )
+        elif endpoint == "youtube_videos":
+            build = lambda: youtube_videos_body(  # noqa: E731
+                [i for i in query.get("id", "").split(",") if i]
+            )
+        elif endpoint == "spotify_search":
+            build = lambda: spotify_search_body(  # noqa: E731
+                query.get("q", ""), int(query.get("offset", 0)), int(query.get("limit", 10)),
+            )
+        elif any(url.path.startswith(prefix) for prefix in IMAGE_PREFIXES):
+            endpoint = next(e for p, e in IMAGE_PREFIXES.items() if url.path.startswith(p))
+            build = image_body
+        else:
+            return self._send(404, {"error": "not found"})
+        self._handle(endpoint, build)
+
+
+def start(profile, host="127.0.0.1", port=0, seed=None):
+    """Start a stub server on a daemon thread and return it"""
+    server = StubServer((host, port), profile, seed=seed)
+    threading.Thread(target=server.serve_forever, name="stub-providers", daemon=True).start()
+    return server
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument("--latency", help='per-endpoint ms overrides, e.g. "spotify_search=400"')
+    parser.add_argument("--jitter", help='per-endpoint ms overrides, e.g. "*=50"')
+    parser.add_argument("--error-rate", help='per-endpoint overrides, e.g. "youtube_search=0.1"')
+
+
+def profile_from_args(args):
+    return load_profile(args.profile, {
+        "latency": parse_overrides(args.latency),
+        "jitter": parse_overrides(args.jitter),
+        "error_rate": parse_overrides(args.error_rate),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--print-env", action="store_true", help="print backend env vars and exit")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.print_env:
+        # Only the address goes into the env vars; the stub itself may already be running on it
+        if not args.port:
+            parser.error("--print-env needs a fixed --port")
+        for name, value in backend_env(f"http://{args.host}:{args.port}").items():
+            print(f"{name}={value}")
+        return
+    server = StubServer((args.host, args.port), profile_from_args(args), seed=args.seed)
+    print(json.dumps({"listening": server.server_address, "profile": server.profile}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
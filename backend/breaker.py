@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, name):
+        super().__init__(f"{name} circuit is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over the last `window` calls.
+
+    Failed calls and calls slower than `slow_call_seconds` both count
+    against the provider. Once at least `min_calls` are in the window and
+    their bad fraction reaches `failure_rate`, the breaker opens and callers
+    are rejected without touching the network. After `open_seconds` it goes
+    half-open and lets `half_open_calls` probes through: a good probe closes
+    it, a bad one opens it again.
+    """
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5,
+                 slow_call_seconds=5.0, open_seconds=30.0, half_open_calls=1):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._outcomes = deque(maxlen=window)  # True = bad call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state_locked()
+
+    def _current_state_locked(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def is_open(self):
+        """True while calls are being rejected (half-open counts as available)"""
+        return self.state == OPEN
+
+    def allow(self):
+        """Admit one call; in half-open only a limited number of probes get through"""
+        with self._lock:
+            state = self._current_state_locked()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back an admitted call that ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def record(self, ok, seconds):
+        """Record one finished call (`ok` False for errors, timeouts and 5xx/429)"""
+        bad = not ok or seconds >= self.slow_call_seconds
+        with self._lock:
+            state = self._current_state_locked()
+            if state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if bad:
+                    self._open_locked()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info("%s circuit closed", self.name)
+                return
+            if state == OPEN:
+                return
+            self._outcomes.append(bad)
+            if (len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                self._open_locked()
+
+    def _open_locked(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+        logger.warning("%s circuit opened for %.0fs", self.name, self.open_seconds)
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state_locked()
+            return {
+                "state": state,
+                "window_calls": len(self._outcomes),
+                "window_failures": sum(self._outcomes),
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_in": (
+                    round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                    if state == OPEN else 0
+                ),
+            }
+
+
+class AdaptiveTimeout:
+    """
+    Read timeout derived from recent latencies of one endpoint:
+    `multiplier` x the `percentile` latency of the last `samples` calls,
+    clamped to [`minimum`, the configured timeout]. Timed-out calls are
+    recorded at their elapsed time, so the timeout grows back when a
+    provider slows down instead of cutting it off for good.
+    """
+
+    def __init__(self, percentile=99, multiplier=3.0, minimum=1.0, samples=200, min_samples=20):
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.minimum = minimum
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def read_timeout(self, default):
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return default
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.minimum, min(default, ordered[index] * self.multiplier))
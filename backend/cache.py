@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Fold case and collapse whitespace"""
+    return " ".join(text.lower().split())
+
+
+def make_key(*parts):
+    """Build a cache key, normalizing string parts"""
+    return tuple(normalize_text(part) if isinstance(part, str) else part for part in parts)
+
+
+def estimate_size(value):
+    """Rough in-memory size of JSON-like values (dicts, lists, structs, scalars)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    elif hasattr(value, "__struct_fields__"):
+        for name in value.__struct_fields__:
+            size += estimate_size(getattr(value, name))
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value, size, stored_at):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a TTL and stale-while-revalidate.
+
+    Entries younger than `ttl` are served as hits. Entries older than `ttl`
+    but younger than `ttl + stale_ttl` are served immediately while a
+    background refresh reloads them. Anything older is reloaded inline.
+    Eviction is least-recently-used once `max_entries` or `max_bytes` is hit.
+    """
+
+    def __init__(self, name="cache", ttl=300, stale_ttl=600, max_entries=512,
+                 max_bytes=0, refresh_workers=2, sizeof=estimate_size):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._tasks = set()  # refreshes running on an event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix=f"{name}-refresh"
+        )
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, key):
+        """Return a fresh cached value or None, without loading"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def peek(self, key):
+        """Return a fresh or stale cached value or None, without loading or refreshing"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at >= self.ttl + self.stale_ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if time.monotonic() - entry.stored_at < self.ttl:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry.value
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = _Entry(value, size, time.monotonic())
+            self._bytes += size
+            self._evict_locked()
+
+    def _lookup(self, key):
+        """
+        (found, value, refresh) for get_or_load(): fresh and stale entries are
+        found; `refresh` is True for the first caller to see a stale entry,
+        which then owns its background reload. Expired entries are dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry.value, False
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                    return True, entry.value, refresh
+                self._remove_locked(key)
+            self.misses += 1
+            return False, None, False
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        Falsy results are returned but never cached, so failed upstream
+        calls are retried on the next request.
+        """
+        found, value, refresh = self._lookup(key)
+        if refresh:
+            self._executor.submit(self._refresh, key, loader)
+        if found:
+            return value
+
+        value = loader()
+        if value:
+            self.set(key, value)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """get_or_load() for a coroutine function `loader`; stale entries are reloaded in a task"""
+        found, value, refresh = self._lookup(key)
+        if refresh:
+            task = asyncio.get_running_loop().create_task(self._refresh_async(key, loader))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if found:
+            return value
+
+        value = await loader()
+        if value:
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader):
+        try:
+            self._refreshed(key, loader())
+        except Exception as e:
+            self._refreshed(key, error=e)
+
+    async def _refresh_async(self, key, loader):
+        try:
+            self._refreshed(key, await loader())
+        except Exception as e:
+            self._refreshed(key, error=e)
+
+    def _refreshed(self, key, value=None, error=None):
+        if value:
+            self.set(key, value)
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is None:
+                self.refreshes += 1
+            else:
+                self.refresh_errors += 1
+        if error is not None:
+            logger.error("%s refresh failed for %s: %s", self.name, key, error)
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict_locked(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
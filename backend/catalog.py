@@ -0,0 +1,201 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from models import json_encoder, song_decoder
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    song_key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    data BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts USING fts5(
+    title, artist, album,
+    content='songs', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS songs_ai AFTER INSERT ON songs BEGIN
+    INSERT INTO songs_fts(rowid, title, artist, album)
+    VALUES (new.rowid, new.title, new.artist, new.album);
+END;
+CREATE TRIGGER IF NOT EXISTS songs_ad AFTER DELETE ON songs BEGIN
+    INSERT INTO songs_fts(songs_fts, rowid, title, artist, album)
+    VALUES ('delete', old.rowid, old.title, old.artist, old.album);
+END;
+CREATE TRIGGER IF NOT EXISTS songs_au AFTER UPDATE ON songs BEGIN
+    INSERT INTO songs_fts(songs_fts, rowid, title, artist, album)
+    VALUES ('delete', old.rowid, old.title, old.artist, old.album);
+    INSERT INTO songs_fts(rowid, title, artist, album)
+    VALUES (new.rowid, new.title, new.artist, new.album);
+END;
+"""
+
+UPSERT = """
+INSERT INTO songs (song_key, source, title, artist, album, data, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(song_key) DO UPDATE SET
+    source = excluded.source,
+    title = excluded.title,
+    artist = excluded.artist,
+    album = excluded.album,
+    data = excluded.data,
+    updated_at = excluded.updated_at
+"""
+
+
+def song_key(song):
+    """Catalog key for a Song, or None for songs without a provider id"""
+    if song.youtube_id:
+        return f"youtube:{song.youtube_id}"
+    if song.spotify_id:
+        return f"spotify:{song.spotify_id}"
+    return None
+
+
+def fts_phrase_query(column, text):
+    """Match every word of `text` in `column`, quoting each token for FTS5"""
+    tokens = ['"' + token.replace('"', '""') + '"' for token in text.split()]
+    if not tokens:
+        return None
+    return f"{column} : ({' '.join(tokens)})"
+
+
+class SongCatalog:
+    """
+    Persistent SQLite catalog of every song returned by the providers.
+
+    Songs are upserted by provider id and indexed with FTS5 over title,
+    artist and album. `add()` only enqueues; a single writer thread drains
+    the queue and commits in batches, so ingest never sits on the request
+    path. Reads use one connection per thread in WAL mode.
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.written = 0
+        self.write_errors = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def add(self, songs):
+        """Queue songs for upsert; songs without a provider id are skipped"""
+        now = time.time()
+        for song in songs:
+            key = song_key(song)
+            if key is not None:
+                self._queue.put((key, song, now))
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="catalog-writer", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Give concurrent requests a moment to add to the same transaction
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(conn, batch)
+
+    def _write(self, conn, batch):
+        rows = [
+            (
+                key,
+                song.source,
+                song.title,
+                song.artist,
+                song.album,
+                json_encoder.encode(song),
+                updated_at,
+            )
+            for key, song, updated_at in batch
+        ]
+        try:
+            with conn:
+                conn.executemany(UPSERT, rows)
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            logger.error("Catalog write failed for %d songs: %s", len(rows), e)
+
+    def search_artist(self, artist, limit=10, max_age=None):
+        """Best-matching songs for `artist`, optionally only those seen within `max_age` seconds"""
+        match = fts_phrase_query("artist", artist)
+        if match is None:
+            return []
+        min_updated = time.time() - max_age if max_age else 0
+        try:
+            rows = self._reader().execute(
+                """
+                SELECT s.data FROM songs_fts f
+                JOIN songs s ON s.rowid = f.rowid
+                WHERE songs_fts MATCH ? AND s.updated_at >= ?
+                ORDER BY bm25(songs_fts), s.updated_at DESC
+                LIMIT ?
+                """,
+                (match, min_updated, limit),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Catalog search failed for %s: %s", artist, e)
+            return []
+        return [song_decoder.decode(data) for (data,) in rows]
+
+    def stats(self):
+        try:
+            (rows,) = self._reader().execute("SELECT COUNT(*) FROM songs").fetchone()
+        except sqlite3.Error:
+            rows = None
+        return {
+            "songs": rows,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "write_errors": self.write_errors,
+        }
@@ -0,0 +1,18 @@
+"""
+gunicorn settings for `gunicorn app:app` (read from this directory; see Procfile).
+
+Threaded workers with more threads than requests the admission limiter lets
+through and queues (ADMISSION_LIMIT + ADMISSION_QUEUE): it can only turn a
+request away quickly if a free thread has accepted it, so with fewer threads
+a spike waits in the socket backlog instead of being shed.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.getenv(
+    "GUNICORN_THREADS",
+    int(os.getenv("ADMISSION_LIMIT", 8)) + int(os.getenv("ADMISSION_QUEUE", 16)) + 8,
+))
+timeout = 30
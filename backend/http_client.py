@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from admission import QuotaExceededError
+from breaker import HALF_OPEN, AdaptiveTimeout, CircuitOpenError
+
+try:
+    import httpx
+except ImportError:  # optional: only the ASGI server (asgi.py) needs it
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# httpx errors raised before the request could reach the server
+ASYNC_NEVER_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) if httpx is not None else ()
+
+
+def never_sent(error):
+    """
+    True if a requests error happened before the request could reach the
+    server (DNS failure, refused connection, connect timeout)
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)  # NewConnectionError included
+
+
+def parse_timeouts(spec):
+    """
+    Parse per-endpoint timeouts like "youtube_search=3:10,spotify_auth=2:5"
+    into {"youtube_search": (3.0, 10.0), ...} (connect, read seconds).
+    """
+    timeouts = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            connect, read = value.split(":", 1)
+            timeouts[name.strip()] = (float(connect), float(read))
+        except ValueError:
+            logger.warning("Ignoring invalid upstream timeout: %s", part)
+    return timeouts
+
+
+class UpstreamClient:
+    """
+    Shared HTTP client for every upstream API call.
+
+    A single keep-alive session keeps one connection pool per host, so
+    repeated calls to googleapis.com / api.spotify.com reuse TCP+TLS
+    connections. GETs are retried with jittered exponential backoff on
+    connection errors and retryable statuses; POSTs are never retried.
+    `on_response(endpoint, status, seconds)` is called after every attempt,
+    with status "error" when no response was received.
+
+    `breakers` maps endpoints to CircuitBreakers: calls to an open breaker
+    raise CircuitOpenError immediately, and retries stop once it opens.
+    With `adaptive_timeout` (AdaptiveTimeout kwargs) each endpoint's read
+    timeout follows its observed latency, capped by the configured one.
+    With a `quota` (QuotaBudget) every attempt is paid for up front: a call
+    it cannot pay for raises QuotaExceededError, retries stop once it runs
+    dry, and attempts that never reached the API (DNS, connect errors) are
+    refunded; a read timeout may well have been billed, so it is not.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=16, retries=2,
+                 backoff=0.2, backoff_max=2.0, timeout=(3.05, 12), timeouts=None,
+                 on_response=None, breakers=None, adaptive_timeout=None, quota=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.on_response = on_response
+        self.breakers = dict(breakers or {})
+        self.adaptive_timeout = adaptive_timeout
+        self.quota = quota
+        self._adaptive = {}
+
+        self._open_session(pool_connections, pool_maxsize)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.errors = 0
+        self.rejected = 0
+        self.over_quota = 0
+
+    def _open_session(self, pool_connections, pool_maxsize):
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def timeout_for(self, endpoint):
+        return self.timeouts.get(endpoint, self.timeout)
+
+    def _adaptive_for(self, endpoint):
+        if self.adaptive_timeout is None:
+            return None
+        adaptive = self._adaptive.get(endpoint)
+        if adaptive is None:
+            adaptive = self._adaptive.setdefault(endpoint, AdaptiveTimeout(**self.adaptive_timeout))
+        return adaptive
+
+    def current_timeout(self, endpoint):
+        """(connect, read) for the next call; half-open probes get the full configured timeout"""
+        connect, read = self.timeout_for(endpoint)
+        adaptive = self._adaptive_for(endpoint)
+        breaker = self.breakers.get(endpoint)
+        if adaptive is not None and (breaker is None or breaker.state != HALF_OPEN):
+            read = adaptive.read_timeout(read)
+        return connect, read
+
+    def get(self, endpoint, url, **kwargs):
+        return self._request("GET", endpoint, url, retry=True, **kwargs)
+
+    def post(self, endpoint, url, **kwargs):
+        return self._request("POST", endpoint, url, retry=False, **kwargs)
+
+    def _request(self, method, endpoint, url, retry, **kwargs):
+        breaker = self._admit(endpoint)
+        kwargs.setdefault("timeout", self.current_timeout(endpoint))
+        attempts = self.retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            self._count("requests")
+            started = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._observe(endpoint, "error", started, timed_out=isinstance(e, requests.Timeout),
+                              sent=not never_sent(e))
+                if attempt == attempts - 1 or not self._may_retry(endpoint, breaker):
+                    self._count("errors")
+                    raise
+                logger.warning("%s %s failed (%s), retrying", method, endpoint, e)
+            except Exception:
+                self._observe(endpoint, "error", started, sent=False)
+                raise
+            else:
+                self._observe(endpoint, resp.status_code, started)
+                if (attempt == attempts - 1 or resp.status_code not in RETRY_STATUSES
+                        or not self._may_retry(endpoint, breaker)):
+                    return resp
+                logger.warning("%s %s returned %s, retrying", method, endpoint, resp.status_code)
+                resp.close()
+
+            self._count("retried")
+            time.sleep(self._backoff_delay(attempt))
+
+    def _admit(self, endpoint):
+        """Pay for the first attempt and check the endpoint's breaker; returns the breaker"""
+        # Quota first: a half-open breaker admits only a few probes, and a probe
+        # taken by a call that is then not made would never record an outcome
+        if self.quota is not None and not self.quota.spend(endpoint):
+            self._count("over_quota")
+            raise QuotaExceededError(self.quota.name, endpoint, self.quota.retry_after(endpoint))
+        breaker = self.breakers.get(endpoint)
+        if breaker is not None and not breaker.allow():
+            if self.quota is not None:
+                self.quota.refund(endpoint)
+            self._count("rejected")
+            raise CircuitOpenError(breaker.name)
+        return breaker
+
+    def _may_retry(self, endpoint, breaker):
+        """False once the breaker has opened or the quota cannot pay for another attempt"""
+        if self._circuit_open(breaker):
+            return False
+        return self.quota is None or self.quota.spend(endpoint)
+
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def _observe(self, endpoint, status, started, timed_out=False, sent=True):
+        seconds = time.perf_counter() - started
+        if self.on_response is not None:
+            self.on_response(endpoint, status, seconds)
+        if not sent and self.quota is not None:
+            self.quota.refund(endpoint)
+        breaker = self.breakers.get(endpoint)
+        if breaker is not None:
+            breaker.record(status != "error" and status not in RETRY_STATUSES, seconds)
+        # Fast connection failures say nothing about how long a response takes
+        adaptive = self._adaptive_for(endpoint)
+        if adaptive is not None and (status != "error" or timed_out):
+            adaptive.observe(seconds)
+
+    @staticmethod
+    def _circuit_open(breaker):
+        return breaker is not None and breaker.is_open()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _pool_stats(self):
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[pool.host] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": max(0, pool.num_requests - pool.num_connections),
+            }
+        return hosts
+
+    def stats(self):
+        hosts = self._pool_stats()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retried": self.retried,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "over_quota": self.over_quota,
+                "connections_opened": sum(h["connections_opened"] for h in hosts.values()),
+                "reused": sum(h["reused"] for h in hosts.values()),
+                "hosts": hosts,
+                "read_timeouts": {
+                    endpoint: round(self.current_timeout(endpoint)[1], 2) for endpoint in list(self._adaptive)
+                },
+            }
+
+
+class AsyncUpstreamClient(UpstreamClient):
+    """
+    UpstreamClient for asyncio callers, on one httpx.AsyncClient.
+
+    Retries, breakers, adaptive timeouts and `on_response` work exactly as
+    in UpstreamClient (pass the same breakers to share provider health with
+    the threaded client); `get()` and `post()` are coroutines, and a call
+    waiting on the network holds no thread. Call `aclose()` on shutdown.
+    """
+
+    def __init__(self, max_connections=None, **kwargs):
+        if httpx is None:
+            raise RuntimeError("AsyncUpstreamClient needs httpx (pip install httpx)")
+        self.max_connections = max_connections
+        super().__init__(**kwargs)
+
+    def _open_session(self, pool_connections, pool_maxsize):
+        self.session = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=self.max_connections or None,
+            max_keepalive_connections=pool_maxsize,
+        ))
+
+    async def get(self, endpoint, url, **kwargs):
+        return await self._request("GET", endpoint, url, retry=True, **kwargs)
+
+    async def post(self, endpoint, url, **kwargs):
+        return await self._request("POST", endpoint, url, retry=False, **kwargs)
+
+    async def _request(self, method, endpoint, url, retry, **kwargs):
+        breaker = self._admit(endpoint)
+        connect, read = kwargs.pop("timeout", None) or self.current_timeout(endpoint)
+        kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+        if kwargs.get("params"):
+            # requests leaves out None-valued params; httpx would send them empty
+            kwargs["params"] = {k: v for k, v in kwargs["params"].items() if v is not None}
+        attempts = self.retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            self._count("requests")
+            started = time.perf_counter()
+            try:
+                resp = await self.session.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self._observe(endpoint, "error", started, timed_out=isinstance(e, httpx.TimeoutException),
+                              sent=not isinstance(e, ASYNC_NEVER_SENT))
+                if attempt == attempts - 1 or not self._may_retry(endpoint, breaker):
+                    self._count("errors")
+                    raise
+                logger.warning("%s %s failed (%s), retrying", method, endpoint, e)
+            except asyncio.CancelledError:
+                # No outcome to record; a half-open probe must not stay taken
+                if breaker is not None:
+                    breaker.release()
+                raise
+            except Exception:
+                self._observe(endpoint, "error", started, sent=False)
+                raise
+            else:
+                self._observe(endpoint, resp.status_code, started)
+                if (attempt == attempts - 1 or resp.status_code not in RETRY_STATUSES
+                        or not self._may_retry(endpoint, breaker)):
+                    return resp
+                logger.warning("%s %s returned %s, retrying", method, endpoint, resp.status_code)
+
+            self._count("retried")
+            await asyncio.sleep(self._backoff_delay(attempt))
+
+    def _pool_stats(self):
+        # httpx does not expose per-host pool counters
+        return {}
+
+    async def aclose(self):
+        await self.session.aclose()
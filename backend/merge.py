@@ -0,0 +1,331 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+from catalog import song_key
+
+# Video/upload noise that never belongs to a song title ("Official Music Video",
+# "Full Video Song", "Lyrical Video", "HD", ...), factored by first word because
+# the regex engine tries a flat alternation term by term at every position
+_NOISE_PHRASES = (
+    r"(?:official(?:\s+full)?(?:\s+music|\s+lyric(?:al)?)?\s+(?:video(?:\s+song)?|audio)"
+    r"|full\s+(?:video|audio)(?:\s+song)?|full\s+song|lyric(?:al)?\s+video"
+    r"|(?:video|audio)\s+song|music\s+video|hd\s+video)"
+)
+# Single words are only noise in brackets, as a "| Lyrical" segment or ending the title
+_NOISE_WORDS = r"(?:lyric(?:al)?|lyrics|hd|4k)"
+_NOISE = rf"(?:{_NOISE_PHRASES}|{_NOISE_WORDS})"
+
+# Display cleanup, run on the lowered title: a noise segment between separators
+# ("- Lyrical |"), bracketed noise, a noise phrase ending a segment and a bare
+# noise word ending the title, each taken with the separator or space before it
+# so nothing is left dangling. Every match starts at a space, separator or
+# bracket, which lets the regex engine skip the letters in between.
+_BRACKETED = rf"[\(\[\{{]\s*{_NOISE}\s*[\)\]\}}]"
+_NOISE_ITEM = rf"(?:{_BRACKETED}|{_NOISE}\b)"
+_SEGMENT_END = r"(?=\s*(?:[|\-–:]|$))"
+_DISPLAY_RE = re.compile(
+    rf"[\s|\-–:\(\[\{{](?=\s*(?:[\(\[\{{|\-–:]|off|ful|lyr|vid|aud|mus|hd|4k))(?:"
+    rf"(?<=\s)\s*(?:[|\-–:]\s*{_NOISE_ITEM}{_SEGMENT_END}|{_BRACKETED}|{_NOISE_PHRASES}\b"
+    rf"|{_NOISE_WORDS}\s*$)"
+    rf"|(?<=[|\-–:])\s*{_NOISE_ITEM}{_SEGMENT_END}"
+    rf"|(?<=[\(\[\{{])\s*{_NOISE}\s*[\)\]\}}])"
+)
+# A leading noise segment ("Full Video: ..."), matched apart so _DISPLAY_RE keeps its fast start
+_LEADING_NOISE_RE = re.compile(rf"\s*{_NOISE_ITEM}\s*[|\-–:]\s*")
+# Every noise match contains one of these, so a title without any skips the regex
+_NOISE_HINTS = ("video", "audio", "song", "lyric", "hd", "4k")
+# Match keys: every bracketed group, featured artists and noise in one pass
+_KEY_STRIP_RE = re.compile(
+    rf"[\(\[\{{][^\)\]\}}]*[\)\]\}}]"
+    rf"|\s(?:feat|ft|featuring)\b\.?[^|\-–—:]*"
+    rf"|\b{_NOISE_PHRASES}\b|[|\-–:]\s*{_NOISE_WORDS}\s*(?=[|\-–:]|$)",
+    re.IGNORECASE,
+)
+_SEGMENT_RE = re.compile(r"\s*[|:]\s*|\s+[\-–—~]\s+")
+_ARTIST_SPLIT_RE = re.compile(r"\s*(?:,|&|\bx\b|\band\b|\bfeat\b\.?|\bft\b\.?|\bfeaturing\b)\s*")
+SEPARATOR_CHARS = " |-–—:~"
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+")
+# Words marking a different recording of the same song ("Tum Hi Ho (Reprise)")
+VERSION_WORDS = frozenset((
+    "reprise", "remix", "unplugged", "acoustic", "female", "male", "lofi", "slowed", "reverb",
+    "cover", "instrumental", "karaoke", "live", "mashup",
+))
+
+# Romanized Hindi is spelled many ways (Tum Hi/Hee Ho, Kabira/Kabeera, Mereya/Mereyaa):
+# fold long vowels, aspirated consonants and common letter swaps, then collapse repeats
+_TRANSLIT = {
+    "ee": "i", "oo": "u", "ou": "u", "ph": "f", "bh": "b", "dh": "d", "th": "t",
+    "kh": "k", "gh": "g", "jh": "j", "sh": "s", "ch": "c", "w": "v", "z": "j", "q": "k", "y": "i",
+}
+_TRANSLIT_RE = re.compile("|".join(sorted(_TRANSLIT, key=len, reverse=True)))
+_REPEAT_RE = re.compile(r"([a-z])\1+")
+
+TRIGRAM_DIM = 1024
+
+
+def fold_ascii(text):
+    """Accent-, case- and punctuation-insensitive form of `text` ("Beyoncé!" -> "beyonce")"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(_NON_ALNUM_RE.sub(" ", text).split())
+
+
+def fold(text):
+    """fold_ascii() plus transliteration folding, for matching spelling variants"""
+    text = _TRANSLIT_RE.sub(lambda m: _TRANSLIT[m.group(0)], fold_ascii(text))
+    return _REPEAT_RE.sub(r"\1", text)
+
+
+@lru_cache(maxsize=16384)
+def clean_title(title):
+    """
+    Title for display: upload noise like "(Official Video)" or "| Lyrical"
+    removed. Memoized: the same uploads come back on every refetch of a
+    search or mood playlist.
+    """
+    lowered = title.lower()
+    for hint in _NOISE_HINTS:
+        if hint in lowered:
+            break
+    else:
+        return title.strip()
+    # Matched case-insensitively through the lowered copy, unless lowering changed
+    # the length (a few non-ASCII letters); such titles are matched as they are
+    subject = lowered if len(lowered) == len(title) else title
+    leading = _LEADING_NOISE_RE.match(subject)
+    start = leading.end() if leading else 0
+    pieces = []
+    for match in _DISPLAY_RE.finditer(subject, start):
+        pieces.append(title[start:match.start()])
+        start = match.end()
+    if not start:
+        return title.strip()
+    pieces.append(title[start:])
+    return "".join(pieces).strip(SEPARATOR_CHARS) or title.strip()
+
+
+@lru_cache(maxsize=16384)
+def artist_key(artist):
+    """Folded artist credit; every credited artist is kept so containment checks work"""
+    return " ".join(fold(part) for part in _ARTIST_SPLIT_RE.split(artist or "") if part)
+
+
+@lru_cache(maxsize=65536)
+def title_key(title, artist=""):
+    """
+    Folded song name from a provider title: brackets, featured artists and
+    noise are dropped, and of the remaining "A - B | C" segments the first
+    one that is not just the artist's name is used.
+    """
+    artist_folded = artist_key(artist)
+    segments = _SEGMENT_RE.split(_KEY_STRIP_RE.sub(" ", title or ""))
+    folded = [fold(segment) for segment in segments]
+    artist_tokens = set(artist_folded.split())
+    for segment in folded:
+        if segment and not set(segment.split()) <= artist_tokens:
+            return segment
+    return next((segment for segment in folded if segment), "")
+
+
+@lru_cache(maxsize=65536)
+def display_key(title):
+    """
+    Folded clean_title(): only upload noise is dropped, so "Tum Hi Ho Bandhu"
+    and "Tum Hi Ho (Reprise)" keep apart from "Tum Hi Ho"
+    """
+    return fold(clean_title(title or ""))
+
+
+@lru_cache(maxsize=65536)
+def version_words(title):
+    """Version markers in a title, e.g. ("reprise",)"""
+    return tuple(sorted(VERSION_WORDS.intersection(fold_ascii(title or "").split())))
+
+
+def duration_seconds(duration):
+    """"m:ss" -> seconds (0 when unknown)"""
+    minutes, _, seconds = (duration or "").partition(":")
+    try:
+        return int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return 0
+
+
+def trigram_matrix(keys, dim=TRIGRAM_DIM):
+    """
+    Binary hashed character-trigram vectors for a batch of ASCII keys
+    (n x dim, uint8). All keys are laid out in one padded byte array, so
+    the trigram codes come from a handful of array ops rather than a
+    Python loop over every trigram.
+    """
+    padded = [f" {key} " for key in keys]
+    width = max(3, max((len(key) for key in padded), default=0))
+    raw = "".join(key.ljust(width, "\0") for key in padded).encode("ascii")
+    chars = np.frombuffer(raw, dtype=np.uint8).reshape(len(keys), width).astype(np.int64)
+    a, b, c = chars[:, :-2], chars[:, 1:-1], chars[:, 2:]
+    valid = (a != 0) & (b != 0) & (c != 0)
+    codes = (a * 65599 + b * 257 + c) % dim
+    rows = np.broadcast_to(np.arange(len(keys))[:, None], codes.shape)
+    matrix = np.zeros((len(keys), dim), dtype=np.uint8)
+    matrix[rows[valid], codes[valid]] = 1
+    return matrix
+
+
+def same_values(values):
+    """n x n: pairs of equal (hashable) values"""
+    positions = {}
+    index = np.array([positions.setdefault(value, len(positions)) for value in values])
+    return index[:, None] == index[None, :]
+
+
+def same_numbers(keys):
+    """Pairs of keys carrying the same numbers ("Dhoom 2" is not "Dhoom 3")"""
+    return same_values([tuple(_NUMBER_RE.findall(key)) for key in keys])
+
+
+def shared_provider(songs):
+    """
+    Pairs of songs from a common provider (by youtube_id / spotify_id; songs
+    with neither count as sharing one with everything)
+    """
+    youtube = np.array([bool(s.youtube_id) for s in songs])
+    spotify = np.array([bool(s.spotify_id) for s in songs])
+    unknown = ~(youtube | spotify)
+    return (
+        (youtube[:, None] & youtube[None, :]) | (spotify[:, None] & spotify[None, :])
+        | unknown[:, None] | unknown[None, :]
+    )
+
+
+def pairwise_similarity(keys, containment=False):
+    """
+    Trigram similarity of every pair of keys: cosine, or with `containment`
+    the overlap relative to the smaller key (one artist credit inside
+    another). Computed once per distinct key, then expanded to n x n.
+    """
+    positions = {}
+    index = np.array([positions.setdefault(key, len(positions)) for key in keys])
+    vectors = trigram_matrix(list(positions)).astype(np.float32)
+    overlap = vectors @ vectors.T
+    sizes = vectors.sum(axis=1)
+    sizes[sizes == 0] = 1
+    if containment:
+        scores = overlap / np.minimum.outer(sizes, sizes)
+    else:
+        scores = overlap / np.sqrt(np.outer(sizes, sizes))
+    return scores[np.ix_(index, index)]
+
+
+def canonical(members):
+    """
+    One Song from songs that are the same track: playback links and the
+    thumbnail come from YouTube, track metadata (title, credits, album, year,
+    audio duration, preview) from Spotify, everything else from the first.
+    """
+    first = members[0]
+    youtube = next((s for s in members if s.youtube_id), None)
+    spotify = next((s for s in members if s.spotify_id), None)
+    if youtube is None or spotify is None:
+        return first
+    primary = first if first is youtube or first is spotify else youtube
+    return primary.__class__(
+        title=spotify.title,
+        artist=spotify.artist or youtube.artist,
+        source=primary.source,
+        year=spotify.year or youtube.year,
+        duration=spotify.duration or youtube.duration,
+        thumbnail=youtube.thumbnail or spotify.thumbnail,
+        play_url=primary.play_url,
+        embed_url=primary.embed_url,
+        youtube_id=youtube.youtube_id,
+        spotify_id=spotify.spotify_id,
+        album=spotify.album,
+        preview_url=spotify.preview_url,
+    )
+
+
+class SongMerger:
+    """
+    Batched cross-provider de-duplication.
+
+    Candidates are keyed once (compiled normalization + transliteration
+    folding), then matched all-pairs in one shot: title trigram cosine
+    (with matching numbers and version words), artist trigram containment
+    and duration agreement are NumPy matrices over every song in the batch.
+    Songs from the same provider are only duplicates when their cleaned
+    titles are equal: a provider's own titles are close variants of each
+    other ("Tum Hi Ho" / "Tum Hi Ho Bandhu") and YouTube's artist is the
+    search query, so similarity alone would merge different songs. Each
+    matched group becomes one canonical track carrying both youtube_id
+    and spotify_id.
+    """
+
+    def __init__(self, title_threshold=0.75, artist_threshold=0.5, duration_tolerance=45):
+        self.title_threshold = title_threshold
+        self.artist_threshold = artist_threshold
+        self.duration_tolerance = duration_tolerance
+
+    def match(self, songs):
+        """
+        Boolean matrix: match[i, j] for i < j when songs i and j are the same
+        track (a same-provider duplicate, such as a lyric video, only with an
+        equal display_key()).
+        """
+        n = len(songs)
+        if n < 2:
+            return np.zeros((n, n), dtype=bool)
+        keys = [title_key(s.title, s.artist) for s in songs]
+        titles = pairwise_similarity(keys)
+        artists = pairwise_similarity([artist_key(s.artist) for s in songs], containment=True)
+        durations = np.array([duration_seconds(s.duration) for s in songs])
+        known = durations > 0
+        close = (
+            (np.abs(durations[:, None] - durations[None, :]) <= self.duration_tolerance)
+            | ~known[:, None] | ~known[None, :]
+        )
+        similar = (titles >= self.title_threshold) & ~shared_provider(songs)
+        exact = same_values([display_key(s.title) for s in songs])
+        matched = (
+            (similar | exact) & same_numbers(keys) & same_values([version_words(s.title) for s in songs])
+            & (artists >= self.artist_threshold) & close
+        )
+        return np.triu(matched, k=1)
+
+    def merge(self, served, candidates):
+        """
+        Fold `candidates` into the already-served songs and each other.
+
+        Returns (groups, updates): `groups` is [(canonical Song, member keys)]
+        for new tracks in candidate order; `updates` is {served index:
+        (canonical Song, member keys)} for served songs that gained an id.
+        """
+        if not candidates:
+            return [], {}
+        songs = list(served) + list(candidates)
+        matched = self.match(songs)
+        has_match = matched.any(axis=0)
+        first_match = np.where(has_match, matched.argmax(axis=0), -1)
+
+        leader = list(range(len(songs)))
+        for j in range(len(served), len(songs)):
+            i = int(first_match[j])
+            if i >= 0:
+                leader[j] = leader[i]
+
+        members = {}
+        for index, root in enumerate(leader):
+            members.setdefault(root, []).append(songs[index])
+
+        groups, updates = [], {}
+        for root, group in members.items():
+            keys = [key for key in (song_key(song) for song in group) if key is not None]
+            if root < len(served):
+                if len(group) > 1:
+                    merged = canonical(group)
+                    updates[root] = (merged, keys)
+            else:
+                groups.append((canonical(group), keys))
+        return groups, updates
@@ -0,0 +1,189 @@
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # label key -> [count per bucket..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), list(v)] for k, v in self._values.items()]
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms, exported in Prometheus text format.
+
+    Recording is a dict update under a per-metric lock. To aggregate across
+    gunicorn workers, each process periodically dumps its raw values to
+    `<directory>/<pid>.json`; rendering sums every file in the directory, so
+    any worker can answer a scrape for the whole server. Collectors are
+    callables evaluated at dump time for values that already live elsewhere
+    (e.g. cache hit counters).
+    """
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory or os.path.join(
+            tempfile.gettempdir(), f"sangam-metrics-{os.getppid()}"
+        )
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._collectors = []
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def register_collector(self, name, help_text, collect):
+        """`collect()` returns [(labels_dict, value), ...] for a counter named `name`"""
+        self._collectors.append((name, help_text, collect))
+
+    def ensure_flusher(self):
+        """Start the dump thread once per process (workers fork after import)"""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Metrics flush failed: %s", e)
+
+    def snapshot(self):
+        data = {}
+        for name, metric in self._metrics.items():
+            kind = "histogram" if isinstance(metric, Histogram) else "counter"
+            data[name] = {
+                "type": kind,
+                "help": metric.help,
+                "buckets": list(metric.buckets) if kind == "histogram" else None,
+                "values": metric.snapshot(),
+            }
+        for name, help_text, collect in self._collectors:
+            try:
+                values = [[list(_label_key(labels)), value] for labels, value in collect()]
+            except Exception as e:
+                logger.error("Metrics collector %s failed: %s", name, e)
+                continue
+            data[name] = {"type": "counter", "help": help_text, "buckets": None, "values": values}
+        return data
+
+    def flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _merged(self):
+        """Sum the dumps of every worker (including this one, freshly flushed)"""
+        self.flush()
+        merged = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, metric in data.items():
+                target = merged.setdefault(name, {**metric, "values": {}})
+                for labels, value in metric["values"]:
+                    key = tuple(tuple(pair) for pair in labels)
+                    if metric["type"] == "histogram":
+                        current = target["values"].get(key)
+                        target["values"][key] = (
+                            value if current is None else [a + b for a, b in zip(current, value)]
+                        )
+                    else:
+                        target["values"][key] = target["values"].get(key, 0) + value
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4) for all workers"""
+        lines = []
+        for name, metric in sorted(self._merged().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for labels, value in sorted(metric["values"].items()):
+                if metric["type"] == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(metric["buckets"]) + ["+Inf"], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
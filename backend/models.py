@@ -0,0 +1,168 @@
+import base64
+from typing import Dict, List, Optional, Union
+
+import msgspec
+
+
+class Song(msgspec.Struct, omit_defaults=True, gc=False):
+    """One track as returned by the /api endpoints (unset provider fields are omitted)"""
+    title: str
+    artist: str
+    source: str
+    year: str = ""
+    duration: str = ""
+    thumbnail: Optional[str] = None
+    play_url: Optional[str] = None
+    embed_url: Optional[str] = None
+    youtube_id: Optional[str] = None
+    spotify_id: Optional[str] = None
+    album: Optional[str] = None
+    preview_url: Optional[str] = None
+
+
+# -------------------------
+# YouTube Data API v3 (only the fields we read)
+# -------------------------
+class YouTubeThumbnail(msgspec.Struct, gc=False):
+    url: Optional[str] = None
+
+
+class YouTubeThumbnails(msgspec.Struct, gc=False):
+    default: Optional[YouTubeThumbnail] = None
+    medium: Optional[YouTubeThumbnail] = None
+    high: Optional[YouTubeThumbnail] = None
+    maxres: Optional[YouTubeThumbnail] = None
+
+    def best(self):
+        for thumbnail in (self.maxres, self.high, self.medium, self.default):
+            if thumbnail is not None and thumbnail.url:
+                return thumbnail.url
+        return None
+
+
+class YouTubeSnippet(msgspec.Struct, gc=False):
+    title: str = "Unknown"
+    channelTitle: str = "Unknown Artist"
+    publishedAt: str = ""
+    thumbnails: YouTubeThumbnails = msgspec.field(default_factory=YouTubeThumbnails)
+
+
+class YouTubeContentDetails(msgspec.Struct, gc=False):
+    duration: str = "PT4M20S"
+
+
+class YouTubeSearchId(msgspec.Struct, gc=False):
+    videoId: Optional[str] = None
+
+
+class YouTubeSearchItem(msgspec.Struct, gc=False):
+    id: YouTubeSearchId = msgspec.field(default_factory=YouTubeSearchId)
+    snippet: YouTubeSnippet = msgspec.field(default_factory=YouTubeSnippet)
+
+
+class YouTubeSearchResponse(msgspec.Struct, gc=False):
+    items: List[YouTubeSearchItem] = []
+    nextPageToken: Optional[str] = None
+
+
+class YouTubeVideo(msgspec.Struct, gc=False):
+    id: str
+    snippet: YouTubeSnippet = msgspec.field(default_factory=YouTubeSnippet)
+    contentDetails: YouTubeContentDetails = msgspec.field(default_factory=YouTubeContentDetails)
+
+
+class YouTubeVideosResponse(msgspec.Struct, gc=False):
+    items: List[YouTubeVideo] = []
+
+
+# -------------------------
+# Spotify Web API (only the fields we read)
+# -------------------------
+class SpotifyImage(msgspec.Struct, gc=False):
+    url: Optional[str] = None
+
+
+class SpotifyAlbum(msgspec.Struct, gc=False):
+    name: Optional[str] = None
+    images: List[SpotifyImage] = []
+    release_date: Optional[str] = None
+
+
+class SpotifyArtist(msgspec.Struct, gc=False):
+    name: Optional[str] = None
+
+
+class SpotifyTrack(msgspec.Struct, gc=False):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    artists: List[SpotifyArtist] = []
+    album: SpotifyAlbum = msgspec.field(default_factory=SpotifyAlbum)
+    preview_url: Optional[str] = None
+    duration_ms: int = 0
+    external_urls: Dict[str, str] = {}
+
+
+class SpotifyTracks(msgspec.Struct, gc=False):
+    items: List[SpotifyTrack] = []
+    next: Optional[str] = None
+
+
+class SpotifySearchResponse(msgspec.Struct, gc=False):
+    tracks: SpotifyTracks = msgspec.field(default_factory=SpotifyTracks)
+
+
+# -------------------------
+# Search pagination
+# -------------------------
+class SearchCursor(msgspec.Struct, omit_defaults=True):
+    """Per-provider page state for the next /api/search page (None = provider exhausted)"""
+    artist: str
+    limit: int
+    youtube: Optional[str] = None
+    spotify: Optional[int] = None
+    seen: List[str] = []
+
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json_encoder.encode(cursor)).rstrip(b"=").decode()
+
+
+def decode_cursor(token):
+    """Decode an opaque cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return cursor_decoder.decode(raw)
+    except (ValueError, msgspec.DecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+
+# -------------------------
+# Batch search
+# -------------------------
+class BatchSearchItem(msgspec.Struct):
+    artist: str
+    limit: Optional[int] = None
+
+
+class BatchSearchRequest(msgspec.Struct):
+    """POST /api/search/batch body: artist names or {"artist", "limit"} objects"""
+    artists: List[Union[str, BatchSearchItem]]
+    limit: int = 10
+
+
+def decode_batch_request(body):
+    """Decode a batch search body, raising ValueError if it is malformed"""
+    try:
+        return batch_search_decoder.decode(body)
+    except msgspec.DecodeError as e:
+        raise ValueError(f"Invalid batch request: {e}") from e
+
+
+# Decoders are built once; decoding straight into structs skips the dict layer
+youtube_search_decoder = msgspec.json.Decoder(YouTubeSearchResponse)
+youtube_videos_decoder = msgspec.json.Decoder(YouTubeVideosResponse)
+spotify_search_decoder = msgspec.json.Decoder(SpotifySearchResponse)
+song_decoder = msgspec.json.Decoder(Song)
+cursor_decoder = msgspec.json.Decoder(SearchCursor)
+batch_search_decoder = msgspec.json.Decoder(BatchSearchRequest)
+json_encoder = msgspec.json.Encoder()
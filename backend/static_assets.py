@@ -0,0 +1,256 @@
+import atexit
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from flask import Response, send_file
+
+try:
+    import brotli
+except ImportError:  # optional: brotli variants are skipped without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/javascript", "application/json", "image/svg+xml",
+)
+MIN_COMPRESS_SIZE = 1024
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+ASSET_REF_RE = re.compile(r'(\s(?:href|src)=")([^"#?:]+)(")')
+BUILD_DIR_RE = re.compile(r"build-(\d+)-.*")
+
+
+class Asset:
+    __slots__ = ("path", "mimetype", "etag", "variants", "immutable")
+
+    def __init__(self, path, mimetype, etag, variants, immutable=False):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        # encoding -> (file path, etag); "identity" is always present
+        self.variants = variants
+        self.immutable = immutable
+
+
+def fingerprint_name(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:10]}{ext}"
+
+
+def parse_etags(header):
+    return {tag.strip() for tag in (header or "").split(",") if tag.strip()}
+
+
+def pid_alive(pid):
+    if os.name == "nt":  # os.kill() would terminate it; assume it is alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AssetManifest:
+    """
+    Startup-built index of the frontend tree.
+
+    Every file is stat'ed and hashed once, so requests never touch the
+    filesystem except to sendfile the chosen variant. Compressible files get
+    gzip (and brotli when installed) siblings written to a cache directory.
+    Each asset is also reachable under a content-hashed name
+    (style.<hash>.css) that is served with immutable cache headers, and HTML
+    files are rewritten to reference those names.
+
+    Each process builds into its own build-<pid>-* subdirectory of
+    `cache_dir`, so workers can share one cache_dir. A process removes its
+    build directory at exit and, on its first build, those of processes
+    that are gone. Without a cache_dir a temporary one is used and removed
+    at exit.
+    """
+
+    def __init__(self, root, cache_dir=None, index="index.html"):
+        self.root = os.path.abspath(root)
+        self.index = index
+        if cache_dir is None:
+            cache_dir = tempfile.mkdtemp(prefix="sangam-static-")
+            atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        atexit.register(self._remove_build_dir)
+        self._build_dir = None
+        self._assets = {}
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.builds = 0
+
+    def build(self):
+        """Scan the tree and swap in a fresh manifest"""
+        if not os.path.isdir(self.root):
+            self._assets, self._mtimes = {}, {}
+            return
+        if self._build_dir is None:
+            self._remove_stale_build_dirs()
+        build_dir = tempfile.mkdtemp(prefix=f"build-{os.getpid()}-", dir=self.cache_dir)
+        files = self._scan()
+
+        assets = {}
+        html = []
+        fingerprints = {}
+        for rel_path, full_path in files.items():
+            mimetype = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+            if mimetype == "text/html":
+                html.append((rel_path, full_path, mimetype))
+                continue
+            with open(full_path, "rb") as f:
+                data = f.read()
+            asset = self._make_asset(rel_path, full_path, data, mimetype, build_dir)
+            assets[rel_path] = asset
+            hashed = fingerprint_name(rel_path, asset.etag.strip('"'))
+            fingerprints[rel_path] = hashed
+            assets[hashed] = Asset(asset.path, mimetype, asset.etag, asset.variants, immutable=True)
+
+        # HTML is served under its own name, pointing at the fingerprinted assets
+        for rel_path, full_path, mimetype in html:
+            with open(full_path, "rb") as f:
+                data = self._rewrite_refs(f.read(), rel_path, fingerprints)
+            path = os.path.join(build_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            assets[rel_path] = self._make_asset(rel_path, path, data, mimetype, build_dir)
+
+        with self._lock:
+            old_build_dir, self._build_dir = self._build_dir, build_dir
+            self._assets = assets
+            self._mtimes = {rel: os.stat(path).st_mtime_ns for rel, path in files.items()}
+            self.builds += 1
+        if old_build_dir is not None:
+            shutil.rmtree(old_build_dir, ignore_errors=True)
+        logger.info("Built static manifest: %d files, %d urls", len(files), len(assets))
+
+    def _remove_stale_build_dirs(self):
+        """Build directories left by processes that were killed or restarted"""
+        for name in os.listdir(self.cache_dir):
+            match = BUILD_DIR_RE.fullmatch(name)
+            if match and int(match.group(1)) != os.getpid() and not pid_alive(int(match.group(1))):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def _remove_build_dir(self):
+        if self._build_dir is not None:
+            shutil.rmtree(self._build_dir, ignore_errors=True)
+
+    def _scan(self):
+        files = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                files[rel_path] = full_path
+        return files
+
+    def _make_asset(self, rel_path, full_path, data, mimetype, build_dir):
+        digest = hashlib.sha256(data).hexdigest()
+        etag = f'"{digest[:32]}"'
+        variants = {"identity": (full_path, etag)}
+        if len(data) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+            encoders = [("gzip", ".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+            if brotli is not None:
+                encoders.append(("br", ".br", lambda d: brotli.compress(d, quality=11)))
+            for encoding, suffix, compress in encoders:
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                path = os.path.join(build_dir, rel_path + suffix)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(compressed)
+                variants[encoding] = (path, f'"{digest[:32]}-{encoding}"')
+        return Asset(full_path, mimetype, etag, variants)
+
+    def _rewrite_refs(self, data, rel_path, fingerprints):
+        base = os.path.dirname(rel_path)
+
+        def replace(match):
+            ref = match.group(2)
+            target = os.path.normpath(os.path.join(base, ref)).replace(os.sep, "/")
+            hashed = fingerprints.get(target)
+            if hashed is None:
+                return match.group(0)
+            new_ref = os.path.relpath(hashed, base or ".").replace(os.sep, "/")
+            return f"{match.group(1)}{new_ref}{match.group(3)}"
+
+        return ASSET_REF_RE.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+    def lookup(self, path):
+        """Asset for a URL path, falling back to index.html for SPA routes"""
+        assets = self._assets
+        return assets.get(path or self.index) or assets.get(self.index)
+
+    def serve(self, asset, request):
+        """Response for `asset`, honouring Accept-Encoding and If-None-Match"""
+        accepted = request.accept_encodings
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and accepted[candidate]:
+                encoding = candidate
+                break
+        path, etag = asset.variants[encoding]
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE if asset.immutable else REVALIDATE_CACHE,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = parse_etags(request.headers.get("If-None-Match"))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=304, headers=headers)
+
+        response = send_file(path, mimetype=asset.mimetype, conditional=False, etag=False)
+        response.headers.update(headers)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    def start_watcher(self, interval=1.0):
+        """Dev mode: poll the tree and rebuild the manifest when a file changes"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="static-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                current = {rel: os.stat(path).st_mtime_ns for rel, path in self._scan().items()}
+            except OSError:
+                continue
+            if current != self._mtimes:
+                logger.info("Frontend changed, rebuilding static manifest")
+                try:
+                    self.build()
+                except Exception as e:
+                    logger.error("Static manifest rebuild failed: %s", e)
+
+    def stats(self):
+        return {
+            "urls": len(self._assets),
+            "builds": self.builds,
+            "brotli": brotli is not None,
+        }
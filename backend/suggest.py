@@ -0,0 +1,243 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+
+import msgspec
+
+from merge import fold_ascii
+
+logger = logging.getLogger(__name__)
+
+# Every folded key is lowercase ASCII, so this sorts after any continuation of a prefix
+_PREFIX_END = "\x7f"
+
+
+def name_keys(folded):
+    """Index keys for a folded name: the whole name and each later word onwards
+    ("arijit singh" -> "arijit singh", "singh")"""
+    words = folded.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    In-memory autocomplete over artist and channel names.
+
+    Names are folded (case, accents, punctuation) and indexed under every
+    word start in one sorted list, so a lookup is a bisect plus a scan of the
+    matching slice. One- and two-letter prefixes match too much of the list
+    to scan per keystroke; for those the best `top_size` names are kept
+    ready and updated as names are added. Popularity is how often a name
+    has come back from the providers.
+
+    The index is snapshotted to `path` every `snapshot_interval` seconds
+    (if it changed) and reloaded at start-up. Each process merges the file
+    into its own index before writing it, so gunicorn workers converge on
+    the same set of names.
+    """
+
+    def __init__(self, path=None, max_names=50000, snapshot_interval=60.0,
+                 short_prefix=2, top_size=32):
+        self.path = path
+        self.max_names = max_names
+        self.snapshot_interval = snapshot_interval
+        self.short_prefix = short_prefix
+        self.top_size = top_size
+
+        self._keys = []      # sorted index keys
+        self._owners = []    # folded name for each key
+        self._names = {}     # folded name -> display name
+        self._scores = {}    # folded name -> popularity
+        self._tops = {}      # short prefix -> up to top_size folded names
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._snapshot_pid = None
+        self._seen_mtime = None
+        self.snapshots = 0
+        self.snapshot_at = None
+
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except Exception as e:
+                logger.error("Suggest snapshot %s could not be loaded: %s", path, e)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, names, weight=1.0):
+        """Count one appearance of each name (new names are indexed)"""
+        with self._lock:
+            for name in names:
+                self._add_locked(name, weight)
+        self._ensure_snapshotter()
+
+    def _add_locked(self, name, weight):
+        display = " ".join((name or "").split())
+        folded = fold_ascii(display)
+        if not folded:
+            return
+        if folded in self._names:
+            self._scores[folded] += weight
+            # Prefer a properly cased spelling over a typed-in lowercase one
+            if self._names[folded].islower() and not display.islower():
+                self._names[folded] = display
+        elif len(self._names) < self.max_names:
+            self._names[folded] = display
+            self._scores[folded] = weight
+            self._insert_locked(folded)
+        else:
+            return
+        self._dirty = True
+        self._offer_locked(folded)
+
+    def _insert_locked(self, folded):
+        for key in name_keys(folded):
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._owners.insert(position, folded)
+
+    def _offer_locked(self, folded):
+        """Keep `folded` in the ready-made lists of its short prefixes if it ranks there"""
+        score = self._scores[folded]
+        for key in name_keys(folded):
+            for length in range(1, min(self.short_prefix, len(key)) + 1):
+                top = self._tops.setdefault(key[:length], [])
+                if folded in top:
+                    continue
+                if len(top) < self.top_size:
+                    top.append(folded)
+                    continue
+                weakest = min(top, key=self._scores.__getitem__)
+                if self._scores[weakest] < score:
+                    top[top.index(weakest)] = folded
+
+    def suggest(self, prefix, limit=8):
+        """Up to `limit` display names starting (at any word) with `prefix`, most popular first"""
+        query = fold_ascii(prefix or "")
+        if not query or limit <= 0:
+            return []
+        with self._lock:
+            if len(query) <= self.short_prefix:
+                candidates = self._tops.get(query, ())
+            else:
+                lo = bisect.bisect_left(self._keys, query)
+                hi = bisect.bisect_left(self._keys, query + _PREFIX_END, lo)
+                candidates = dict.fromkeys(self._owners[lo:hi])
+            best = heapq.nlargest(limit, candidates, key=self._scores.__getitem__)
+            return [self._names[name] for name in best]
+
+    def entries(self):
+        """[[display name, popularity], ...] for every indexed name"""
+        with self._lock:
+            names, scores = dict(self._names), dict(self._scores)
+        return [[display, scores[name]] for name, display in names.items()]
+
+    def load(self):
+        """Merge the snapshot at `path` into the index (scores: the higher one wins)"""
+        started = time.perf_counter()
+        self._seen_mtime = self._file_mtime()
+        with open(self.path, "rb") as f:
+            data = msgspec.json.decode(f.read())
+        entries = [(fold_ascii(name), name, score) for name, score in data.get("names", [])]
+        added = False
+        with self._lock:
+            for folded, name, score in entries:
+                if folded in self._names:
+                    if self._scores[folded] < score:
+                        self._scores[folded] = score
+                        self._offer_locked(folded)
+                elif folded and len(self._names) < self.max_names:
+                    self._names[folded] = name
+                    self._scores[folded] = score
+                    added = True
+        if added:
+            self._rebuild()
+        logger.info("Loaded %d suggestions from %s in %.1fms",
+                    len(entries), self.path, (time.perf_counter() - started) * 1000)
+
+    def _rebuild(self):
+        """
+        Re-sort the key list and recompute the short-prefix lists in bulk
+        (after a load). The work happens outside the lock, so lookups keep
+        being answered; names added meanwhile are inserted before the swap.
+        """
+        with self._lock:
+            names = list(self._names)
+            scores = dict(self._scores)
+        pairs = sorted((key, folded) for folded in names for key in name_keys(folded))
+        candidates = {}
+        for folded in names:
+            for key in name_keys(folded):
+                for length in range(1, min(self.short_prefix, len(key)) + 1):
+                    candidates.setdefault(key[:length], set()).add(folded)
+        tops = {
+            prefix: heapq.nlargest(self.top_size, group, key=scores.__getitem__)
+            for prefix, group in candidates.items()
+        }
+        with self._lock:
+            self._keys = [key for key, _ in pairs]
+            self._owners = [folded for _, folded in pairs]
+            self._tops = tops
+            for folded in self._names.keys() - set(names):
+                self._insert_locked(folded)
+                self._offer_locked(folded)
+
+    def snapshot(self):
+        """Write the index (merged with what other processes wrote) to `path`"""
+        if not self.path:
+            return
+        # Only re-read the file when another process has written it since
+        if self._file_mtime() not in (None, self._seen_mtime):
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning("Suggest snapshot %s unreadable, overwriting: %s", self.path, e)
+        with self._lock:
+            self._dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(msgspec.json.encode({"saved_at": time.time(), "names": self.entries()}))
+        os.replace(tmp_path, self.path)
+        self._seen_mtime = self._file_mtime()
+        self.snapshots += 1
+        self.snapshot_at = time.time()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _ensure_snapshotter(self):
+        """Start the snapshot thread once per process (workers fork after import)"""
+        pid = os.getpid()
+        if not self.path or self._snapshot_pid == pid:
+            return
+        with self._lock:
+            if self._snapshot_pid == pid:
+                return
+            self._snapshot_pid = pid
+        threading.Thread(target=self._snapshot_loop, name="suggest-snapshot", daemon=True).start()
+
+    def _snapshot_loop(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            if not self._dirty:
+                continue
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error("Suggest snapshot failed: %s", e)
+
+    def stats(self):
+        return {
+            "names": len(self._names),
+            "keys": len(self._keys),
+            "snapshots": self.snapshots,
+            "snapshot_at": self.snapshot_at,
+        }
@@ -0,0 +1,48 @@
+"""
+Shared fixtures. The backend modules import each other flat, as gunicorn
+runs them from backend/, and app.py reads its Config and opens its data
+files at import, so `backend` points both at a temporary directory and a
+local stub provider server before importing it.
+"""
+import importlib
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND, os.path.join(BACKEND, "benchmarks")]
+
+import stub_providers  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def stub():
+    """Instant YouTube/Spotify stand-ins for the whole session"""
+    server = stub_providers.start(stub_providers.load_profile("instant"), seed=1)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def backend(stub, tmp_path_factory):
+    """The app module, configured against `stub` with its data under a temporary directory"""
+    data = tmp_path_factory.mktemp("data")
+    os.environ.update(stub.env())
+    os.environ.update({
+        "CATALOG_PATH": str(data / "catalog.db"),
+        "STATIC_CACHE_DIR": str(data / "static"),
+        "SUGGEST_SNAPSHOT_PATH": str(data / "suggest.json"),
+        "THUMB_CACHE_DIR": str(data / "thumbs"),
+        "MOOD_SNAPSHOT_PATH": str(data / "moods.json"),
+        "METRICS_DIR": str(data / "metrics"),
+        "YOUTUBE_QUOTA_STATE_PATH": "",
+        "MOOD_WARMER_ENABLED": "false",
+        "FLASK_DEBUG": "false",
+    })
+    return importlib.import_module("app")
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+import pytest
+
+from admission import AdmissionLimiter, AsyncAdmissionLimiter, Overloaded, QuotaBudget, QuotaExceededError
+from http_client import UpstreamClient
+
+COSTS = {"youtube_search": 100, "youtube_videos": 1}
+
+
+def test_limiter_rejects_beyond_the_queue():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=0)
+    ticket = limiter.acquire()
+    with pytest.raises(Overloaded) as raised:
+        limiter.acquire()
+    assert (raised.value.reason, raised.value.retry_after) == ("queue_full", 1)
+    limiter.release(ticket)
+    limiter.release(limiter.acquire())
+    stats = limiter.stats()
+    assert (stats["active"], stats["admitted"], stats["rejected"]["queue_full"]) == (0, 2, 1)
+
+
+def test_limiter_waits_at_most_max_wait():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=1, max_wait=0.05)
+    limiter.acquire()
+    with pytest.raises(Overloaded) as raised:
+        limiter.acquire()
+    assert raised.value.reason == "timeout"
+    assert limiter.stats()["queued"] == 1 and limiter.stats()["waiting"] == 0
+
+
+def test_released_slot_goes_to_a_waiter():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=1, max_wait=5)
+    ticket = limiter.acquire()
+    admitted = threading.Event()
+
+    def wait():
+        with limiter.slot():
+            admitted.set()
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while not limiter.stats()["waiting"]:
+        pass
+    limiter.release(ticket)
+    waiter.join(5)
+    assert admitted.is_set()
+    assert limiter.stats()["active"] == 0
+
+
+def test_slot_is_released_on_error():
+    limiter = AdmissionLimiter("test", limit=1)
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            raise RuntimeError("boom")
+    assert limiter.stats()["active"] == 0
+
+
+def test_async_limiter_serves_waiters_in_order():
+    async def run():
+        limiter = AsyncAdmissionLimiter("test", limit=1, max_queue=2, max_wait=5)
+        order = []
+
+        async def task(name):
+            async with limiter.slot():
+                order.append(name)
+                await asyncio.sleep(0)
+
+        results = await asyncio.gather(*(task(name) for name in "abcd"), return_exceptions=True)
+        return order, results, limiter.stats()
+
+    order, results, stats = asyncio.run(run())
+    assert order == ["a", "b", "c"]
+    assert results[3].reason == "queue_full"
+    assert (stats["active"], stats["admitted"]) == (0, 3)
+
+
+def test_async_limiter_times_out():
+    async def run():
+        limiter = AsyncAdmissionLimiter("test", limit=1, max_queue=1, max_wait=0.05)
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as raised:
+            await limiter.acquire()
+        return raised.value.reason, limiter.stats()
+
+    reason, stats = asyncio.run(run())
+    assert reason == "timeout"
+    assert (stats["active"], stats["waiting"]) == (1, 0)
+
+
+def test_quota_spend_and_refund():
+    quota = QuotaBudget("youtube", daily_units=250, burst=250, costs=COSTS)
+    assert quota.spend("youtube_search") and quota.spend("youtube_search")
+    assert not quota.spend("youtube_search")
+    assert quota.retry_after("youtube_search") > 0
+    quota.refund("youtube_search")
+    assert quota.spend("youtube_search")
+    assert quota.spend("spotify_search")  # free
+    stats = quota.stats()
+    assert (stats["spent_today"], stats["rejected"], stats["shared"]) == (200, 1, False)
+
+
+def test_quota_burst_caps_a_spike():
+    quota = QuotaBudget("youtube", daily_units=10000, burst=200, costs=COSTS)
+    assert quota.spend("youtube_search") and quota.spend("youtube_search")
+    assert not quota.spend("youtube_search")
+    assert quota.spend("youtube_videos") is False  # the bucket is empty, whatever the day allows
+
+
+def test_quota_available_keeps_a_reserve():
+    quota = QuotaBudget("youtube", daily_units=300, burst=300, costs=COSTS)
+    assert quota.available("youtube_search", reserve=200)
+    quota.spend("youtube_search")
+    assert quota.available("youtube_search")
+    assert not quota.available("youtube_search", reserve=200)
+    assert quota.stats()["spent_today"] == 100
+
+
+def test_unlimited_quota():
+    quota = QuotaBudget("youtube", daily_units=0, burst=0, costs=COSTS)
+    assert all(quota.spend("youtube_search") for _ in range(100))
+    assert quota.retry_after("youtube_search") == 0
+
+
+def test_quota_is_shared_through_the_state_file(tmp_path):
+    path = str(tmp_path / "quota" / "youtube.json")
+    first = QuotaBudget("youtube", daily_units=300, burst=300, costs=COSTS, path=path)
+    second = QuotaBudget("youtube", daily_units=300, burst=300, costs=COSTS, path=path)
+    assert first.spend("youtube_search") and second.spend("youtube_search") and first.spend("youtube_search")
+    assert not second.spend("youtube_search")
+    assert second.stats()["spent_today"] == 300 and second.stats()["shared"] is True
+
+    first.refund("youtube_search")
+    assert second.spend("youtube_search")
+
+
+def test_client_raises_once_the_quota_is_spent(stub):
+    quota = QuotaBudget("youtube", daily_units=100, burst=100, costs=COSTS)
+    client = UpstreamClient(quota=quota)
+    url = stub.env()["YOUTUBE_SEARCH_URL"]
+    calls = stub.stats()["calls"].get("youtube_search", 0)
+    assert client.get("youtube_search", url, params={"q": "quota"}).status_code == 200
+    with pytest.raises(QuotaExceededError) as raised:
+        client.get("youtube_search", url, params={"q": "quota"})
+    assert raised.value.endpoint == "youtube_search" and raised.value.retry_after > 0
+    assert stub.stats()["calls"].get("youtube_search", 0) == calls + 1
+    assert client.stats()["over_quota"] == 1
+
+
+@pytest.fixture
+def full_admission(backend, monkeypatch):
+    monkeypatch.setattr(backend, "admission", AdmissionLimiter("search", limit=0, max_queue=0))
+
+
+def test_shed_search_without_local_songs_is_a_503(client, full_admission):
+    response = client.get("/api/search/Shed Unknown Artist")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_shed_search_serves_what_is_cached(client, backend, monkeypatch):
+    assert client.get("/api/search/Shed Known Artist?limit=3").status_code == 200
+    monkeypatch.setattr(backend, "admission", AdmissionLimiter("search", limit=0, max_queue=0))
+    response = client.get("/api/search/Shed Known Artist?limit=3")
+    assert response.status_code == 200
+    assert response.get_json()["songs"]
+    assert response.headers["Cache-Control"] == backend.config.FALLBACK_CACHE_CONTROL
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+@pytest.fixture(scope="module")
+def asgi(backend):
+    import asgi
+    return asgi
+
+
+@pytest.fixture(scope="module")
+def request_asgi(asgi):
+    """Send requests through the ASGI app; one event loop for the module, as under uvicorn"""
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://asgi.test")
+
+    def send(method, url, **kwargs):
+        return loop.run_until_complete(client.request(method, url, **kwargs))
+
+    yield send
+    loop.run_until_complete(client.aclose())
+    loop.close()
+
+
+def test_search(request_asgi):
+    response = request_asgi("GET", "/api/search/asgi artist one?limit=4")
+    body = response.json()
+    assert response.status_code == 200
+    assert len(body["songs"]) == 4 and body["next_cursor"]
+    assert body["songs"][0]["thumbnail"].startswith("http://asgi.test/api/thumb/")
+    assert "Accept" in response.headers["vary"]
+
+    page2 = request_asgi("GET", "/api/search/asgi artist one", params={"cursor": body["next_cursor"]}).json()
+    assert len(page2["songs"]) == 4
+
+
+def test_search_etag(request_asgi):
+    etag = request_asgi("GET", "/api/search/asgi artist two").headers["etag"]
+    response = request_asgi("GET", "/api/search/asgi artist two", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_search_ndjson(request_asgi):
+    response = request_asgi("GET", "/api/search/asgi artist three?limit=5", headers=NDJSON)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["done"] is True
+    assert sum(len(line.get("songs", [])) for line in lines) == 5
+
+
+def test_bad_cursor(request_asgi):
+    assert request_asgi("GET", "/api/search/asgi?cursor=!!bad").status_code == 400
+
+
+def test_batch(request_asgi):
+    body = request_asgi("POST", "/api/search/batch", json={"artists": ["Asgi Four", "Asgi Five"], "limit": 2}).json()
+    assert (body["succeeded"], body["failed"]) == (2, 0)
+    assert [r["artist"] for r in body["results"]] == ["Asgi Four", "Asgi Five"]
+    assert request_asgi("POST", "/api/search/batch", content=b"{}").status_code == 400
+
+
+def test_mood(request_asgi):
+    response = request_asgi("GET", "/api/mood/party")
+    assert response.status_code == 200 and response.json()["songs"]
+
+
+def test_health_reports_the_async_limiter(request_asgi, backend):
+    body = request_asgi("GET", "/api/health").json()
+    assert body["success"] is True
+    assert body["admission"]["limit"] == backend.config.ASGI_ADMISSION_LIMIT
+
+
+def test_flask_routes_are_served_too(request_asgi):
+    assert request_asgi("GET", "/").headers["content-type"].startswith("text/html")
+    assert request_asgi("GET", "/api/metrics").text.startswith("# HELP")
+    assert request_asgi("GET", "/api/thumb/placeholder").headers["content-type"].startswith("image/svg+xml")
+
+
+def test_same_bodies_as_flask(request_asgi, client):
+    flask_body = client.get("/api/search/asgi parity?limit=3", base_url="http://asgi.test").get_json()
+    assert request_asgi("GET", "/api/search/asgi parity?limit=3").json() == flask_body
@@ -0,0 +1,94 @@
+import json
+import threading
+
+import pytest
+
+from models import decode_batch_request
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def test_decode_batch_request():
+    batch = decode_batch_request(b'{"artists": ["A", {"artist": "B", "limit": 3}], "limit": 5}')
+    assert batch.limit == 5
+    assert batch.artists[0] == "A" and batch.artists[1].limit == 3
+    with pytest.raises(ValueError):
+        decode_batch_request(b'{"artists": [1]}')
+
+
+def test_parse_batch(backend, monkeypatch):
+    assert backend.parse_batch(b'{"artists": [" A ", {"artist": "B", "limit": 500}, {"artist": "C"}]}') == [
+        ("A", 10), ("B", 50), ("C", 10),
+    ]
+    monkeypatch.setattr(backend.config, "BATCH_MAX_ARTISTS", 2)
+    for body in (b'{"artists": []}', b'{"artists": ["  "]}', b'{"artists": ["a", "b", "c"]}', b"{"):
+        with pytest.raises(ValueError):
+            backend.parse_batch(body)
+
+
+def test_batch_results_in_request_order(client):
+    response = client.post("/api/search/batch", json={"artists": ["Batch One", {"artist": "Batch Two", "limit": 3}]})
+    body = response.get_json()
+    assert body["success"] is True and (body["succeeded"], body["failed"]) == (2, 0)
+    assert [(r["index"], r["artist"], r["limit"]) for r in body["results"]] == [(0, "Batch One", 10), (1, "Batch Two", 3)]
+    assert len(body["results"][1]["songs"]) == 3
+
+
+def test_batch_ndjson(client):
+    response = client.post("/api/search/batch", json={"artists": ["Batch Three", "Batch Four"], "limit": 2},
+                           headers=NDJSON)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1]
+    assert lines[-1] == {"done": True, "succeeded": 2, "failed": 0}
+
+
+def test_invalid_batch_is_a_400(client):
+    response = client.post("/api/search/batch", data=b'{"limit": 3}')
+    assert response.status_code == 400
+    assert "artists" in response.get_json()["error"]
+
+
+def test_get_is_a_405(client):
+    response = client.get("/api/search/batch")
+    assert response.status_code == 405
+    assert response.headers["Allow"] == "POST"
+
+
+def test_one_failing_artist_does_not_fail_the_batch(client, backend, monkeypatch):
+    search_page = backend.search_page
+
+    def flaky(artist, limit, cursor=None, pool=None):
+        if artist == "Broken Artist":
+            raise RuntimeError("provider exploded")
+        return search_page(artist, limit, cursor, pool)
+
+    monkeypatch.setattr(backend, "search_page", flaky)
+    body = client.post("/api/search/batch", json={"artists": ["Broken Artist", "Batch Five"]}).get_json()
+    assert (body["success"], body["succeeded"], body["failed"]) == (True, 1, 1)
+    assert body["results"][0] == {"index": 0, "artist": "Broken Artist", "limit": 10,
+                                  "success": False, "error": "provider exploded"}
+
+
+def test_slow_artists_time_out(client, backend, monkeypatch):
+    release = threading.Event()
+
+    def stuck(artist, limit, cursor=None, pool=None):
+        release.wait(5)
+        return [], [], None, False
+
+    monkeypatch.setattr(backend, "search_page", stuck)
+    monkeypatch.setattr(backend.config, "BATCH_DEADLINE_MS", 100)
+    try:
+        body = client.post("/api/search/batch", json={"artists": ["Slow Artist"]}).get_json()
+    finally:
+        release.set()
+    assert body["success"] is False
+    assert body["results"][0]["error"] == "Timed out after 100ms"
+
+
+def test_batch_searches_use_their_own_provider_pool(backend, monkeypatch):
+    pools = []
+    monkeypatch.setattr(backend, "search_page", lambda artist, limit, cursor=None, pool=None:
+                        pools.append(pool) or ([], [], None, False))
+    backend.batch_search("Pool Artist", 3)
+    assert pools == [backend.batch_provider_pool]
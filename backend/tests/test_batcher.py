@@ -0,0 +1,92 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batcher import AsyncVideoDetailsBatcher, VideoDetailsBatcher
+from cache import TTLCache
+
+
+class Fetch:
+    """Records each upstream batch; ids starting with "missing" are unknown to YouTube"""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    def items(self, ids):
+        self.batches.append(list(ids))
+        if self.error is not None:
+            raise self.error
+        return {i: {"id": i} for i in ids if not i.startswith("missing")}
+
+    def __call__(self, ids):
+        return self.items(ids)
+
+    async def coroutine(self, ids):
+        return self.items(ids)
+
+
+def test_concurrent_lookups_share_a_batch():
+    fetch = Fetch()
+    batcher = VideoDetailsBatcher(fetch, window_ms=100)
+    with ThreadPoolExecutor(3) as pool:
+        results = list(pool.map(lambda ids: batcher.get(ids, timeout=5), [["a", "b"], ["b", "c"], ["d"]]))
+    assert results[1] == {"b": {"id": "b"}, "c": {"id": "c"}}
+    assert len(fetch.batches) == 1
+    assert sorted(fetch.batches[0]) == ["a", "b", "c", "d"]
+    assert batcher.stats()["shared"] == 1
+
+
+def test_batches_are_split_at_max_batch():
+    fetch = Fetch()
+    batcher = VideoDetailsBatcher(fetch, window_ms=50, max_batch=2)
+    assert len(batcher.get(["a", "b", "c"], timeout=5)) == 3
+    assert [len(batch) for batch in fetch.batches] == [2, 1]
+
+
+def test_cached_ids_skip_the_upstream_call():
+    fetch = Fetch()
+    batcher = VideoDetailsBatcher(fetch, window_ms=1, cache=TTLCache(ttl=60))
+    batcher.get(["a", "missing"], timeout=5)
+    assert batcher.get(["a"], timeout=5) == {"a": {"id": "a"}}
+    assert len(fetch.batches) == 1
+    assert batcher.stats()["cache_hits"] == 1
+
+
+def test_fetch_errors_reach_every_caller():
+    batcher = VideoDetailsBatcher(Fetch(error=RuntimeError("quota")), window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.get(["a"], timeout=5)
+    assert batcher.stats()["pending"] == 0
+
+
+def test_async_lookups_share_a_batch():
+    fetch = Fetch()
+    batcher = AsyncVideoDetailsBatcher(fetch.coroutine, window_ms=20)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.get(["a", "b"], timeout=5),
+            batcher.get(["b", "missing"], timeout=5),
+        )
+
+    first, second = asyncio.run(main())
+    assert first == {"a": {"id": "a"}, "b": {"id": "b"}}
+    assert second == {"b": {"id": "b"}}
+    assert len(fetch.batches) == 1
+
+
+def test_async_long_window_holds_the_batch_open():
+    fetch = Fetch()
+    batcher = AsyncVideoDetailsBatcher(fetch.coroutine, window_ms=1)
+
+    async def late():
+        await asyncio.sleep(0.03)
+        return await batcher.get(["b"], timeout=5)
+
+    async def main():
+        await asyncio.gather(batcher.get(["a"], timeout=5, window_ms=200), late())
+
+    asyncio.run(main())
+    assert fetch.batches == [["a", "b"]]
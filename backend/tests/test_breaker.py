@@ -0,0 +1,102 @@
+import types
+
+import pytest
+
+import breaker as breaker_module
+import stub_providers
+from breaker import CLOSED, HALF_OPEN, OPEN, AdaptiveTimeout, CircuitBreaker, CircuitOpenError
+from http_client import UpstreamClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(breaker_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_opens_at_the_failure_rate(clock):
+    breaker = CircuitBreaker("youtube", window=10, min_calls=4, failure_rate=0.5)
+    for ok in (True, False, True):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker("spotify", min_calls=2, failure_rate=1.0, slow_call_seconds=2.0)
+    breaker.record(True, 2.5)
+    breaker.record(True, 3.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_limited_probes(clock):
+    breaker = CircuitBreaker("youtube", min_calls=1, failure_rate=1.0, open_seconds=30)
+    breaker.record(False, 0.1)
+    clock.now += 29
+    assert breaker.is_open()
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+    assert not breaker.is_open()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_good_probe_closes_bad_probe_reopens(clock):
+    breaker = CircuitBreaker("youtube", min_calls=1, failure_rate=1.0, open_seconds=30)
+    breaker.record(False, 0.1)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 2
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_adaptive_timeout():
+    adaptive = AdaptiveTimeout(percentile=90, multiplier=2.0, minimum=1.0, min_samples=10)
+    for _ in range(9):
+        adaptive.observe(0.2)
+    assert adaptive.read_timeout(12) == 12  # not enough samples yet
+    for _ in range(10):
+        adaptive.observe(0.2)
+    assert adaptive.read_timeout(12) == 1.0  # clamped to the minimum
+    for _ in range(50):
+        adaptive.observe(4.0)
+    assert adaptive.read_timeout(12) == 8.0
+    assert adaptive.read_timeout(5) == 5
+
+
+def test_client_rejects_calls_while_open():
+    breaker = CircuitBreaker("youtube_search", min_calls=1, failure_rate=1.0)
+    breaker.record(False, 0.1)
+    client = UpstreamClient(breakers={"youtube_search": breaker})
+    with pytest.raises(CircuitOpenError):
+        client.get("youtube_search", "http://127.0.0.1:9/")
+    assert client.stats()["rejected"] == 1
+    assert client.stats()["requests"] == 0
+
+
+def test_client_opens_the_breaker_on_5xx_but_not_4xx():
+    failing = stub_providers.start(stub_providers.load_profile("instant", {"error_rate": {"youtube_search": 1.0}}))
+    try:
+        breaker = CircuitBreaker("youtube_search", min_calls=4, failure_rate=0.5)
+        client = UpstreamClient(retries=0, breakers={"youtube_search": breaker})
+        base = failing.env()["YOUTUBE_SEARCH_URL"]
+        for _ in range(2):
+            assert client.get("youtube_search", base.replace("/search", "/missing")).status_code == 404
+        assert breaker.state == CLOSED
+        for _ in range(2):
+            assert client.get("youtube_search", base).status_code == 503
+        assert breaker.state == OPEN
+    finally:
+        failing.shutdown()
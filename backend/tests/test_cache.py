@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import types
+
+import pytest
+
+import cache
+from cache import TTLCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_make_key_normalizes_strings():
+    assert make_key("search", "  Arijit   SINGH ", 10) == ("search", "arijit singh", 10)
+
+
+def test_get_serves_fresh_entries_only(clock):
+    c = TTLCache(ttl=10, stale_ttl=20)
+    c.set("k", "v")
+    assert c.get("k") == "v"
+    clock.now += 10
+    assert c.get("k") is None
+    assert c.peek("k") == "v"
+    clock.now += 20
+    assert c.peek("k") is None
+    assert c.stats()["hits"] == 1
+    assert c.stats()["stale_hits"] == 1
+
+
+def test_get_or_load_caches_truthy_results(clock):
+    c = TTLCache(ttl=10)
+    calls = []
+    assert c.get_or_load("k", lambda: calls.append(1) or ["song"]) == ["song"]
+    assert c.get_or_load("k", lambda: calls.append(1) or ["other"]) == ["song"]
+    assert calls == [1]
+
+
+def test_get_or_load_does_not_cache_failures(clock):
+    c = TTLCache(ttl=10)
+    assert c.get_or_load("k", lambda: []) == []
+    assert c.get_or_load("k", lambda: ["song"]) == ["song"]
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    c = TTLCache(ttl=10, stale_ttl=100)
+    c.set("k", "old")
+    clock.now += 50
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    assert c.get_or_load("k", loader) == "old"
+    assert c.get_or_load("k", loader) == "old"
+    release.set()
+    c._executor.shutdown(wait=True)
+    assert calls == [1]
+    assert c.get("k") == "new"
+    assert c.stats()["refreshes"] == 1
+
+
+def test_failed_refresh_keeps_the_stale_entry(clock):
+    c = TTLCache(ttl=10, stale_ttl=100)
+    c.set("k", "old")
+    clock.now += 50
+
+    def loader():
+        raise RuntimeError("upstream down")
+
+    assert c.get_or_load("k", loader) == "old"
+    c._executor.shutdown(wait=True)
+    assert c.peek("k") == "old"
+    assert c.stats()["refresh_errors"] == 1
+
+
+def test_expired_entry_is_reloaded_inline(clock):
+    c = TTLCache(ttl=10, stale_ttl=10)
+    c.set("k", "old")
+    clock.now += 25
+    assert c.get_or_load("k", lambda: "new") == "new"
+    assert c.stats()["stale_hits"] == 0
+
+
+def test_lru_eviction_by_entries(clock):
+    c = TTLCache(max_entries=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.stats()["evictions"] == 1
+
+
+def test_byte_budget(clock):
+    c = TTLCache(max_bytes=100, sizeof=len)
+    c.set("a", "x" * 60)
+    c.set("b", "y" * 60)
+    assert c.get("a") is None
+    assert c.get("b") == "y" * 60
+    c.set("huge", "z" * 101)
+    assert c.get("huge") is None
+    assert c.stats()["bytes"] == 60
+
+
+def test_get_or_load_async_refreshes_in_a_task(clock):
+    c = TTLCache(ttl=10, stale_ttl=100)
+
+    async def load_new():
+        return "new"
+
+    async def main():
+        assert await c.get_or_load_async("k", load_new) == "new"
+        c.set("k", "old")
+        clock.now += 50
+        assert await c.get_or_load_async("k", load_new) == "old"
+        await asyncio.gather(*c._tasks)
+        return c.get("k")
+
+    assert asyncio.run(main()) == "new"
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from catalog import SongCatalog, fts_phrase_query, song_key
+from models import Song
+
+
+def song(title, artist, youtube_id=None, spotify_id=None):
+    source = "youtube" if youtube_id else "spotify"
+    return Song(title=title, artist=artist, source=source, youtube_id=youtube_id, spotify_id=spotify_id)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return SongCatalog(str(tmp_path / "db" / "catalog.db"), flush_interval=0.01)
+
+
+def add(catalog, songs):
+    """Add songs and wait for the writer to commit them"""
+    target = catalog.written + sum(1 for s in songs if song_key(s))
+    catalog.add(songs)
+    deadline = time.monotonic() + 5
+    while catalog.written < target:
+        assert time.monotonic() < deadline, "catalog writer did not commit"
+        time.sleep(0.01)
+
+
+def test_song_key():
+    assert song_key(song("a", "b", youtube_id="yt1", spotify_id="sp1")) == "youtube:yt1"
+    assert song_key(song("a", "b", spotify_id="sp1")) == "spotify:sp1"
+    assert song_key(Song(title="a", artist="b", source="youtube")) is None
+
+
+def test_fts_phrase_query_quotes_tokens():
+    assert fts_phrase_query("artist", 'ac "dc"') == 'artist : ("ac" """dc""")'
+    assert fts_phrase_query("artist", "   ") is None
+
+
+def test_search_by_artist(catalog):
+    add(catalog, [
+        song("Tum Hi Ho", "Arijit Singh", youtube_id="yt1"),
+        song("Kesariya", "Arijit Singh, Pritam", spotify_id="sp1"),
+        song("Teri Meri", "Shreya Ghoshal", youtube_id="yt2"),
+        song("No id", "Arijit Singh"),
+    ])
+    titles = {s.title for s in catalog.search_artist("arijit singh")}
+    assert titles == {"Tum Hi Ho", "Kesariya"}
+    assert catalog.search_artist("singh arijit", limit=1)[0].artist.startswith("Arijit")
+    assert catalog.stats()["songs"] == 3
+
+
+def test_diacritics_and_punctuation_match(catalog):
+    add(catalog, [song("Song", "Béyoncé", youtube_id="yt1")])
+    assert [s.title for s in catalog.search_artist("beyonce")] == ["Song"]
+    assert catalog.search_artist('beyonce" OR "x') == []
+
+
+def test_upsert_replaces_a_song(catalog):
+    add(catalog, [song("Old Title", "Atif Aslam", youtube_id="yt1")])
+    add(catalog, [song("New Title", "Atif Aslam", youtube_id="yt1")])
+    assert [s.title for s in catalog.search_artist("atif")] == ["New Title"]
+    assert catalog.stats()["songs"] == 1
+
+
+def test_max_age_filters_old_songs(catalog):
+    add(catalog, [song("Old", "Sonu Nigam", youtube_id="yt1")])
+    with catalog._reader() as conn:
+        conn.execute("UPDATE songs SET updated_at = updated_at - 3600")
+    assert catalog.search_artist("sonu", max_age=60) == []
+    assert len(catalog.search_artist("sonu", max_age=7200)) == 1
+
+
+def test_first_search_page_starts_from_the_catalog(backend):
+    add(backend.catalog, [song("Catalog Hit", "Catalog Only Artist", youtube_id="catalog0001")])
+    songs, providers, _, _ = backend.search_page("catalog only artist", 5)
+    assert providers[0] == "catalog"
+    assert songs[0].title == "Catalog Hit"
@@ -0,0 +1,43 @@
+def upstream_calls(stub):
+    return sum(stub.stats()["calls"].values())
+
+
+def test_search_response_carries_etag_and_cache_control(client, backend):
+    response = client.get("/api/search/etag artist one")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"')
+    assert response.headers["Cache-Control"] == backend.config.SEARCH_CACHE_CONTROL
+
+
+def test_if_none_match_gets_304_without_going_upstream(client, stub):
+    etag = client.get("/api/search/etag artist two").headers["ETag"]
+    before = upstream_calls(stub)
+    response = client.get("/api/search/etag artist two", headers={"If-None-Match": f'"stale", {etag}'})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.get_data() == b""
+    assert upstream_calls(stub) == before
+
+
+def test_stale_etag_gets_the_full_response(client):
+    response = client.get("/api/search/etag artist three", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.get_json()["songs"]
+
+
+def test_etag_is_stable_for_the_same_body(client):
+    first = client.get("/api/search/etag artist four").headers["ETag"]
+    assert client.get("/api/search/etag artist four").headers["ETag"] == first
+
+
+def test_mood_etag(client, backend):
+    etag = client.get("/api/mood/romantic").headers["ETag"]
+    response = client.get("/api/mood/romantic", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["Cache-Control"] == backend.config.MOOD_CACHE_CONTROL
+
+
+def test_play_urls_are_immutable(client, backend):
+    response = client.get("/api/play/abc123?source=youtube")
+    assert response.get_json()["embed_url"].startswith("https://www.youtube.com/embed/abc123")
+    assert response.headers["Cache-Control"] == backend.config.PLAY_CACHE_CONTROL
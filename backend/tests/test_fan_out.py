@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def providers(backend, monkeypatch):
+    """Replace the provider searches with fakes: {name: seconds to answer, or an exception}"""
+    release = threading.Event()
+
+    def install(**behaviour):
+        def fake(name):
+            def search(artist, limit, page):
+                outcome = behaviour[name]
+                if isinstance(outcome, Exception):
+                    raise outcome
+                release.wait(outcome)
+                return [f"{name}:{artist}"], None
+            return search
+
+        for name in backend.SEARCH_PROVIDERS:
+            monkeypatch.setitem(backend.SEARCH_PROVIDERS, name, fake(name))
+
+    yield install
+    release.set()  # let providers that missed the deadline finish
+
+
+def test_all_providers_answer(backend, providers):
+    providers(youtube=0, spotify=0)
+    results, completed = backend.fan_out_search("arijit", 5)
+    assert completed == ["youtube", "spotify"]
+    assert results["spotify"] == (["spotify:arijit"], None)
+
+
+def test_deadline_drops_slow_provider(backend, providers):
+    providers(youtube=0, spotify=5)
+    started = time.monotonic()
+    results, completed = backend.fan_out_search("arijit", 5, deadline_ms=100)
+    assert time.monotonic() - started < 2
+    assert completed == ["youtube"]
+
+
+def test_failed_provider_is_skipped(backend, providers):
+    providers(youtube=RuntimeError("quota"), spotify=0)
+    results, completed = backend.fan_out_search("arijit", 5)
+    assert completed == ["spotify"]
+
+
+def test_unordered_collection_yields_first_answer_first(backend, providers):
+    providers(youtube=0.3, spotify=0)
+    futures = backend.submit_providers("arijit", 5)
+    order = [name for name, _ in backend.collect_providers(futures, "arijit", ordered=False)]
+    assert order == ["spotify", "youtube"]
+
+
+def test_providers_run_concurrently(backend, providers):
+    providers(youtube=0.3, spotify=0.3)
+    started = time.monotonic()
+    _, completed = backend.fan_out_search("arijit", 5)
+    assert len(completed) == 2
+    assert time.monotonic() - started < 0.55
+
+
+def test_search_against_stub_providers(backend):
+    results, completed = backend.fan_out_search("fan out artist", 4)
+    assert sorted(completed) == ["spotify", "youtube"]
+    assert all(songs for songs, _ in results.values())
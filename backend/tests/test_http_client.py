@@ -0,0 +1,102 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import UpstreamClient, never_sent, parse_timeouts
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        statuses = self.server.statuses
+        status = statuses.pop(0) if statuses else 200
+        self.server.seen.append(self.command)
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = _reply
+
+
+@pytest.fixture
+def scripted():
+    """Server answering with the statuses in `server.statuses`, then 200s"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.daemon_threads = True
+    server.statuses = []
+    server.seen = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_parse_timeouts():
+    assert parse_timeouts("youtube_search=3:10, spotify_auth=2:5.5,bogus=1,nope") == {
+        "youtube_search": (3.0, 10.0),
+        "spotify_auth": (2.0, 5.5),
+    }
+    assert parse_timeouts("") == {}
+
+
+def test_per_endpoint_timeouts():
+    client = UpstreamClient(timeout=(3, 12), timeouts={"spotify_auth": (2, 5)})
+    assert client.timeout_for("spotify_auth") == (2, 5)
+    assert client.timeout_for("youtube_search") == (3, 12)
+
+
+def test_connections_are_reused(stub):
+    client = UpstreamClient()
+    url = stub.env()["YOUTUBE_SEARCH_URL"]
+    for _ in range(3):
+        assert client.get("youtube_search", url, params={"q": "reuse"}).status_code == 200
+    stats = client.stats()
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["reused"] == 2
+
+
+def test_get_retries_retryable_statuses(scripted):
+    scripted.statuses = [503, 429]
+    seen = []
+    client = UpstreamClient(retries=2, backoff=0, on_response=lambda e, s, t: seen.append(s))
+    assert client.get("youtube_search", scripted.url).status_code == 200
+    assert seen == [503, 429, 200]
+    assert client.stats()["retried"] == 2
+
+
+def test_last_attempt_response_is_returned(scripted):
+    scripted.statuses = [503, 503]
+    client = UpstreamClient(retries=1, backoff=0)
+    assert client.get("youtube_search", scripted.url).status_code == 503
+
+
+def test_post_is_not_retried(scripted):
+    scripted.statuses = [503]
+    client = UpstreamClient(retries=2, backoff=0)
+    assert client.post("spotify_auth", scripted.url, data={"x": 1}).status_code == 503
+    assert scripted.seen == ["POST"]
+
+
+def test_connection_errors_are_retried_then_raised():
+    client = UpstreamClient(retries=1, backoff=0)
+    with pytest.raises(requests.ConnectionError) as raised:
+        client.get("youtube_search", f"http://127.0.0.1:{closed_port()}/")
+    assert never_sent(raised.value)
+    stats = client.stats()
+    assert (stats["requests"], stats["retried"], stats["errors"]) == (2, 1, 1)
@@ -0,0 +1,83 @@
+import subprocess
+import sys
+
+import pytest
+import requests
+
+import loadtest
+import stub_providers
+
+
+def test_parse_configs_and_mix():
+    assert loadtest.parse_configs("1x8, 2x4,3") == [(1, 8), (2, 4), (3, 1)]
+    assert loadtest.parse_mix("search=6,mood=2") == {"search": 6.0, "mood": 2.0}
+    with pytest.raises(ValueError):
+        loadtest.parse_mix("nope=1")
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile([7], 95) == 7
+    assert loadtest.percentile([], 50) is None
+
+
+def test_summarize():
+    samples = [(0.1, True), (0.2, True), (0.3, "degraded"), (0.4, False), (0.5, "shed")]
+    summary = loadtest.summarize(samples, duration=2)
+    assert summary["requests"] == 5
+    assert (summary["errors"], summary["degraded"], summary["shed"]) == (1, 1, 1)
+    assert summary["throughput_rps"] == 1.0
+    assert summary["p50_ms"] == 300.0
+    assert summary["max_ms"] == 500.0
+
+
+def test_compare_flags_regressions():
+    baseline = {"meta": {}, "runs": {"1x8": {"overall": {"p95_ms": 100, "p99_ms": 200, "throughput_rps": 50},
+                                             "routes": {}}}}
+    runs = {"1x8": {"overall": {"p95_ms": 130, "p99_ms": 205, "throughput_rps": 49}, "routes": {}}}
+    assert loadtest.compare(baseline, runs, tolerance=10) == [("1x8", "all", "p95_ms", 100, 130)]
+
+
+def test_profile_overrides():
+    profile = stub_providers.load_profile("realistic", {
+        "latency": stub_providers.parse_overrides("*=5"),
+        "error_rate": stub_providers.parse_overrides("spotify_search=0.5"),
+    })
+    assert profile["youtube_search"][0] == 5
+    assert profile["spotify_search"][2] == 0.5
+    with pytest.raises(ValueError):
+        stub_providers.parse_overrides("bogus=1")
+
+
+def test_stub_answers_like_the_providers(stub):
+    env = stub.env()
+    search = requests.get(env["YOUTUBE_SEARCH_URL"], params={"q": "x", "maxResults": 3}).json()
+    assert len(search["items"]) == 3 and search["nextPageToken"] == "p1"
+    again = requests.get(env["YOUTUBE_SEARCH_URL"], params={"q": "x", "maxResults": 3}).json()
+    assert again == search
+    token = requests.post(env["SPOTIFY_AUTH_URL"], data={"grant_type": "client_credentials"}).json()
+    assert token["access_token"]
+    last = requests.get(env["SPOTIFY_SEARCH_URL"], params={"q": "x", "offset": 95, "limit": 10}).json()
+    assert len(last["tracks"]["items"]) == 5 and last["tracks"]["next"] is None
+    assert requests.get(env["THUMB_SPOTIFY_URL"].format(id="abc")).headers["Content-Type"] == "image/jpeg"
+
+
+def test_stub_failures_follow_the_profile():
+    server = stub_providers.start(stub_providers.load_profile("instant", {"error_rate": {"youtube_search": 1.0}}))
+    try:
+        response = requests.get(server.env()["YOUTUBE_SEARCH_URL"], params={"q": "x"})
+        assert response.status_code == 503
+        assert server.stats()["failures"]["youtube_search"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_print_env_does_not_bind_the_port(stub):
+    port = stub.server_address[1]
+    output = subprocess.run(
+        [sys.executable, stub_providers.__file__, "--port", str(port), "--print-env"],
+        capture_output=True, text=True, check=True, timeout=30,
+    ).stdout
+    assert f"YOUTUBE_SEARCH_URL=http://127.0.0.1:{port}/youtube/v3/search" in output.splitlines()
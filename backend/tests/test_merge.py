@@ -0,0 +1,100 @@
+import pytest
+
+from merge import (
+    SongMerger,
+    artist_key,
+    canonical,
+    clean_title,
+    duration_seconds,
+    fold,
+    title_key,
+    version_words,
+)
+from models import Song
+
+
+def yt(title, duration="4:20", video_id=None, artist="Arijit Singh"):
+    return Song(title=title, artist=artist, source="youtube", duration=duration,
+                youtube_id=video_id or f"yt-{title}", thumbnail="/api/thumb/youtube/x",
+                play_url="https://youtube.com/watch", embed_url="https://youtube.com/embed")
+
+
+def sp(title, duration="4:22", track_id=None, artist="Arijit Singh"):
+    return Song(title=title, artist=artist, source="spotify", duration=duration,
+                spotify_id=track_id or f"sp-{title}", album="Aashiqui 2", year="2013")
+
+
+@pytest.mark.parametrize("title, cleaned", [
+    ("Tum Hi Ho (Official Video)", "Tum Hi Ho"),
+    ("Full Video: Kesariya | Brahmastra", "Kesariya | Brahmastra"),
+    ("Kabira Lyrical Video | YJHD", "Kabira | YJHD"),
+    ("Tum Hi Ho | Lyrical", "Tum Hi Ho"),
+    ("Kesariya - Lyrical | Brahmastra", "Kesariya | Brahmastra"),
+    ("Tum Hi Ho HD", "Tum Hi Ho"),
+    ("TUM HI HO [OFFICIAL MUSIC VIDEO]", "TUM HI HO"),
+    ("Video Killed the Radio Star", "Video Killed the Radio Star"),
+    ("HD", "HD"),
+    ("  Tum Hi Ho  ", "Tum Hi Ho"),
+])
+def test_clean_title(title, cleaned):
+    assert clean_title(title) == cleaned
+
+
+def test_fold_spelling_variants():
+    assert fold("Kabeera") == fold("Kabira")
+    assert fold("Tum Hee Ho") == fold("Tum Hi Ho")
+    assert fold("Channa Mereyaa") == fold("Channa Mereya")
+
+
+def test_title_key_drops_noise_and_the_artist_segment():
+    assert title_key("Arijit Singh - Tum Hi Ho | Aashiqui 2 (Full Video Song)", "Arijit Singh") == "tum hi ho"
+    assert title_key("Tum Hi Ho feat. Someone", "x") == "tum hi ho"
+
+
+def test_artist_key_keeps_every_credit():
+    assert artist_key("Pritam, Arijit Singh & Shreya") == "pritam arijit sing sreia"
+
+
+def test_version_words_and_durations():
+    assert version_words("Tum Hi Ho (Reprise) - Female") == ("female", "reprise")
+    assert duration_seconds("4:20") == 260
+    assert duration_seconds("") == 0
+
+
+@pytest.mark.parametrize("a, b, same", [
+    (yt("Arijit Singh - Tum Hi Ho | Aashiqui 2 (Full Video Song)"), sp("Tum Hi Ho"), True),
+    (yt("Tum Hee Ho"), sp("Tum Hi Ho"), True),
+    (yt("Tum Hi Ho (Official Video)"), yt("Tum Hi Ho | Lyrical"), True),
+    # Same provider: only equal display titles are duplicates
+    (yt("Tum Hi Ho Bandhu"), yt("Tum Hi Ho"), False),
+    (yt("Dhoom Machale Dhoom"), yt("Dhoom Machale"), False),
+    # Different recordings, numbers, artists and lengths stay apart
+    (yt("Tum Hi Ho (Reprise)"), sp("Tum Hi Ho"), False),
+    (yt("Dhoom 2"), sp("Dhoom 3"), False),
+    (yt("Tum Hi Ho", artist="Shreya Ghoshal"), sp("Tum Hi Ho"), False),
+    (yt("Tum Hi Ho", duration="9:00"), sp("Tum Hi Ho"), False),
+])
+def test_match(a, b, same):
+    assert bool(SongMerger().match([a, b])[0, 1]) is same
+
+
+def test_canonical_takes_playback_from_youtube_and_metadata_from_spotify():
+    song = canonical([yt("Tum Hi Ho (Official Video)", video_id="v1"), sp("Tum Hi Ho", track_id="t1")])
+    assert (song.title, song.source, song.youtube_id, song.spotify_id) == ("Tum Hi Ho", "youtube", "v1", "t1")
+    assert (song.album, song.duration, song.thumbnail) == ("Aashiqui 2", "4:22", "/api/thumb/youtube/x")
+
+
+def test_merge_groups_candidates_and_updates_served_songs():
+    served = [yt("Tum Hi Ho (Official Video)", video_id="v1")]
+    candidates = [sp("Tum Hi Ho", track_id="t1"), yt("Kesariya", video_id="v2"), sp("Kesariya", track_id="t2")]
+    groups, updates = SongMerger().merge(served, candidates)
+    assert updates[0][0].spotify_id == "t1"
+    assert updates[0][1] == ["youtube:v1", "spotify:t1"]
+    assert len(groups) == 1
+    merged, keys = groups[0]
+    assert (merged.youtube_id, merged.spotify_id) == ("v2", "t2")
+    assert keys == ["youtube:v2", "spotify:t2"]
+
+
+def test_merge_without_candidates():
+    assert SongMerger().merge([yt("a")], []) == ([], {})
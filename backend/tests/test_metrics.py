@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return MetricsRegistry(directory=str(tmp_path / "metrics"))
+
+
+def lines(registry):
+    return registry.render().splitlines()
+
+
+def test_counter_with_labels(registry):
+    requests = registry.counter("app_requests_total", "Requests")
+    requests.inc(route="search")
+    requests.inc(2, route="search")
+    requests.inc(route='say "hi"\n')
+    rendered = lines(registry)
+    assert "# TYPE app_requests_total counter" in rendered
+    assert 'app_requests_total{route="search"} 3' in rendered
+    assert 'app_requests_total{route="say \\"hi\\"\\n"} 1' in rendered
+
+
+def test_registering_a_name_twice_returns_the_same_metric(registry):
+    assert registry.counter("c_total", "C") is registry.counter("c_total", "C")
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, endpoint="x")
+    rendered = lines(registry)
+    assert 'latency_seconds_bucket{endpoint="x",le="0.1"} 2' in rendered
+    assert 'latency_seconds_bucket{endpoint="x",le="1.0"} 3' in rendered
+    assert 'latency_seconds_bucket{endpoint="x",le="+Inf"} 4' in rendered
+    assert 'latency_seconds_count{endpoint="x"} 4' in rendered
+    assert 'latency_seconds_sum{endpoint="x"} 3.65' in rendered
+
+
+def test_collectors(registry):
+    registry.register_collector("cache_hits_total", "Hits", lambda: [({"cache": "search"}, 7)])
+    registry.register_collector("broken_total", "Broken", lambda: 1 / 0)
+    rendered = lines(registry)
+    assert 'cache_hits_total{cache="search"} 7' in rendered
+    assert not any(line.startswith("broken_total") for line in rendered)
+
+
+def test_workers_are_summed(registry):
+    registry.counter("jobs_total", "Jobs").inc(2, kind="a")
+    registry.histogram("wait_seconds", "Wait", buckets=(1.0,)).observe(0.5)
+    # Another worker's dump in the shared directory
+    other = MetricsRegistry(directory=registry.directory)
+    other.counter("jobs_total", "Jobs").inc(3, kind="a")
+    other.histogram("wait_seconds", "Wait", buckets=(1.0,)).observe(2.0)
+    os.makedirs(registry.directory, exist_ok=True)
+    with open(os.path.join(registry.directory, "999999.json"), "w") as f:
+        json.dump(other.snapshot(), f)
+
+    rendered = lines(registry)
+    assert 'jobs_total{kind="a"} 5' in rendered
+    assert 'wait_seconds_bucket{le="1.0"} 1' in rendered
+    assert "wait_seconds_count 2" in rendered
+
+
+def test_unreadable_dumps_are_skipped(registry):
+    registry.counter("ok_total", "Ok").inc()
+    os.makedirs(registry.directory, exist_ok=True)
+    with open(os.path.join(registry.directory, "123.json"), "w") as f:
+        f.write("{truncated")
+    assert "ok_total 1" in lines(registry)
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/search/metrics artist")
+    response = client.get("/api/metrics")
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    body = response.get_data(as_text=True)
+    assert "# TYPE sangam_http_request_duration_seconds histogram" in body
+    assert 'sangam_upstream_request_duration_seconds_count{endpoint="youtube_search",status="200"}' in body
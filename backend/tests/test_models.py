@@ -0,0 +1,67 @@
+import json
+
+import msgspec
+import pytest
+
+import stub_providers
+from models import (
+    Song,
+    json_encoder,
+    song_decoder,
+    spotify_search_decoder,
+    youtube_search_decoder,
+    youtube_videos_decoder,
+)
+
+
+def test_song_omits_unset_fields():
+    song = Song(title="Tum Hi Ho", artist="Arijit Singh", source="youtube", youtube_id="abc")
+    assert json.loads(json_encoder.encode(song)) == {
+        "title": "Tum Hi Ho", "artist": "Arijit Singh", "source": "youtube", "youtube_id": "abc",
+    }
+
+
+def test_song_round_trip():
+    song = Song(title="t", artist="a", source="spotify", spotify_id="sp", album="x", duration="3:00")
+    assert song_decoder.decode(json_encoder.encode(song)) == song
+
+
+def test_song_requires_title_artist_and_source():
+    with pytest.raises(msgspec.ValidationError):
+        song_decoder.decode(b'{"title": "t", "artist": "a"}')
+
+
+def test_youtube_search_decodes_stub_body():
+    body = json.dumps(stub_providers.youtube_search_body("arijit", "", 5)).encode()
+    response = youtube_search_decoder.decode(body)
+    assert len(response.items) == 5
+    assert all(item.id.videoId for item in response.items)
+    assert response.nextPageToken
+
+
+def test_youtube_defaults_for_missing_fields():
+    response = youtube_videos_decoder.decode(b'{"items": [{"id": "v1", "snippet": {}}], "extra": 1}')
+    video = response.items[0]
+    assert video.snippet.title == "Unknown"
+    assert video.contentDetails.duration == "PT4M20S"
+    assert video.snippet.thumbnails.best() is None
+
+
+def test_youtube_best_thumbnail():
+    response = youtube_search_decoder.decode(json.dumps({"items": [{
+        "id": {"videoId": "v1"},
+        "snippet": {"thumbnails": {"default": {"url": "d"}, "high": {"url": "h"}, "maxres": {}}},
+    }]}).encode())
+    assert response.items[0].snippet.thumbnails.best() == "h"
+
+
+def test_spotify_search_decodes_stub_body():
+    body = json.dumps(stub_providers.spotify_search_body("arijit", 0, 10)).encode()
+    tracks = spotify_search_decoder.decode(body).tracks
+    assert len(tracks.items) == 10
+    assert tracks.items[0].artists[0].name
+    assert tracks.items[0].duration_ms > 0
+
+
+def test_spotify_empty_response():
+    assert spotify_search_decoder.decode(b"{}").tracks.items == []
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from catalog import song_key
+from models import SearchCursor, decode_cursor, encode_cursor
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def keys(songs):
+    return [song.get("youtube_id") or song.get("spotify_id") for song in songs]
+
+
+def test_cursor_round_trip():
+    cursor = SearchCursor(artist="arijit", limit=10, youtube="CAoQAA", spotify=10, seen=["youtube:a"])
+    token = encode_cursor(cursor)
+    assert "=" not in token
+    assert decode_cursor(token) == cursor
+
+
+@pytest.mark.parametrize("token", ["!!bad", "e30", encode_cursor(SearchCursor("a", 1))[:-3]])
+def test_malformed_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_pages_do_not_repeat_songs(client):
+    first = client.get("/api/search/paged artist?limit=6").get_json()
+    assert len(first["songs"]) == 6 and first["next_cursor"]
+    second = client.get(f"/api/search/paged artist?cursor={first['next_cursor']}").get_json()
+    assert len(second["songs"]) == 6
+    assert not set(keys(first["songs"])) & set(keys(second["songs"]))
+
+
+def test_cursor_for_another_artist_is_rejected(client):
+    cursor = client.get("/api/search/cursor owner?limit=3").get_json()["next_cursor"]
+    response = client.get(f"/api/search/someone else?cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_bad_cursor_is_a_400(client):
+    assert client.get("/api/search/arijit?cursor=!!bad").status_code == 400
+
+
+@pytest.mark.parametrize("limit, expected", [("0", 1), ("500", 50), ("junk", 10)])
+def test_limit_is_clamped(backend, limit, expected):
+    with backend.app.test_request_context(f"/api/search/x?limit={limit}"):
+        assert backend.parse_search_args("x")[1] == expected
+
+
+def test_etag_key_keeps_the_cursor_case(backend):
+    with backend.app.test_request_context("/api/search/x?cursor=" + encode_cursor(SearchCursor("x", 5))):
+        key = backend.parse_search_args("x")[2]
+    assert key[-1] == encode_cursor(SearchCursor("x", 5))
+
+
+def test_ndjson_stream(client):
+    response = client.get("/api/search/streamed artist?limit=5", headers=NDJSON)
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    *chunks, done = lines
+    assert done["done"] is True and done["next_cursor"]
+    assert {chunk["provider"] for chunk in chunks} <= {"catalog", "youtube", "spotify"}
+    assert {chunk["provider"] for chunk in chunks} <= set(done["providers"])
+    assert sum(len(chunk["songs"]) for chunk in chunks) == 5
+
+
+def test_search_varies_on_accept(client):
+    assert "Accept" in client.get("/api/search/vary artist").headers["Vary"]
+    assert "Accept" in client.get("/api/search/vary artist", headers=NDJSON).headers["Vary"]
+
+
+def test_page_songs_have_distinct_keys(backend):
+    songs, _, _, _ = backend.search_page("distinct artist", 12)
+    assert len({song_key(song) for song in songs}) == len(songs)
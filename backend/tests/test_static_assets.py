@@ -0,0 +1,106 @@
+import gzip
+import os
+import re
+
+import pytest
+from flask import Flask, request
+
+from static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, AssetManifest, fingerprint_name
+
+CSS = "body { color: #123456; }\n" * 100
+
+
+@pytest.fixture
+def frontend(tmp_path):
+    root = tmp_path / "frontend"
+    (root / "assets").mkdir(parents=True)
+    (root / "assets" / "style.css").write_text(CSS)
+    (root / "assets" / "tiny.js").write_text("1;")
+    (root / "index.html").write_text(
+        '<link href="assets/style.css"><script src="assets/tiny.js"></script>'
+        '<a href="https://example.com/x.css">'
+    )
+    return root
+
+
+@pytest.fixture
+def manifest(frontend, tmp_path):
+    manifest = AssetManifest(str(frontend), cache_dir=str(tmp_path / "cache"))
+    manifest.build()
+    yield manifest
+    manifest._remove_build_dir()
+
+
+@pytest.fixture
+def serve(manifest):
+    app = Flask(__name__)
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def frontend(path):
+        return manifest.serve(manifest.lookup(path), request)
+
+    return app.test_client()
+
+
+def hashed_refs(serve):
+    return re.findall(r'(?:href|src)="([^"]+)"', serve.get("/").get_data(as_text=True))
+
+
+def test_fingerprint_name():
+    assert fingerprint_name("assets/style.css", "0123456789abcdef") == "assets/style.0123456789.css"
+
+
+def test_html_references_fingerprinted_assets(serve):
+    style, script, external = hashed_refs(serve)
+    assert re.fullmatch(r"assets/style\.[0-9a-f]{10}\.css", style)
+    assert re.fullmatch(r"assets/tiny\.[0-9a-f]{10}\.js", script)
+    assert external == "https://example.com/x.css"
+
+
+def test_fingerprinted_assets_are_immutable(serve):
+    style = hashed_refs(serve)[0]
+    assert serve.get(style).headers["Cache-Control"] == IMMUTABLE_CACHE
+    assert serve.get("/assets/style.css").headers["Cache-Control"] == REVALIDATE_CACHE
+    assert serve.get("/").headers["Cache-Control"] == REVALIDATE_CACHE
+
+
+def test_precompressed_variant(serve):
+    response = serve.get("/assets/style.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.get_data()).decode() == CSS
+    plain = serve.get("/assets/style.css")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data(as_text=True) == CSS
+
+
+def test_small_files_are_not_compressed(serve):
+    response = serve.get("/assets/tiny.js", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_if_none_match(serve):
+    etag = serve.get("/assets/style.css").headers["ETag"]
+    assert serve.get("/assets/style.css", headers={"If-None-Match": etag}).status_code == 304
+    assert serve.get("/assets/style.css", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_unknown_paths_fall_back_to_index(serve):
+    assert serve.get("/moods/happy").get_data() == serve.get("/").get_data()
+
+
+def test_rebuild_picks_up_changes_and_removes_the_old_build(manifest, frontend):
+    old_build = manifest._build_dir
+    old_etag = manifest.lookup("assets/style.css").etag
+    (frontend / "assets" / "style.css").write_text(CSS + "p {}\n")
+    manifest.build()
+    assert manifest.lookup("assets/style.css").etag != old_etag
+    assert not os.path.exists(old_build)
+    assert manifest.stats()["builds"] == 2
+
+
+def test_app_serves_the_frontend(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.mimetype == "text/html"
@@ -0,0 +1,66 @@
+import os
+
+from suggest import PrefixIndex, name_keys
+
+
+def test_name_keys():
+    assert name_keys("arijit singh") == ["arijit singh", "singh"]
+
+
+def test_matches_any_word_start_by_popularity():
+    index = PrefixIndex()
+    index.add(["Arijit Singh", "Sonu Nigam", "Sunidhi Chauhan"])
+    index.add(["Sunidhi Chauhan"])
+    assert index.suggest("sin") == ["Arijit Singh"]
+    assert index.suggest("s") == ["Sunidhi Chauhan", "Arijit Singh", "Sonu Nigam"]
+    assert index.suggest("su", limit=1) == ["Sunidhi Chauhan"]
+    assert index.suggest("xyz") == []
+    assert index.suggest("") == []
+
+
+def test_names_are_folded_but_displayed_as_cased():
+    index = PrefixIndex()
+    index.add(["beyonce"])
+    index.add(["Beyoncé"])
+    assert index.suggest("BEYON") == ["Beyoncé"]
+    assert len(index) == 1
+
+
+def test_short_prefix_lists_keep_the_most_popular():
+    index = PrefixIndex(top_size=2)
+    index.add(["Aa One"], weight=2)
+    index.add(["Ab Two", "Ac Three"])
+    index.add(["Ac Three"], weight=5)
+    assert index.suggest("a") == ["Ac Three", "Aa One"]
+    assert index.suggest("ab") == ["Ab Two"]
+
+
+def test_max_names():
+    index = PrefixIndex(max_names=2)
+    index.add(["One", "Two", "Three"])
+    assert len(index) == 2
+    assert index.suggest("thr") == []
+
+
+def test_snapshots_merge_between_processes(tmp_path):
+    path = str(tmp_path / "suggest" / "names.json")
+    first = PrefixIndex(path=path, snapshot_interval=3600)
+    first.add(["Arijit Singh"], weight=3)
+    first.snapshot()
+
+    second = PrefixIndex(path=path, snapshot_interval=3600)
+    assert second.suggest("arij") == ["Arijit Singh"]
+    second.add(["Shreya Ghoshal"])
+    second.snapshot()
+
+    first.snapshot()  # reloads the file the other index wrote before overwriting it
+    assert first.suggest("shr") == ["Shreya Ghoshal"]
+    assert sorted(name for name, _ in PrefixIndex(path=path).entries()) == ["Arijit Singh", "Shreya Ghoshal"]
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / "suggest"))
+
+
+def test_suggest_endpoint(client, backend):
+    client.get("/api/search/Suggested Singer")
+    body = client.get("/api/suggest?q=suggested sin&limit=500").get_json()
+    assert body["success"] is True
+    assert "Suggested Singer" in body["suggestions"]
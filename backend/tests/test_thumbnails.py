@@ -0,0 +1,135 @@
+import io
+import json
+
+import pytest
+from PIL import Image
+
+import stub_providers
+from thumbnails import (
+    PLACEHOLDER_URL,
+    DiskLRU,
+    ThumbnailStore,
+    absolute_thumb_urls,
+    snap_size,
+    spotify_thumb_url,
+    thumb_url,
+)
+
+
+class Fetch:
+    def __init__(self, data=None):
+        self.data = stub_providers.image_body() if data is None else data
+        self.calls = []
+
+    def __call__(self, source, image_id):
+        self.calls.append((source, image_id))
+        return self.data
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return DiskLRU(str(tmp_path / "thumbs"), max_bytes=10 ** 7)
+
+
+def test_urls():
+    assert thumb_url("youtube", "abc") == "/api/thumb/youtube/abc"
+    assert thumb_url("youtube", None) == PLACEHOLDER_URL
+    assert thumb_url("vimeo", "abc") == PLACEHOLDER_URL
+    assert spotify_thumb_url("https://i.scdn.co/image/ab67616d") == "/api/thumb/spotify/ab67616d"
+    assert spotify_thumb_url("https://example.com/x.jpg") == "https://example.com/x.jpg"
+
+
+@pytest.mark.parametrize("size, snapped", [(None, 120), ("junk", 120), ("1", 60), ("121", 240), ("9999", 480)])
+def test_snap_size(size, snapped):
+    assert snap_size(size) == snapped
+
+
+def test_absolute_thumb_urls():
+    body = json.dumps({"thumbnail": "/api/thumb/youtube/a", "title": 'say ":"/api/thumb/'},
+                      separators=(",", ":")).encode()
+    rewritten = json.loads(absolute_thumb_urls(body, "https://music.example"))
+    assert rewritten["thumbnail"] == "https://music.example/api/thumb/youtube/a"
+    assert rewritten["title"] == 'say ":"/api/thumb/'
+    assert absolute_thumb_urls(body, "") is body
+
+
+def test_disk_lru_evicts_least_recently_used(tmp_path):
+    disk = DiskLRU(str(tmp_path), max_bytes=25)
+    disk.put("a", b"x" * 10)
+    disk.put("b", b"y" * 10)
+    disk.get("a")
+    disk.put("c", b"z" * 10)
+    assert disk.get("b") is None
+    assert open(disk.get("a"), "rb").read() == b"x" * 10
+    assert disk.stats()["evictions"] == 1
+
+
+def test_disk_lru_is_shared_through_the_directory(tmp_path):
+    DiskLRU(str(tmp_path)).put("key", b"data")
+    other = DiskLRU(str(tmp_path))
+    assert other.stats()["files"] == 1
+    assert open(other.get("key"), "rb").read() == b"data"
+
+
+@pytest.mark.parametrize("fmt, mimetype, pil_format", [("webp", "image/webp", "WEBP"), ("jpeg", "image/jpeg", "JPEG")])
+def test_variants_are_rendered_once(disk, fmt, mimetype, pil_format):
+    fetch = Fetch()
+    store = ThumbnailStore(disk, fetch)
+    path, served = store.variant("youtube", "abc", 120, fmt)
+    assert served == mimetype
+    with Image.open(path) as image:
+        assert (image.format, image.size) == (pil_format, (120, 120))
+    assert store.variant("youtube", "abc", 120, fmt)[0] == path
+    store.variant("youtube", "abc", 60, fmt)
+    assert fetch.calls == [("youtube", "abc")]
+    assert store.stats()["rendered"] == 2
+
+
+def test_failed_fetches_are_not_retried_within_the_ttl(disk):
+    fetch = Fetch(data=b"")
+    store = ThumbnailStore(disk, fetch, failure_ttl=60)
+    assert store.variant("spotify", "gone", 120, "jpeg") is None
+    assert store.variant("spotify", "gone", 240, "webp") is None
+    assert len(fetch.calls) == 1
+    assert store.stats()["failed"] == 1
+
+
+def test_failed_fetches_are_retried_after_the_ttl(disk):
+    fetch = Fetch(data=b"")
+    store = ThumbnailStore(disk, fetch, failure_ttl=0)
+    store.original("spotify", "gone")
+    store.original("spotify", "gone")
+    assert len(fetch.calls) == 2
+
+
+def test_undecodable_image(disk):
+    store = ThumbnailStore(disk, Fetch(data=b"not an image"))
+    assert store.variant("youtube", "abc", 120, "jpeg") is None
+
+
+def test_thumb_endpoint(client, backend):
+    response = client.get("/api/thumb/youtube/abc123?size=100", headers={"Accept": "image/webp"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert response.headers["Cache-Control"] == backend.config.THUMB_CACHE_CONTROL
+    with Image.open(io.BytesIO(response.get_data())) as image:
+        assert image.size == (120, 120)
+    assert client.get("/api/thumb/vimeo/abc").status_code == 404
+    assert client.get("/api/thumb/placeholder").mimetype == "image/svg+xml"
+
+
+def test_search_thumbnails_are_absolute(client, backend, monkeypatch):
+    response = client.get("/api/search/thumb artist?limit=3", base_url="https://music.example")
+    thumbnails = [song["thumbnail"] for song in response.get_json()["songs"]]
+    assert all(url.startswith("https://music.example/api/thumb/") for url in thumbnails)
+
+    # The ETag remembered for one origin does not answer for another
+    etag = response.headers["ETag"]
+    other = client.get("/api/search/thumb artist?limit=3", base_url="http://localhost",
+                       headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.get_json()["songs"][0]["thumbnail"].startswith("http://localhost/api/thumb/")
+
+    monkeypatch.setattr(backend.config, "PUBLIC_BASE_URL", "https://cdn.example")
+    response = client.get("/api/search/thumb artist?limit=3", base_url="https://music.example")
+    assert response.get_json()["songs"][0]["thumbnail"].startswith("https://cdn.example/api/thumb/")
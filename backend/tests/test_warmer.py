@@ -0,0 +1,81 @@
+import pytest
+
+from models import Song
+from warmer import SnapshotWarmer, fcntl
+
+
+class Loader:
+    def __init__(self, **values):
+        self.values = values
+        self.calls = []
+
+    def __call__(self, key):
+        self.calls.append(key)
+        value = self.values.get(key)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def test_refresh_publishes_every_key():
+    warmer = SnapshotWarmer("test", ["a", "b"], Loader(a=[1], b=[2]))
+    warmer.refresh()
+    assert (warmer.get("a"), warmer.get("b")) == ([1], [2])
+    assert warmer.stats()["keys"] == 2
+
+
+def test_failed_or_empty_refresh_keeps_the_previous_value():
+    loader = Loader(a=[1], b=[2])
+    warmer = SnapshotWarmer("test", ["a", "b"], loader)
+    warmer.refresh()
+    loader.values = {"a": RuntimeError("quota"), "b": []}
+    warmer.refresh()
+    assert (warmer.get("a"), warmer.get("b")) == ([1], [2])
+    assert warmer.stats()["failures"] == 2
+
+
+def test_snapshot_file_is_shared(tmp_path):
+    path = str(tmp_path / "snap" / "moods.json")
+    leader = SnapshotWarmer("test", ["a", "b"], Loader(a=[1], b=[2]), path=path, value_type=list)
+    assert leader.is_leader()
+    leader.refresh()
+
+    follower = SnapshotWarmer("test", ["a"], Loader(), path=path, value_type=list)
+    if fcntl is not None:
+        assert not follower.is_leader()
+    assert follower._load()
+    assert follower.get("a") == [1]
+    assert follower.get("b") is None  # not one of its keys
+    assert follower.stats()["loads"] == 1
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "moods.json"
+    path.write_text("{not json")
+    warmer = SnapshotWarmer("test", ["a"], Loader(), path=str(path), value_type=list)
+    assert not warmer._load()
+    assert warmer.get("a") is None
+
+
+@pytest.fixture
+def youtube_searches(backend, stub):
+    def count():
+        return stub.stats()["calls"]["youtube_search"]
+    return count
+
+
+def test_mood_is_served_from_the_warmer(client, backend, monkeypatch, youtube_searches):
+    song = Song(title="Warm Song", artist="Warm Artist", source="youtube", youtube_id="warm0000001")
+    monkeypatch.setattr(backend.mood_warmer, "_snapshot", {"happy": [song]})
+    before = youtube_searches()
+    body = client.get("/api/mood/happy").get_json()
+    assert [s["title"] for s in body["songs"]] == ["Warm Song"]
+    assert youtube_searches() == before
+
+
+def test_live_mood_searches_are_cached(client, youtube_searches):
+    before = youtube_searches()
+    first = client.get("/api/mood/chill").get_json()
+    second = client.get("/api/mood/Chill").get_json()
+    assert first["songs"] and first["songs"] == second["songs"]
+    assert youtube_searches() - before == 1
@@ -0,0 +1,268 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from cache import TTLCache
+from singleflight import SingleFlight
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: without Pillow the original image is served unresized
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("youtube", "spotify")
+IMAGE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,100}$")
+SPOTIFY_IMAGE_RE = re.compile(r"^https://i\.scdn\.co/image/([A-Za-z0-9_-]+)$")
+
+# Square edge lengths (px) a variant can have; requests snap up to the next one
+SIZES = (60, 120, 240, 480)
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+THUMB_PATH = "/api/thumb/"
+PLACEHOLDER_URL = f"{THUMB_PATH}placeholder"
+# A proxy path as a JSON value ("thumbnail":"/api/thumb/...); a quote inside a string is escaped
+_THUMB_VALUE = f'":"{THUMB_PATH}'.encode()
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="300" height="300" viewBox="0 0 300 300">'
+    '<rect width="300" height="300" fill="#667eea"/>'
+    '<text x="150" y="150" font-size="120" text-anchor="middle" dominant-baseline="central"'
+    ' fill="#ffffff">\U0001F3B5</text></svg>'
+).encode("utf-8")
+
+
+def thumb_url(source, image_id):
+    """Proxy URL for an image id of `source` (the placeholder when there is none)"""
+    if not image_id or source not in SOURCES:
+        return PLACEHOLDER_URL
+    return f"{THUMB_PATH}{source}/{image_id}"
+
+
+def absolute_thumb_urls(body, base_url):
+    """
+    JSON `body` with its proxy thumbnail paths made absolute under `base_url`
+    (an origin such as "https://sangam.example"). Songs keep the paths, since
+    they are cached and shared by every host the API is reached on.
+    """
+    if not base_url or _THUMB_VALUE not in body:
+        return body
+    return body.replace(_THUMB_VALUE, f'":"{base_url}{THUMB_PATH}'.encode())
+
+
+def spotify_thumb_url(url):
+    """Proxy URL for a Spotify CDN image URL; other URLs are returned unchanged"""
+    match = SPOTIFY_IMAGE_RE.match(url or "")
+    return thumb_url("spotify", match.group(1)) if match else url
+
+
+def snap_size(size, default=120):
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return default
+    return next((s for s in SIZES if s >= size), SIZES[-1])
+
+
+class DiskLRU:
+    """
+    Size-bounded file cache with least-recently-used eviction.
+
+    Files live under `directory` at a path derived from the key, so every
+    process sharing the directory finds the same file; recency is tracked in
+    memory (seeded from mtimes at start-up) and files written by another
+    worker are adopted on first access. Writes go through a temporary file
+    and an atomic rename, so readers never see a partial image.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key path -> size
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._bytes += size
+        self._evict_locked()
+
+    def path_for(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        """Path of the cached file for `key`, or None"""
+        path = self.path_for(key)
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            size = None
+        with self._lock:
+            if size is None:
+                # Evicted by another worker
+                self._bytes -= self._entries.pop(path, 0)
+                self.misses += 1
+                return None
+            if path not in self._entries:
+                self._entries[path] = size
+                self._bytes += size
+            self._entries.move_to_end(path)
+            self.hits += 1
+        return path
+
+    def put(self, key, data):
+        """Store `data` for `key` and return its path"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._bytes += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            self._evict_locked()
+        return path
+
+    def _evict_locked(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ThumbnailStore:
+    """
+    Provider thumbnails fetched once and re-encoded into small variants.
+
+    `fetch(source, image_id)` returns the original image bytes (or None).
+    The original and every (size, format) variant are kept in a DiskLRU;
+    variants are square center crops, matching the object-fit: cover
+    cards, and concurrent misses for the same variant render it once.
+    An image the CDN did not return is not asked for again for
+    `failure_ttl` seconds.
+    """
+
+    def __init__(self, cache, fetch, quality=80, failure_ttl=60):
+        self.cache = cache
+        self.fetch = fetch
+        self.quality = quality
+        self.inflight = SingleFlight()
+        self.failures = TTLCache("thumb_failures", ttl=failure_ttl, stale_ttl=0, max_entries=4096,
+                                 refresh_workers=1)
+        self.fetched = 0
+        self.failed = 0
+        self.rendered = 0
+
+    def variant(self, source, image_id, size, fmt):
+        """
+        (path, mimetype) of the `size` px `fmt` variant, or None when the
+        image is unavailable. Without Pillow this is the original JPEG.
+        """
+        if Image is None:
+            return self._original_path(source, image_id)
+        key = f"{source}/{image_id}/{size}.{fmt}"
+        path = self.cache.get(key)
+        if path is None:
+            path = self.inflight.do(key, lambda: self._render(source, image_id, size, fmt, key))
+        return (path, FORMATS[fmt][1]) if path is not None else None
+
+    def _original_path(self, source, image_id):
+        key = f"{source}/{image_id}/original"
+        path = self.cache.get(key)
+        if path is None and self.original(source, image_id):
+            path = self.cache.path_for(key)
+        return (path, "image/jpeg") if path is not None else None
+
+    def original(self, source, image_id):
+        key = f"{source}/{image_id}/original"
+        path = self.cache.get(key)
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except OSError:
+                pass
+
+        if self.failures.get(key):
+            return None
+
+        def load():
+            data = self.fetch(source, image_id)
+            if data:
+                self.fetched += 1
+                self.cache.put(key, data)
+            else:
+                self.failed += 1
+                self.failures.set(key, True)
+            return data
+
+        return self.inflight.do(key, load)
+
+    def _render(self, source, image_id, size, fmt, key):
+        data = self.original(source, image_id)
+        if not data:
+            return None
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image = image.convert("RGB")
+                if source == "youtube" and image.height and image.width * 3 == image.height * 4:
+                    # hqdefault letterboxes 16:9 videos into 4:3; drop the black bars
+                    bar = (image.height - image.width * 9 // 16) // 2
+                    image = image.crop((0, bar, image.width, image.height - bar))
+                image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                out = io.BytesIO()
+                pil_format = FORMATS[fmt][0]
+                if pil_format == "JPEG":
+                    image.save(out, pil_format, quality=self.quality, optimize=True, progressive=True)
+                else:
+                    image.save(out, pil_format, quality=self.quality, method=4)
+        except Exception as e:
+            logger.warning("Thumbnail %s/%s could not be resized: %s", source, image_id, e)
+            return None
+        self.rendered += 1
+        return self.cache.put(key, out.getvalue())
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats.update(
+            fetched=self.fetched, failed=self.failed, rendered=self.rendered, pillow=Image is not None
+        )
+        return stats
@@ -0,0 +1,164 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict
+
+import msgspec
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process refreshes its own snapshot
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotWarmer:
+    """
+    Periodically precomputes `loader(key)` for a fixed set of keys.
+
+    Results are published as one immutable dict that is swapped in a single
+    assignment, so readers never see a half-built snapshot and never block
+    on the refresh. A key whose refresh fails or comes back empty keeps its
+    previous value.
+
+    With a `path`, processes share one snapshot file: whichever process
+    holds the lock next to it refreshes and writes it, and the others reload
+    it when it changes (checked every `poll_interval` seconds), so gunicorn
+    workers do not each pay for their own refreshes. A leader that starts
+    with a snapshot younger than `interval` reuses it instead of refreshing.
+    `value_type` is the type of one value, for decoding the file.
+    """
+
+    def __init__(self, name, keys, loader, interval=1800, jitter=0.1,
+                 path=None, value_type=object, poll_interval=30.0):
+        self.name = name
+        self.keys = list(keys)
+        self.loader = loader
+        self.interval = interval
+        self.jitter = jitter
+        self.path = path
+        self.poll_interval = poll_interval
+        self._decoder = msgspec.json.Decoder(Dict[str, value_type])
+
+        self._snapshot = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._loaded_mtime = None
+        self.refreshed_at = None
+        self.refreshes = 0
+        self.failures = 0
+        self.loads = 0
+
+    def get(self, key):
+        return self._snapshot.get(key)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh(self):
+        snapshot = dict(self._snapshot)
+        for key in self.keys:
+            try:
+                value = self.loader(key)
+            except Exception as e:
+                logger.error("%s warmer failed for %s: %s", self.name, key, e)
+                value = None
+            if value:
+                snapshot[key] = value
+            else:
+                self.failures += 1
+        self._snapshot = snapshot
+        self.refreshed_at = time.time()
+        self.refreshes += 1
+        logger.info("%s warmer refreshed %d/%d keys", self.name, len(snapshot), len(self.keys))
+        if self.path:
+            self._save()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.is_leader():
+                age = self._snapshot_age()
+                if age is not None and age < self.interval and self._load():
+                    # A fresh snapshot from before a restart (or another leader)
+                    delay = self.interval - age
+                else:
+                    self.refresh()
+                    delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            else:
+                self._load()
+                delay = self.poll_interval
+            self._stop.wait(delay)
+
+    def is_leader(self):
+        """True if this process refreshes (takes the lock when it is free)"""
+        if not self.path or fcntl is None:
+            return True
+        if self._lock_file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        lock_file = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file  # held (and the lock with it) for the life of the process
+        logger.info("%s warmer refreshes for pid %d", self.name, os.getpid())
+        return True
+
+    def _snapshot_age(self):
+        try:
+            return time.time() - os.stat(self.path).st_mtime
+        except (OSError, TypeError):
+            return None
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(msgspec.json.encode(self._snapshot))
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error("%s snapshot %s could not be written: %s", self.name, self.path, e)
+
+    def _load(self):
+        """Swap in the snapshot file if it changed since the last load; True if it was read"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._loaded_mtime:
+                return True
+            with open(self.path, "rb") as f:
+                snapshot = self._decoder.decode(f.read())
+        except FileNotFoundError:
+            return False
+        except (OSError, msgspec.DecodeError) as e:
+            logger.error("%s snapshot %s could not be loaded: %s", self.name, self.path, e)
+            return False
+        self._snapshot = {key: value for key, value in snapshot.items() if key in self.keys}
+        self._loaded_mtime = mtime
+        self.refreshed_at = mtime / 1e9
+        self.loads += 1
+        return True
+
+    def stats(self):
+        return {
+            "keys": len(self._snapshot),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "loads": self.loads,
+            "leader": self._lock_file is not None or not self.path or fcntl is None,
+            "refreshed_at": self.refreshed_at,
+        }
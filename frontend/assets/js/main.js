@@ -58,8 +58,11 @@ function initializeEventListeners() {
         });
         
         let searchTimeout;
+        let suggestTimeout;
         searchInput.addEventListener('input', function(e) {
             clearTimeout(searchTimeout);
+            clearTimeout(suggestTimeout);
+            suggestTimeout = setTimeout(() => loadSuggestions(e.target.value.trim()), 150);
             searchTimeout = setTimeout(() => {
                 if (e.target.value.trim().length > 2) {
                     searchArtist();
@@ -72,6 +75,26 @@ function initializeEventListeners() {
     playMoodSongs('happy');
 }
 
+// Artist suggestions for the search box (served from the backend's in-memory index)
+async function loadSuggestions(prefix) {
+    const list = document.getElementById('artistSuggestions');
+    if (!list || !isAPIAvailable || !prefix) return;
+
+    try {
+        const response = await fetch(`${CONFIG.API_BASE_URL}/suggest?q=${encodeURIComponent(prefix)}`);
+        if (!response.ok) return;
+        const data = await response.json();
+        list.innerHTML = '';
+        (data.suggestions || []).forEach(name => {
+            const option = document.createElement('option');
+            option.value = name;
+            list.appendChild(option);
+        });
+    } catch (error) {
+        console.log('Suggestions unavailable:', error);
+    }
+}
+
 // Navigation Functions
 function showPage(pageId) {
     const pages = document.querySelectorAll('.page');
@@ -361,7 +384,7 @@ function displaySongs(songs, title) {
     `;
     
     songs.forEach((song, index) => {
-        const thumbnail = song.thumbnail || 'https://via.placeholder.com/300x300/667eea/ffffff?text=🎵';
+        const thumbnail = song.thumbnail || `${CONFIG.API_BASE_URL}/thumb/placeholder`;
         const sourceIcon = getSourceIcon(song.source || 'sample');
         const songData = JSON.stringify(song).replace(/"/g, '&quot;');
         
@@ -370,7 +393,7 @@ function displaySongs(songs, title) {
                 <div class="song-card">
                     <div class="song-info">
                         <img src="${thumbnail}" alt="${escapeHtml(song.title)}" class="song-thumbnail" 
-                             onerror="this.src='https://via.placeholder.com/60x60/667eea/ffffff?text=🎵'">
+                             onerror="this.onerror=null; this.src='${CONFIG.API_BASE_URL}/thumb/placeholder'">
                         <div class="song-details">
                             <div class="song-title">${escapeHtml(song.title)}</div>
                             <div class="song-artist">${escapeHtml(song.artist)} • ${song.year || 'Unknown'}</div>